@@ -0,0 +1,38 @@
+"""Benchmark the batch Nutri-Score engine against the row-wise apply.
+
+Run from the repository root (the dataset path in config.json is relative):
+
+    python benchmarks/bench_nutriscore.py
+"""
+import time
+
+from webapp_mangetamain.load_config import recipe, recipe_parsed
+from webapp_mangetamain.nutriscore_analyzer import (
+    compute_nutriscore,
+    compute_nutriscore_batch,
+    filter_data_with_nutri,
+    parse_nutrition,
+)
+
+
+def main():
+    nutrition_df = filter_data_with_nutri(parse_nutrition(recipe, recipe_parsed))
+    print(f"Scoring {len(nutrition_df):,} recipes")
+
+    start = time.perf_counter()
+    row_wise = nutrition_df.apply(lambda row: compute_nutriscore(row.to_dict()), axis=1)
+    row_wise_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = compute_nutriscore_batch(nutrition_df)
+    batch_s = time.perf_counter() - start
+
+    assert row_wise.tolist() == batch.tolist(), "batch grades differ from compute_nutriscore"
+
+    print(f"row-wise apply : {row_wise_s:8.3f} s")
+    print(f"batch          : {batch_s:8.3f} s")
+    print(f"speedup        : {row_wise_s / batch_s:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
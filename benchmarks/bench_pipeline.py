@@ -0,0 +1,248 @@
+"""Time and memory of every pipeline stage on synthetic Food.com-shaped data.
+
+The recipes come from ``utils.synthetic`` (deterministic, no network, no
+real dataset needed) and are written once per size and seed to
+``--data-dir``. Each size then runs the pipeline the tabs depend on, from
+the CSV to the figures, and every stage records its wall and CPU time,
+its peak memory above the memory in use when it started, and the number of
+rows it produced.
+
+    python benchmarks/bench_pipeline.py --sizes 10k 100k
+    python benchmarks/bench_pipeline.py --sizes 10k 100k --save-baseline
+    python benchmarks/bench_pipeline.py --sizes 1m --output results.json
+
+Results are compared with ``benchmarks/baseline.json`` when it has the same
+size: a stage slower or bigger than ``--tolerance`` times its baseline is
+reported as a regression and the exit code is 1. Baselines are machine
+specific; regenerate them with ``--save-baseline`` on the machine used for
+the comparisons.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# local_food and ingredient_data_process import ``utils`` as a top-level
+# package, like the streamlit entry point does
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "webapp_mangetamain"))
+
+from webapp_mangetamain.local_food import (  # noqa: E402
+    plot_top_ingredients_by_continent,
+    top_ingredients_by_continent,
+)
+from webapp_mangetamain.nutriscore_analyzer import (  # noqa: E402
+    add_nutriscore_column,
+    filter_data_with_nutri,
+    parse_nutrition,
+)
+from webapp_mangetamain.tag_analyzer import (  # noqa: E402
+    create_tag_recipes_dataset,
+    get_general_tags_statistics,
+)
+from webapp_mangetamain.utils.dataset_cache import load_dataset  # noqa: E402
+from webapp_mangetamain.utils.figure_cache import FigureCache  # noqa: E402
+from webapp_mangetamain.utils.ingestion import parse_recipes  # noqa: E402
+from webapp_mangetamain.utils.synthetic import SIZES, write_recipes_csv  # noqa: E402
+from utils.filter_data import DatasetContext, separate_foods_drinks  # noqa: E402
+from utils.ingredient_data_process import generate_matrix  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+
+
+# -------------------------
+# Measurements
+# -------------------------
+
+def _reset_peak_rss() -> bool:
+    """Reset the kernel's RSS high-water mark (Linux); False if unsupported."""
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def _rss_kb(field: str) -> int:
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith(field + ":"):
+            return int(line.split()[1])
+    raise KeyError(field)
+
+
+def measure(func, *args):
+    """
+    Run ``func(*args)`` and measure it.
+
+    Peak memory is the RSS high-water mark above the RSS at the start on
+    Linux, and the peak of tracemalloc (Python and NumPy allocations, with a
+    slower run) elsewhere.
+
+    Returns:
+        Tuple (result, {"seconds", "cpu_seconds", "peak_mb"})
+    """
+    use_rss = _reset_peak_rss()
+    if use_rss:
+        start_kb = _rss_kb("VmRSS")
+    else:
+        tracemalloc.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    result = func(*args)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    if use_rss:
+        peak_mb = (_rss_kb("VmHWM") - start_kb) / 1024
+    else:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return result, {"seconds": round(wall, 4), "cpu_seconds": round(cpu, 4), "peak_mb": round(peak_mb, 1)}
+
+
+def _rows(result) -> int:
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, dict):
+        result = next((v for v in result.values() if hasattr(v, "__len__")), result)
+    try:
+        return len(result)
+    except TypeError:
+        return 1
+
+
+# -------------------------
+# Pipeline
+# -------------------------
+
+def _nutriscore(df, parsed):
+    return add_nutriscore_column(filter_data_with_nutri(parse_nutrition(df, parsed)))
+
+
+def _continent_figure(context):
+    # rendered like the tab does, through an image cache that keeps nothing
+    FigureCache(max_bytes=0).to_bytes(plot_top_ingredients_by_continent(context.ingredient_cube))
+    return context.ingredient_and_continent
+
+
+def _continent_queries(context):
+    # one query per position of the two sliders of the Local Food tab
+    return [
+        top_ingredients_by_continent(context.ingredient_cube, top_n, threshold / 100)
+        for top_n in range(5, 31) for threshold in range(5, 101, 5)
+    ]
+
+
+def run_pipeline(csv_path: Path, work_dir: Path) -> dict:
+    """Run every stage on the recipes of ``csv_path``; artifacts go to ``work_dir``."""
+    results = {}
+
+    def stage(name, func, *args):
+        result, metrics = measure(func, *args)
+        metrics["rows"] = _rows(result)
+        results[name] = metrics
+        print(f"  {name:<28} {metrics['seconds']:9.3f} s {metrics['peak_mb']:9.1f} MB {metrics['rows']:>12,} rows")
+        return result
+
+    df = stage("load_csv", load_dataset, csv_path, work_dir / "cache")
+    parsed = stage("parse_lists", parse_recipes, df)
+    stage("tag_statistics", get_general_tags_statistics, df, parsed)
+    stage("tag_recipes_dataset", lambda: create_tag_recipes_dataset(df, parsed=parsed))
+    stage("nutriscore", _nutriscore, df, parsed)
+    stage("foods_drinks", lambda: separate_foods_drinks(df, parsed=parsed))
+
+    context = DatasetContext(df, parsed, artifacts_dir=work_dir)
+    stage("ingredient_counts", lambda: context.ingredient_counts)
+    stage("cooccurrence_matrix", lambda: generate_matrix(output_dir=work_dir, context=context))
+    stage("recipes_with_continent", lambda: context.recipes_with_continent)
+    stage("ingredient_and_continent", lambda: context.ingredient_and_continent)
+    stage("ingredient_cube", lambda: context.ingredient_cube)
+    stage("continent_slider_queries", _continent_queries, context)
+    stage("top_ingredients_by_continent", _continent_figure, context)
+    return results
+
+
+# -------------------------
+# Baseline comparison
+# -------------------------
+
+def compare(results: dict, baseline: dict, tolerance: float, min_seconds: float = 0.05,
+            min_mb: float = 20.0) -> list[str]:
+    """
+    Stages slower or bigger than ``tolerance`` times their baseline.
+    Differences under ``min_seconds`` / ``min_mb`` are treated as noise.
+    """
+    regressions = []
+    for size, stages in results.items():
+        for name, metrics in stages.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if base is None:
+                continue
+            for field, floor in [("seconds", min_seconds), ("peak_mb", min_mb)]:
+                value, reference = metrics[field], base[field]
+                if value > tolerance * reference and value - reference > floor:
+                    regressions.append(f"{size} {name}: {field} {value} vs baseline {reference}")
+    return regressions
+
+
+def environment() -> dict:
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["10k", "100k"], choices=list(SIZES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", type=Path, default=BENCH_DIR / "data",
+                        help="where the synthetic CSVs are written and reused")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args(argv)
+    warnings.filterwarnings("ignore", category=FutureWarning)
+
+    report = {**environment(), "seed": args.seed, "results": {}}
+    for size in args.sizes:
+        csv_path = args.data_dir / f"synthetic-{size}-seed{args.seed}.csv"
+        if not csv_path.exists():
+            print(f"Generating {SIZES[size]:,} recipes -> {csv_path}")
+            write_recipes_csv(csv_path, size, args.seed)
+        print(f"[{size}]")
+        with tempfile.TemporaryDirectory() as work_dir:
+            report["results"][size] = run_pipeline(csv_path, Path(work_dir))
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if args.baseline.exists():
+        regressions = compare(report["results"], json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regression against {args.baseline} (tolerance x{args.tolerance})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""Build the derived datasets of the app in artifacts/ (``mangetamain-build``).
+
+Stages (see utils/artifacts.py for the incremental build):
+
+- ``parsed``: Parquet copies and parsed list columns of every dataset
+  (written to the cache directory);
+- ``drink_labels``: drink / food label of each recipe (cache directory);
+- ``nutriscore``: Nutri-Scores of all recipes and of food recipes;
+- ``tag_statistics``: per-tag metrics of the Tags tab;
+- ``ingredient_cube``: continent x ingredient counts of the Local Food tab;
+- ``cooccurrence``: co-occurrence / Jaccard matrices, neighbor index and
+  ingredient pairs (``generate_matrix``).
+
+Every stage but ``parsed`` reads the datasets through the cache written by
+``parsed``, so the independent ones run in parallel without parsing the
+CSVs again.
+
+``OPTIONAL_STAGES`` are only built when named on the command line, since
+the app does not read them:
+
+- ``streamed``: row store and mergeable aggregates of the recipe dataset,
+  ingested chunk by chunk (``utils/streaming.py``). It reads the CSV
+  itself, a chunk at a time, so ``mangetamain-build streamed`` works on
+  datasets that do not fit in memory.
+
+The app uses an output only if the manifest says it was built
+from the current datasets and config (``load_config.prebuilt``), and
+computes it itself otherwise.
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+import webapp_mangetamain.load_config as load_config
+from webapp_mangetamain.utils.artifacts import Stage, build
+
+logger = logging.getLogger(__name__)
+
+
+def _dataset(settings: dict, name: str):
+    from webapp_mangetamain.utils.schema import load_compact_dataset
+
+    return load_compact_dataset(settings["sources"][name], settings["cache_dir"]).copy(deep=False)
+
+
+def _parsed(settings: dict, name: str):
+    from webapp_mangetamain.utils.ingestion import load_parsed_recipes
+
+    return load_parsed_recipes(
+        settings["sources"][name], settings["cache_dir"], nutrition_width=settings["params"]["nutrition_width"]
+    )
+
+
+def _drink_labels(settings: dict, name: str):
+    from webapp_mangetamain.utils.food_drink import load_drink_labels
+
+    params = settings["params"]
+    return load_drink_labels(
+        settings["sources"][name], _parsed(settings, name).tags,
+        params["drink_keywords"], params["drink_false_positives"], params["food_keywords"],
+        cache_dir=settings["cache_dir"],
+    )
+
+
+def _context(settings: dict):
+    from webapp_mangetamain.utils.filter_data import DatasetContext
+
+    return DatasetContext(
+        _dataset(settings, "recipe"), _parsed(settings, "recipe"), trim_mode=settings["params"]["trim_mode"]
+    )
+
+
+def build_parsed(settings: dict, out_dir: Path) -> None:
+    for name in settings["sources"]:
+        _dataset(settings, name)
+        _parsed(settings, name)
+
+
+def build_drink_labels(settings: dict, out_dir: Path) -> None:
+    _drink_labels(settings, "recipe")
+
+
+def build_nutriscore(settings: dict, out_dir: Path) -> None:
+    from webapp_mangetamain.nutriscore_analyzer import (
+        add_nutriscore_column,
+        filter_data_with_nutri,
+        parse_nutrition,
+    )
+    from webapp_mangetamain.utils.filter_data import separate_foods_drinks
+
+    recipes = _dataset(settings, "recipe")
+    nutrition_df = parse_nutrition(recipes, _parsed(settings, "recipe"))
+    food_recipes, _ = separate_foods_drinks(recipes, drink_labels=_drink_labels(settings, "recipe"))
+
+    directory = out_dir / "nutriscore"
+    directory.mkdir()
+    add_nutriscore_column(filter_data_with_nutri(nutrition_df)).to_parquet(directory / "scored.parquet")
+    add_nutriscore_column(
+        filter_data_with_nutri(nutrition_df.loc[food_recipes.index])
+    ).to_parquet(directory / "scored_food.parquet")
+
+
+def build_tag_statistics(settings: dict, out_dir: Path) -> None:
+    from webapp_mangetamain.tag_analyzer import create_tag_recipes_dataset
+
+    tag_stats, _ = create_tag_recipes_dataset(
+        _dataset(settings, "recipe_rating"), settings["params"]["min_recipes_per_tag"],
+        parsed=_parsed(settings, "recipe_rating"),
+    )
+    directory = out_dir / "tag_statistics"
+    directory.mkdir()
+    tag_stats.to_parquet(directory / "tag_stats.parquet")
+
+
+def build_ingredient_cube(settings: dict, out_dir: Path) -> None:
+    from webapp_mangetamain.utils.ingredient_cube import save_ingredient_cube
+
+    save_ingredient_cube(_context(settings).ingredient_cube, out_dir / "ingredient_cube")
+
+
+def build_cooccurrence(settings: dict, out_dir: Path) -> None:
+    from webapp_mangetamain.utils.ingredient_data_process import generate_matrix
+
+    params = settings["params"]
+    generate_matrix(
+        min_count=params["min_count"], max_count=params["max_count"], min_co=params["min_co"],
+        output_dir=out_dir, context=_context(settings),
+    )
+
+
+def build_streamed(settings: dict, out_dir: Path) -> None:
+    from webapp_mangetamain.nutriscore_analyzer import compute_nutriscore_batch
+    from webapp_mangetamain.utils.streaming import stream_recipes
+
+    params = settings["params"]
+    stream_recipes(
+        settings["sources"]["recipe"], out_dir / "streamed", params["nutrient_labels"],
+        chunk_rows=params["stream_chunk_rows"], nutrition_limits=params["nutrition_limits"],
+        score=compute_nutriscore_batch, drink_keywords=params["drink_keywords"],
+        drink_false_positives=params["drink_false_positives"], food_keywords=params["food_keywords"],
+        trim_quantile=params["trim_quantile"], trim_mode=params["trim_mode"], bins=params["histogram_bins"],
+    )
+
+
+_TRIMMING = ("trim_quantile", "trim_mode")
+_NUTRISCORE = ("nutrition_limits", "nutriscore_thresholds", "nutriscore_grades")
+
+STAGES = [
+    Stage("parsed", build_parsed, sources=("recipe", "recipe_rating"), params=("nutrition_width",)),
+    Stage("drink_labels", build_drink_labels, deps=("parsed",), sources=("recipe",),
+          params=("drink_keywords", "drink_false_positives", "food_keywords")),
+    Stage("nutriscore", build_nutriscore, deps=("parsed", "drink_labels"), sources=("recipe",),
+          params=_NUTRISCORE),
+    Stage("tag_statistics", build_tag_statistics, deps=("parsed",), sources=("recipe_rating",),
+          params=("min_recipes_per_tag",)),
+    Stage("ingredient_cube", build_ingredient_cube, deps=("parsed",), sources=("recipe",), params=_TRIMMING),
+    Stage("cooccurrence", build_cooccurrence, deps=("parsed",), sources=("recipe",),
+          params=_TRIMMING + ("min_count", "max_count", "min_co")),
+]
+
+OPTIONAL_STAGES = [
+    Stage("streamed", build_streamed, sources=("recipe",),
+          params=_TRIMMING + _NUTRISCORE + ("nutrient_labels", "drink_keywords", "drink_false_positives",
+                                            "food_keywords", "stream_chunk_rows", "histogram_bins")),
+]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="mangetamain-build",
+        description="Build the derived datasets of the app; only stale stages are rebuilt.",
+    )
+    parser.add_argument("stages", nargs="*", metavar="STAGE",
+                        help=f"stages to build with their dependencies (default: all of {', '.join(s.name for s in STAGES)}; "
+                             f"optional: {', '.join(s.name for s in OPTIONAL_STAGES)})")
+    parser.add_argument("--artifacts-dir", default=load_config.ARTIFACTS_DIR)
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="rebuild the selected stages even if fresh")
+    parser.add_argument("--dry-run", action="store_true", help="only report which stages are stale")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        status = build(
+            STAGES + OPTIONAL_STAGES, load_config.artifact_settings(), load_config.dataset_fingerprints(),
+            args.artifacts_dir, jobs=args.jobs, force=args.force,
+            only=args.stages or [stage.name for stage in STAGES], dry_run=args.dry_run,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+    for name, state in status.items():
+        logger.info("%-16s %s", name, state)
+    return 1 if any(state in ("failed", "skipped") for state in status.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
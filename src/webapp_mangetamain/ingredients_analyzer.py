@@ -1,28 +1,39 @@
+import logging
+
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import pandas as pd
 
+from webapp_mangetamain.utils.figures import subplots
+from webapp_mangetamain.utils.profiling import instrument
+
+logger = logging.getLogger(__name__)
+
+
+@instrument
 def plot_ingredient_per_recette(ingredients_exploded: pd.DataFrame):
     counts_per_recipe = ingredients_exploded.groupby("id")["ingredients"].nunique()
-    fig1, ax1 = plt.subplots(figsize=(7, 3))
+    fig1, ax1 = subplots(figsize=(7, 3))
     sns.histplot(counts_per_recipe, bins=30, kde=True, color="skyblue", ax=ax1)
     ax1.set_xlabel("Number of ingredients per recipe")
     ax1.set_ylabel("Number of recipes")
     return fig1
 
 
+@instrument
 def plot_ingredient_distribution(ingredient_counts: pd.DataFrame):
     """
     Return matplotlib figure: log-scaled boxplot of ingredient frequencies.
     """
-    fig, ax = plt.subplots(figsize=(7, 4))
+    fig, ax = subplots(figsize=(7, 4))
     sns.histplot(np.log1p(ingredient_counts["count"].values), bins=50, kde=True, color="salmon", ax=ax)
     ax.set_title("Log distribution of ingredient frequencies")
     ax.set_xlabel("log(1 + frequency)")
     return fig
 
 
+@instrument
 def summarize_ingredient_stats(ingredient_counts: pd.DataFrame) -> pd.DataFrame:
     """
     Compute and return quantile summary (describe + percentiles).
@@ -34,6 +45,7 @@ def summarize_ingredient_stats(ingredient_counts: pd.DataFrame) -> pd.DataFrame:
     return pd.DataFrame(quantiles).T.round(2)
 
 
+@instrument
 def make_top_ingredients_bar_fig(ingredient_counts: pd.DataFrame, top_n: int = 30) -> plt.Figure:
     """
     Affiche un barplot des ingrédients les plus fréquents.
@@ -44,7 +56,7 @@ def make_top_ingredients_bar_fig(ingredient_counts: pd.DataFrame, top_n: int = 3
     """
     top_df = ingredient_counts.nlargest(top_n, "count")
 
-    fig, ax = plt.subplots(figsize=(8, max(4, top_n * 0.25)))
+    fig, ax = subplots(figsize=(8, max(4, top_n * 0.25)))
     sns.barplot(
         data=top_df,
         y="ingredients",
@@ -55,24 +67,36 @@ def make_top_ingredients_bar_fig(ingredient_counts: pd.DataFrame, top_n: int = 3
     ax.set_title(f"Top {top_n} most frequent ingredients", fontsize=13, pad=10)
     ax.set_xlabel("Number of occurrences")
     ax.set_ylabel("")
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 
+@instrument
 def make_counts_boxplot_fig(ingredient_counts: pd.DataFrame) -> plt.Figure:
     """
     Boxplot log des fréquences d'ingrédients pour visualiser la distribution.
     """
-    fig, ax = plt.subplots(figsize=(6, 3))
+    fig, ax = subplots(figsize=(6, 3))
     sns.boxplot(x=np.log1p(ingredient_counts["count"]), ax=ax, color="lightblue")
     ax.set_title("Log distribution of ingredient counts")
     ax.set_xlabel("log(1 + count)")
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 
-def top_cooccurrences_for(ingredient, jaccard, co_occurrence, k=15, min_co=20):
+@instrument
+def top_cooccurrences_for(ingredient, jaccard, co_occurrence=None, k=15, min_co=20):
+    """
+    Top k ingredients by Jaccard score with `ingredient`, among those
+    co-occurring at least min_co times.
+    `jaccard` is either the square Jaccard DataFrame (with the square
+    `co_occurrence` DataFrame) or, alone, a NeighborIndex or
+    CooccurrenceMatrices artifact (utils/cooccurrence.py).
+    """
     ing = ingredient.lower().strip()
+    if not isinstance(jaccard, pd.DataFrame):
+        return _top_cooccurrences_from_index(ing, jaccard, k, min_co)
+
     if ing not in jaccard.index:
         print(f"'{ingredient}' n'existe pas dans la matrice.")
         return pd.DataFrame()
@@ -94,18 +118,29 @@ def top_cooccurrences_for(ingredient, jaccard, co_occurrence, k=15, min_co=20):
     )
     return out
 
+
+def _top_cooccurrences_from_index(ing: str, index, k: int, min_co: int) -> pd.DataFrame:
+    pos = index.index_of(ing)
+    if pos is None:
+        logger.warning("'%s' is not in the co-occurrence matrix", ing)
+        return pd.DataFrame()
+
+    others, score, co = index.top_neighbors(pos, k, min_co)
+    return pd.DataFrame({"other": others, "score": score.astype(float), "co": np.asarray(co)})
+
+@instrument
 def make_association_bar_fig(df_pairs: pd.DataFrame, title: str, x: str = "lift") -> plt.Figure:
     """
     Barplot horizontal des associations (x = 'lift' ou 'P(B|A)').
     """
     if df_pairs.empty:
-        fig, ax = plt.subplots(figsize=(6, 0.5))
+        fig, ax = subplots(figsize=(6, 0.5))
         ax.text(0.5, 0.5, "No data", ha="center", va="center")
         ax.axis("off")
         return fig
 
     df_plot = df_pairs.sort_values([x, "co"], ascending=[False, False])
-    fig, ax = plt.subplots(figsize=(7.5, 5))
+    fig, ax = subplots(figsize=(7.5, 5))
     sns.barplot(data=df_plot, y="other", x=x, ax=ax)
     ax.set_xlabel(x)
     ax.set_ylabel("Ingredient")
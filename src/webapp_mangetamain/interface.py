@@ -2,8 +2,8 @@
 import logging
 
 import ingredients_analyzer
+import pandas as pd
 import streamlit as st
-import utils.filter_data as filter_data
 from nutriscore_analyzer import (
     add_nutriscore_column,
     analyze_low_scores_with_health_label,
@@ -27,14 +27,111 @@ from tag_analyzer import (
     plot_top_tags_by_metric,
 )
 
-from local_food import plot_cuisine_distributions, plot_top_ingredients_by_continent
-
-from utils.filter_data import recipes_clean, separate_foods_drinks
+from local_food import (
+    make_top_ingredients_by_continent_fig,
+    plot_cuisine_distributions,
+    top_ingredients_by_continent,
+)
 
-from webapp_mangetamain.load_config import recipe, recipe_rating
+import webapp_mangetamain.load_config as load_config
+from webapp_mangetamain.load_config import dataset_fingerprint
+from webapp_mangetamain.utils.compute_cache import cache_computation
+from webapp_mangetamain.utils.figure_cache import config_digest, render_figures, show_figure, show_image
+from webapp_mangetamain.utils.profiling import PROFILER, span
+from webapp_mangetamain.utils.schema import memory_report
 
 logger = logging.getLogger(__name__)
 
+# Only the fingerprints are computed at import: the datasets themselves
+# (load_config.recipe, ...) and utils.filter_data, whose import prepares the
+# ingredient and continent tables, are loaded by the first page needing them.
+RECIPE_FINGERPRINT = dataset_fingerprint("recipe")
+RECIPE_RATING_FINGERPRINT = dataset_fingerprint("recipe_rating")
+# hash of the config.json sections shaping the analyses (Nutri-Score
+# thresholds, food/drink keywords...), so disk-persisted results are not
+# served after a config edit
+CONFIG_DIGEST = config_digest(load_config.cfg)
+
+
+# ========================
+# Cached computations
+# ========================
+# Shared by every session; the fingerprint argument ties each result to the
+# content of the dataset it was computed from, the config argument to
+# CONFIG_DIGEST.
+
+@cache_computation
+def compute_nutriscore_data(fingerprint: str, config: str) -> dict:
+    """Nutrition table and Nutri-Scores of all recipes and of food recipes only."""
+    from utils.filter_data import separate_foods_drinks
+
+    nutrition_df = parse_nutrition(load_config.recipe, load_config.recipe_parsed)
+    food_recipes, drink_recipes = separate_foods_drinks(
+        load_config.recipe, drink_labels=load_config.get_drink_labels("recipe")
+    )
+    prebuilt = load_config.prebuilt("nutriscore")
+    if prebuilt is not None:
+        scored_df = pd.read_parquet(prebuilt / "scored.parquet")
+        scored_df_food = pd.read_parquet(prebuilt / "scored_food.parquet")
+    else:
+        scored_df = add_nutriscore_column(filter_data_with_nutri(nutrition_df))
+        scored_df_food = add_nutriscore_column(filter_data_with_nutri(nutrition_df.loc[food_recipes.index]))
+    return {
+        "nutrition_df": nutrition_df,
+        "scored_df": scored_df,
+        "food_index": food_recipes.index,
+        "n_drinks": len(drink_recipes),
+        "scored_df_food": scored_df_food,
+    }
+
+
+@cache_computation
+def compute_general_tag_statistics(fingerprint: str, config: str) -> tuple[dict, pd.Series, pd.Series]:
+    """General tag statistics, tag counts and number of tags per recipe."""
+    stats = get_general_tags_statistics(load_config.recipe_rating, load_config.recipe_rating_parsed)
+    return stats, stats['tag_counts'], stats['tags_per_recipe']
+
+
+@cache_computation
+def compute_tag_stats(fingerprint: str, config: str, min_recipes_per_tag: int = 50) -> pd.DataFrame:
+    """Per-tag metrics of tags used by at least min_recipes_per_tag recipes."""
+    prebuilt = load_config.prebuilt("tag_statistics")
+    if prebuilt is not None and min_recipes_per_tag == load_config.artifact_settings()["params"]["min_recipes_per_tag"]:
+        return pd.read_parquet(prebuilt / "tag_stats.parquet")
+    tag_stats, _ = create_tag_recipes_dataset(
+        load_config.recipe_rating.copy(deep=False), min_recipes_per_tag,
+        parsed=load_config.recipe_rating_parsed
+    )
+    return tag_stats
+
+
+@cache_computation
+def compute_ingredient_overview(fingerprint: str, trimming: tuple) -> dict:
+    """Global figures of the ingredient tab (trimming: TRIM_MODE and TRIM_QUANTILE of filter_data)."""
+    import utils.filter_data as filter_data
+
+    return {
+        "n_recipes": filter_data.ingredients_exploded["id"].nunique(),
+        "n_unique_ingredients": filter_data.ingredient_counts.shape[0],
+        "mean_ingredients_per_recipe": (
+            filter_data.ingredients_exploded.groupby("id")["ingredients"].nunique().mean()
+        ),
+    }
+
+
+@cache_computation
+def compute_top_ingredients_by_continent(fingerprint: str, trimming: tuple, top_n: int,
+                                        global_threshold: float) -> pd.DataFrame:
+    """
+    Characteristic ingredients per continent for the given slider values
+    (trimming: TRIM_MODE and TRIM_QUANTILE of filter_data).
+    """
+    import utils.filter_data as filter_data
+
+    return top_ingredients_by_continent(
+        filter_data.ingredient_cube, top_n=top_n, global_threshold=global_threshold
+    )
+
 
 def render_nutriscore_tab():
     """Render the Nutriscore tab content in Streamlit."""
@@ -68,18 +165,18 @@ def render_nutriscore_tab():
     First, we can observe the different Nutri-Score values and their correlations with each other.
     We already notice that certain categories emerge: the correlations are stronger between calories, sugar, and fat. These negative values are what primarily lower the score.
     """)
-    nutrition_df = parse_nutrition(recipe)
+    nutriscore_data = compute_nutriscore_data(RECIPE_FINGERPRINT, CONFIG_DIGEST)
+    nutrition_df = nutriscore_data["nutrition_df"]
     st.subheader("Correlation Matrix of Nutrients")
-    st.pyplot(correlation_matrix(nutrition_df))
+    show_figure(RECIPE_FINGERPRINT, correlation_matrix, data=(nutrition_df,))
 
     # ------------------------
     # Compare with 'healthy' tag
     # ------------------------
-    filtered_df = filter_data_with_nutri(nutrition_df)
-    scored_df = add_nutriscore_column(filtered_df)
+    scored_df = nutriscore_data["scored_df"]
 
     st.subheader("Comparison with 'health' tagged recipes")
-    plot_nutriscore_comparison(scored_df, recipe)
+    plot_nutriscore_comparison(scored_df, load_config.recipe, load_config.recipe_parsed)
     st.markdown("""
         **Something is wrong!**
 
@@ -103,14 +200,12 @@ def render_nutriscore_tab():
         Therefore, we focus exclusively on food items, filtering our data and recommendations accordingly.
         """
     )
-    food_recipes, drink_recipes = separate_foods_drinks(recipe)
+    food_recipes = load_config.recipe.loc[nutriscore_data["food_index"]]
     st.subheader("Recipe Statistics")
     st.write(f"**Food recipes:** {len(food_recipes)}")
-    st.write(f"**Drink recipes:** {len(drink_recipes)}")
-    food_nutrition_df = nutrition_df.loc[food_recipes.index]
-    filtered_df_food = filter_data_with_nutri(food_nutrition_df)
-    scored_df_food = add_nutriscore_column(filtered_df_food)
-    plot_nutriscore_comparison(scored_df_food, food_recipes)
+    st.write(f"**Drink recipes:** {nutriscore_data['n_drinks']}")
+    scored_df_food = nutriscore_data["scored_df_food"]
+    plot_nutriscore_comparison(scored_df_food, food_recipes, load_config.recipe_parsed)
     st.markdown("""
         **Something is still wrong!**
 
@@ -120,7 +215,7 @@ def render_nutriscore_tab():
         - Incorrectly entered values,
         - Whether the data is standardized (e.g., per 100g).
         """)
-    analyze_low_scores_with_health_label(recipe_df=food_recipes, nutrition_df=scored_df_food)
+    analyze_low_scores_with_health_label(recipe_df=food_recipes, nutrition_df=scored_df_food, parsed=load_config.recipe_parsed)
 
 def render_tags_tab():
     """Render the Tags tab content."""
@@ -131,7 +226,7 @@ def render_tags_tab():
     # ========================
     st.markdown("---")
     st.write("### General Tag Statistics")
-    stats = get_general_tags_statistics(recipe_rating)
+    stats, tag_counts, tags_per_recipe = compute_general_tag_statistics(RECIPE_RATING_FINGERPRINT, CONFIG_DIGEST)
     # Key metrics
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Total Recipes", f"{stats['total_recipes']:,}")
@@ -166,7 +261,6 @@ def render_tags_tab():
 
     # Graph 1: Tag frequency first
     st.write("#### Tag Frequency Distribution")
-    tag_counts = recipe_rating['tags_parsed'].explode().value_counts()
     plot_tag_frequency_distribution(tag_counts)
     st.info("Power law distribution: few tags used very frequently, many tags used rarely")
 
@@ -177,7 +271,7 @@ def render_tags_tab():
 
     # Graph 3: Distribution per recipe
     st.write("#### Distribution of Tags per Recipe")
-    plot_tags_per_recipe_distribution(recipe_rating)
+    plot_tags_per_recipe_distribution(tags_per_recipe=tags_per_recipe)
     st.info("Most recipes have between 13-22 tags. Mean: 17.9, Median: 17.0")
 
     # ========================
@@ -185,7 +279,7 @@ def render_tags_tab():
     # ========================
     st.markdown("---")
     st.write("### Tags Analysis by Metrics")
-    tag_stats, _ = create_tag_recipes_dataset(recipe_rating, min_recipes_per_tag=50)
+    tag_stats = compute_tag_stats(RECIPE_RATING_FINGERPRINT, CONFIG_DIGEST, min_recipes_per_tag=50)
     st.info(f"Analyzing **{len(tag_stats)}** tags with at least 50 recipes")
     tags_of_interest = filter_tags_of_interest(tag_stats)
     st.success(f"Found **{len(tags_of_interest)}** tags of interest across **{tags_of_interest['category'].nunique()}** categories")
@@ -227,14 +321,18 @@ def render_ingredient_tab():
     """
     ingredients_exploded: DataFrame avec colonnes ['id','ingredients'] (déjà normalisées)
     """
+    import utils.filter_data as filter_data
+
+    # the tables of this tab depend on the complexity trimming
+    trimming = (filter_data.TRIM_MODE, filter_data.TRIM_QUANTILE)
+
     st.header("Ingredients")
 
     # === 1) Statistiques globales ===
-    n_recettes = filter_data.ingredients_exploded["id"].nunique()
-    n_ingredients_uniques = filter_data.ingredient_counts.shape[0]
-    mean_ingredients_per_recipe = (
-        filter_data.ingredients_exploded.groupby("id")["ingredients"].nunique().mean()
-    )
+    overview = compute_ingredient_overview(RECIPE_FINGERPRINT, trimming)
+    n_recettes = overview["n_recipes"]
+    n_ingredients_uniques = overview["n_unique_ingredients"]
+    mean_ingredients_per_recipe = overview["mean_ingredients_per_recipe"]
 
     col1, col2, col3 = st.columns(3)
     col1.metric("Unique ingredients", f"{n_ingredients_uniques:,}")
@@ -244,7 +342,8 @@ def render_ingredient_tab():
     st.divider()
     # ===== 2) Distribution & résumé =====
     st.subheader("Distribution of the number of ingredients per recipe")
-    st.pyplot(ingredients_analyzer.plot_ingredient_per_recette(filter_data.ingredients_exploded))
+    show_figure(RECIPE_FINGERPRINT, ingredients_analyzer.plot_ingredient_per_recette,
+                data=(filter_data.ingredients_exploded,), key=trimming)
     st.markdown("""
     The number of ingredients per recipe generally ranges between **5 and 12**, with a peak around **8 ingredients**.
     This indicates that most recipes are **moderately complex**: not extremely simple, but not overly elaborate either.
@@ -260,7 +359,8 @@ def render_ingredient_tab():
     st.subheader("Ingredient Frequency Distribution")
     ingredient_counts = filter_data.ingredient_counts
     st.dataframe(ingredients_analyzer.summarize_ingredient_stats(ingredient_counts))
-    st.pyplot(ingredients_analyzer.plot_ingredient_distribution(ingredient_counts))
+    show_figure(RECIPE_FINGERPRINT, ingredients_analyzer.plot_ingredient_distribution, data=(ingredient_counts,),
+                key=trimming)
     st.markdown("""
     The ingredient frequency follows a **long-tail distribution**:
     - A **small set of ingredients** (e.g., *salt, butter, sugar, onion*) appears extremely frequently,
@@ -275,7 +375,8 @@ def render_ingredient_tab():
 
     st.subheader("Most Frequent Ingredients")
     top_n = st.slider("Display the top N most frequent ingredients", 10, 100, 30, 5)
-    st.pyplot(ingredients_analyzer.make_top_ingredients_bar_fig(ingredient_counts, top_n))
+    show_figure(RECIPE_FINGERPRINT, ingredients_analyzer.make_top_ingredients_bar_fig, top_n, data=(ingredient_counts,),
+                key=trimming)
     st.markdown("""
     The top ingredients include:
     **salt, butter, sugar, onion, eggs, olive oil, flour, garlic, milk, pepper**.
@@ -355,9 +456,10 @@ def render_ingredient_tab():
     - Understanding cuisine profiles
     - Exploring ingredient roles in recipes
     """)
+    neighbor_index = filter_data.get_neighbor_index()
     c1, c2 = st.columns([2, 1])
     with c1:
-        focus = st.selectbox("Select an ingredient", sorted(filter_data.co_occurrence.columns.to_list()))
+        focus = st.selectbox("Select an ingredient", neighbor_index.labels.tolist())
     with c2:
         k = st.slider("Top K", 5, 40, 15)
 
@@ -365,16 +467,21 @@ def render_ingredient_tab():
     metric = st.radio("Mesure", ["Jaccard"], horizontal=True)
 
     if metric == "Jaccard":
-        assoc = ingredients_analyzer.top_cooccurrences_for(focus, filter_data.jaccard, filter_data.co_occurrence, k=k, min_co=min_co_focus)
+        assoc = ingredients_analyzer.top_cooccurrences_for(focus, neighbor_index, k=k, min_co=min_co_focus)
         x_field, title = "score", f"Top neighbors Jaccard avec '{focus}'"
 
 
-    st.pyplot(ingredients_analyzer.make_association_bar_fig(assoc, title, x=x_field))
+    show_figure(RECIPE_FINGERPRINT, ingredients_analyzer.make_association_bar_fig, title, x=x_field,
+                data=(assoc,), key=(focus, k, min_co_focus) + trimming)
     st.dataframe(assoc)
 
 def render_complexity_tab():
-    df = recipes_clean
     """Render the Complexity tab content in Streamlit."""
+    import utils.filter_data as filter_data
+
+    df = filter_data.recipes_clean
+    # recipes_clean depends on the complexity trimming
+    trimming = (filter_data.TRIM_MODE, filter_data.TRIM_QUANTILE)
     st.header("Complexity")
     st.markdown(
         """
@@ -391,11 +498,14 @@ def render_complexity_tab():
     )
 
     col1, col2 = st.columns(2)
-    hist_fig, box_fig = make_univariate_figs(df, feature, hue=("kind" if "kind" in df.columns else None))
+    hist_png, box_png = render_figures(
+        RECIPE_FINGERPRINT, make_univariate_figs, feature, hue=("kind" if "kind" in df.columns else None), data=(df,),
+        key=trimming,
+    )
     with col1:
-        st.pyplot(hist_fig)
+        show_image(hist_png)
     with col2:
-        st.pyplot(box_fig)
+        show_image(box_png)
     if feature == "minutes":
         st.markdown("""
     ###Univariate Analysis — Preparation Time (`minutes`)
@@ -436,8 +546,8 @@ def render_complexity_tab():
 
     st.subheader("Relationships between features")
     features_rel = ["log_minutes", "n_steps", "n_ingredients"]
-    pair_fig = make_pairplot_fig(df, features_rel, hue=("kind" if "kind" in df.columns else None))
-    st.pyplot(pair_fig)
+    show_figure(RECIPE_FINGERPRINT, make_pairplot_fig, features_rel,
+                hue=("kind" if "kind" in df.columns else None), data=(df,), key=trimming)
     st.markdown("""
     ### Relationships Between Complexity Features
 
@@ -458,8 +568,8 @@ def render_complexity_tab():
     """)
 
     st.subheader("Correlation matrix")
-    corr_fig = make_corr_heatmap_fig(df, features_rel, "Correlation (log_minutes, n_steps, n_ingredients)")
-    st.pyplot(corr_fig)
+    show_figure(RECIPE_FINGERPRINT, make_corr_heatmap_fig, features_rel,
+                "Correlation (log_minutes, n_steps, n_ingredients)", data=(df,), key=trimming)
     st.markdown("""
     ### Correlation Matrix — Summary
 
@@ -490,17 +600,20 @@ def render_local_food_tab():
     """
     Streamlit Tab: Analysis of cuisines by continent.
     """
+    import utils.filter_data as filter_data
+
     st.header("Cuisine Analysis by Continent")
 
     # === Load data ===
     recipes_with_continent = filter_data.recipes_with_continent
-    ingredient_and_continent = filter_data.ingredient_and_continent
+    # the tables of this tab depend on the complexity trimming
+    trimming = (filter_data.TRIM_MODE, filter_data.TRIM_QUANTILE)
 
     st.caption(f"Total number of recipes: **{len(recipes_with_continent):,}**")
 
     # === 1) Distribution plots ===
     st.subheader("Distribution of recipe complexity by continent")
-    st.pyplot(plot_cuisine_distributions(recipes_with_continent))
+    show_figure(RECIPE_FINGERPRINT, plot_cuisine_distributions, data=(recipes_with_continent,), key=trimming)
 
     st.markdown("""
     **Interpretation:**
@@ -529,12 +642,14 @@ def render_local_food_tab():
         f"are excluded to avoid global staples like *salt*, *water*, or *sugar*."
     )
 
-    st.pyplot(
-        plot_top_ingredients_by_continent(
-            ingredient_and_continent,
-            top_n=top_n,
-            global_threshold=threshold
-        )
+    top_by_continent = compute_top_ingredients_by_continent(RECIPE_FINGERPRINT, trimming, top_n, threshold)
+    show_figure(
+        RECIPE_FINGERPRINT,
+        make_top_ingredients_by_continent_fig,
+        top_n=top_n,
+        global_threshold=threshold,
+        data=(top_by_continent,),
+        key=trimming,
     )
 
     st.markdown("""
@@ -556,28 +671,90 @@ def render_local_food_tab():
     )
 
 
-def main():
-    """Main function to run the MangeTaMain Dashboard."""
-    # App title
-    st.title("MangeTaMain Dashboard")
+def render_diagnostics_tab():
+    """Hidden page (?page=diagnostics): time and memory of the instrumented functions."""
+    st.header("Diagnostics")
+    st.caption(
+        "Spans recorded by utils.profiling for this server process, all sessions included. "
+        "Cached computations only appear when they are actually computed."
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        enabled = st.toggle("Record spans", value=PROFILER.enabled)
+    with col2:
+        trace_memory = st.toggle("Trace allocations (slower)", value=PROFILER.trace_memory)
+    PROFILER.configure(enabled=enabled, trace_memory=trace_memory)
+
+    import utils.filter_data as filter_data
+
+    st.subheader("Frames in memory")
+    frames = {f"load_config.{name}": df for name, df in load_config.loaded_datasets().items()}
+    frames.update({f"filter_data.{name}": df for name, df in filter_data.get_context().loaded_tables().items()})
+    if frames:
+        st.dataframe(memory_report(frames), width="stretch")
+        st.caption("Frames sharing columns (e.g. shallow copies) are counted in each of them.")
+    else:
+        st.info("No dataset loaded yet.")
+
+    st.subheader("Spans")
+    snapshot = PROFILER.snapshot()
+    if not snapshot:
+        st.info("No span recorded yet: enable recording, then open the other pages.")
+        return
+
+    spans = pd.DataFrame(snapshot).set_index("span")
+    spans["peak_alloc_max_mb"] = spans.pop("peak_alloc_max_bytes") / 2**20
+    st.dataframe(spans, width="stretch")
 
-    # Create tabs
-    tab1, tab2, tab3, tab4 , tab5 = st.tabs(["Nutriscore", "Tags", "Ingredient", "Complexity", "Local Food"])
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("Download JSON", PROFILER.to_json(), "spans.json", "application/json")
+    with col2:
+        st.download_button("Download Prometheus", PROFILER.to_prometheus(), "spans.prom", "text/plain")
+    with col3:
+        if st.button("Reset"):
+            PROFILER.reset()
+            st.rerun()
+    if PROFILER.dump_dir is not None:
+        st.caption(f"Both files are also written to `{PROFILER.dump_dir}` after each rerun.")
 
-    with tab1:
-        render_nutriscore_tab()
 
-    with tab2:
-        render_tags_tab()
+PAGES = {
+    "Nutriscore": render_nutriscore_tab,
+    "Tags": render_tags_tab,
+    "Ingredient": render_ingredient_tab,
+    "Complexity": render_complexity_tab,
+    "Local Food": render_local_food_tab,
+}
 
-    with tab3:
-        render_ingredient_tab()
 
-    with tab4:
-        render_complexity_tab()
+def main():
+    """Main function to run the MangeTaMain Dashboard."""
+    # App title
+    st.title("MangeTaMain Dashboard")
+
+    # not listed in the section selector
+    if st.query_params.get("page") == "diagnostics":
+        render_diagnostics_tab()
+        return
+
+    # Unlike st.tabs, which runs every tab on each rerun, only the selected
+    # page is rendered; the selection is mirrored in the URL (?page=...).
+    if "page" not in st.session_state and st.query_params.get("page") in PAGES:
+        st.session_state["page"] = st.query_params["page"]
+    page = st.radio(
+        "Section",
+        list(PAGES),
+        horizontal=True,
+        label_visibility="collapsed",
+        key="page",
+    )
+    st.query_params["page"] = page
 
-    with tab5:
-        render_local_food_tab()
+    with span(f"interface.page.{page}"):
+        PAGES[page]()
+    if PROFILER.enabled:
+        PROFILER.dump()
 
 
 if __name__ == "__main__":
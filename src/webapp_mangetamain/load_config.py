@@ -1,9 +1,18 @@
 """Load config from config.json"""
 import json
 import os
+from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
+from webapp_mangetamain.utils.artifacts import fresh_output
+from webapp_mangetamain.utils.dataset_cache import DEFAULT_CACHE_DIR, source_fingerprint
+from webapp_mangetamain.utils.food_drink import load_drink_labels
+from webapp_mangetamain.utils.ingestion import ParsedRecipes, load_parsed_recipes
+from webapp_mangetamain.utils.profiling import PROFILER
+from webapp_mangetamain.utils.schema import load_compact_dataset
+
 class Config:
     """Simple config loader that allows attribute-style access."""
 
@@ -26,5 +35,132 @@ CONFIG_PATH = os.path.abspath(CONFIG_PATH)
 
 cfg = Config.from_json(CONFIG_PATH)
 
-recipe = pd.read_csv(cfg.data_path)
-recipe_rating = pd.read_csv(cfg.data_rating_path)
+CACHE_DIR = getattr(cfg, "cache_dir", DEFAULT_CACHE_DIR)
+ARTIFACTS_DIR = getattr(cfg, "artifacts_dir", "artifacts")
+
+# the raw tags/ingredients/steps/nutrition strings are not kept in memory:
+# every analysis reads them from the parsed columns (get_parsed)
+DROP_RAW_LISTS = getattr(cfg, "drop_raw_list_columns", True)
+
+# spans are recorded if config.json or MANGETAMAIN_PROFILING turns them on
+_profiling = getattr(cfg, "profiling", None)
+PROFILER.configure(
+    enabled=PROFILER.enabled or getattr(_profiling, "enabled", False),
+    trace_memory=PROFILER.trace_memory or getattr(_profiling, "trace_memory", False),
+    dump_dir=getattr(_profiling, "dump_dir", None),
+)
+
+# module attribute -> config key holding the CSV path
+DATASETS = {
+    "recipe": "data_path",
+    "recipe_rating": "data_rating_path",
+}
+
+_datasets: dict[str, pd.DataFrame] = {}
+_drink_labels: dict[str, np.ndarray] = {}
+
+
+def get_dataset(name: str) -> pd.DataFrame:
+    """
+    Return the dataset registered under ``name`` in ``DATASETS``.
+
+    Each source file is parsed once (and cached on disk as Parquet) and
+    held with the compact dtypes of ``utils.schema``; with DROP_RAW_LISTS
+    its list columns are only available through ``get_parsed(name)``. Keys
+    sharing a path get their own shallow copy so adding a column to one
+    does not leak into the other.
+    """
+    if name not in _datasets:
+        path = getattr(cfg, DATASETS[name])
+        _datasets[name] = load_compact_dataset(path, CACHE_DIR, drop_lists=DROP_RAW_LISTS).copy(deep=False)
+    return _datasets[name]
+
+
+def loaded_datasets() -> dict[str, pd.DataFrame]:
+    """Datasets already loaded in this process, by name."""
+    return dict(_datasets)
+
+
+def dataset_fingerprint(name: str) -> str:
+    """Return the content hash of the source file of dataset ``name``."""
+    return source_fingerprint(getattr(cfg, DATASETS[name]), CACHE_DIR)
+
+
+def get_parsed(name: str) -> ParsedRecipes:
+    """
+    Return the pre-parsed tags/ingredients/steps/nutrition of dataset
+    ``name``, aligned with the positional index of ``get_dataset(name)``.
+    """
+    path = getattr(cfg, DATASETS[name])
+    return load_parsed_recipes(path, CACHE_DIR, nutrition_width=len(cfg.nutrient_labels))
+
+
+def get_drink_labels(name: str) -> np.ndarray:
+    """
+    Return the drink (True) / food (False) label of each recipe of dataset
+    ``name``, by position. The labels depend on the DRINK_KEYWORDS,
+    DRINK_FALSE_POSITIVES and FOOD_KEYWORDS of the config and are persisted
+    in the cache directory.
+    """
+    if name not in _drink_labels:
+        _drink_labels[name] = load_drink_labels(
+            getattr(cfg, DATASETS[name]), get_parsed(name).tags,
+            cfg.DRINK_KEYWORDS, cfg.DRINK_FALSE_POSITIVES, cfg.FOOD_KEYWORDS,
+            cache_dir=CACHE_DIR,
+        )
+    return _drink_labels[name]
+
+
+def dataset_fingerprints() -> dict[str, str]:
+    """Content hash of every dataset of ``DATASETS``."""
+    return {name: dataset_fingerprint(name) for name in DATASETS}
+
+
+def artifact_settings() -> dict:
+    """
+    Settings of the offline artifact build (``build_artifacts``): the dataset
+    paths and the config values the derived datasets depend on.
+    """
+    trimming = getattr(cfg, "complexity_trimming", None)
+    cooccurrence = getattr(cfg, "cooccurrence", None)
+    streaming = getattr(cfg, "streaming", None)
+    return {
+        "sources": {name: getattr(cfg, key) for name, key in DATASETS.items()},
+        "cache_dir": CACHE_DIR,
+        "params": {
+            "nutrition_width": len(cfg.nutrient_labels),
+            "drink_keywords": list(cfg.DRINK_KEYWORDS),
+            "drink_false_positives": list(cfg.DRINK_FALSE_POSITIVES),
+            "food_keywords": list(cfg.FOOD_KEYWORDS),
+            "trim_quantile": getattr(trimming, "quantile", 0.99),
+            "trim_mode": getattr(trimming, "mode", "sequential"),
+            "min_recipes_per_tag": 50,
+            "min_count": getattr(cooccurrence, "min_count", 100),
+            "max_count": getattr(cooccurrence, "max_count", 5000),
+            "min_co": getattr(cooccurrence, "min_co", 10),
+            "nutrient_labels": list(cfg.nutrient_labels),
+            "nutrition_limits": {k: dict(v.__dict__) for k, v in cfg.NUTRITION_LIMITS.__dict__.items()},
+            "nutriscore_thresholds": {k: list(v) for k, v in cfg.THRESHOLDS.__dict__.items()},
+            "nutriscore_grades": dict(cfg.NUTRISCORE.__dict__),
+            "stream_chunk_rows": getattr(streaming, "chunk_rows", 100_000),
+            "histogram_bins": getattr(streaming, "histogram_bins", 50),
+        },
+    }
+
+
+def prebuilt(stage: str) -> Path | None:
+    """
+    Output directory of ``stage`` in ARTIFACTS_DIR if ``build_artifacts``
+    built it from the current datasets and config, else None.
+    """
+    return fresh_output(ARTIFACTS_DIR, stage, artifact_settings(), dataset_fingerprints())
+
+
+def __getattr__(name):
+    # datasets are loaded on first access, not at import time:
+    # ``recipe`` is the frame, ``recipe_parsed`` its parsed list columns
+    if name in DATASETS:
+        return get_dataset(name)
+    if name.endswith("_parsed") and name[: -len("_parsed")] in DATASETS:
+        return get_parsed(name[: -len("_parsed")])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,9 +1,13 @@
 import utils.filter_data as filter_data
-import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import pandas as pd
 import math
+
+from webapp_mangetamain.utils.figures import subplots
+from webapp_mangetamain.utils.ingredient_cube import ContinentIngredientCube
+from webapp_mangetamain.utils.profiling import instrument
+@instrument
 def plot_cuisine_distributions(recipes_with_continent: pd.DataFrame):
     """
     Displays three boxplots comparing recipe characteristics across continents:
@@ -25,7 +29,7 @@ def plot_cuisine_distributions(recipes_with_continent: pd.DataFrame):
         "n_ingredients": "Number of ingredients"
     }
 
-    fig, axes = plt.subplots(1, 3, figsize=(15, 10))
+    fig, axes = subplots(1, 3, figsize=(15, 10))
 
     for i, col in enumerate(cols):
         sns.boxplot(
@@ -41,64 +45,43 @@ def plot_cuisine_distributions(recipes_with_continent: pd.DataFrame):
     return fig
 
 
-def plot_top_ingredients_by_continent(recipes_with_continent: pd.DataFrame, top_n: int = 10, global_threshold: float = 0.30):
+@instrument
+def top_ingredients_by_continent(recipes_with_continent, top_n: int = 10, global_threshold: float = 0.30) -> pd.DataFrame:
     """
-    Displays the most commonly used ingredients for each continent,
+    Computes the most commonly used ingredients for each continent,
     while excluding globally ubiquitous ingredients.
 
     Parameters:
         recipes_with_continent : DataFrame with ['id', 'continent', 'ingredients']
-        top_n : number of ingredients to display per continent
+            (normalized ingredient names), or the ContinentIngredientCube
+            already built from it (filter_data.ingredient_cube)
+        top_n : number of ingredients to keep per continent
         global_threshold : exclude ingredients that appear in more than X% of all recipes
-    """
-    df = recipes_with_continent.copy()
-    df["ingredients"] = df["ingredients"].str.lower().str.strip()
-
-    # --- 1. Compute global frequency of each ingredient
-    total_recipes = df["id"].nunique()
-    global_freq = (
-        df.groupby("ingredients")["id"]
-        .nunique()
-        .div(total_recipes)
-        .reset_index(name="global_freq")
-    )
-
-    # --- 2. Remove globally common ingredients
-    common_ingredients = global_freq.query("global_freq > @global_threshold")["ingredients"]
-    df = df[~df["ingredients"].isin(common_ingredients)]
 
-    # --- 3. Count remaining ingredient occurrences by continent
-    counts = (
-        df.groupby(["continent", "ingredients"])
-        .size()
-        .reset_index(name="count")
-    )
+    Returns:
+        DataFrame ['continent', 'ingredients', 'count'], continent as an ordered Categorical
+    """
+    cube = recipes_with_continent
+    if isinstance(cube, pd.DataFrame):
+        cube = ContinentIngredientCube.from_frame(cube)
+    return cube.top(top_n, global_threshold)
 
-    # --- 4. Select top N per continent
-    top_by_continent = (
-        counts.sort_values(["continent", "count"], ascending=[True, False])
-        .groupby("continent", group_keys=False)
-        .head(top_n)
-        .sort_values("count", ascending=False)
-    )
 
-    # --- 5. Ensure continents appear consistently in sorted order
-    continent_order = (
-        df["continent"]
-        .value_counts()
-        .index.tolist()
-    )
-    top_by_continent["continent"] = pd.Categorical(
-        top_by_continent["continent"], categories=continent_order, ordered=True
-    )
+@instrument
+def make_top_ingredients_by_continent_fig(top_by_continent: pd.DataFrame, top_n: int = 10, global_threshold: float = 0.30):
+    """
+    Plots the output of top_ingredients_by_continent, one panel per continent.
 
+    Returns:
+        fig : matplotlib Figure
+    """
     # --- 6. Plot: 2 columns layout for readability
     continents = top_by_continent["continent"].unique()
     n = len(continents)
 
     ncols = 2
     nrows = math.ceil(n / ncols)
-    fig, axes = plt.subplots(
+    fig, axes = subplots(
         nrows=nrows, ncols=ncols,
         figsize=(13, 4 * nrows),
         sharey=False
@@ -131,7 +114,22 @@ def plot_top_ingredients_by_continent(recipes_with_continent: pd.DataFrame, top_
         f"Top {top_n} characteristic ingredients by continent (excluding ingredients used in > {int(global_threshold*100)}% of recipes)",
         fontsize=14, fontweight="bold", y=1.02
     )
-    plt.tight_layout()
-    plt.show()
+    fig.tight_layout()
     return fig
 
+
+@instrument
+def plot_top_ingredients_by_continent(recipes_with_continent, top_n: int = 10, global_threshold: float = 0.30):
+    """
+    Displays the most commonly used ingredients for each continent,
+    while excluding globally ubiquitous ingredients.
+
+    Parameters:
+        recipes_with_continent : DataFrame with ['id', 'continent', 'ingredients'],
+            or its ContinentIngredientCube
+        top_n : number of ingredients to display per continent
+        global_threshold : exclude ingredients that appear in more than X% of all recipes
+    """
+    top_by_continent = top_ingredients_by_continent(recipes_with_continent, top_n, global_threshold)
+    return make_top_ingredients_by_continent_fig(top_by_continent, top_n, global_threshold)
+
@@ -2,12 +2,15 @@
 import ast
 from typing import Dict
 
+import numpy as np
 import pandas as pd
 import streamlit as st # type: ignore
 import seaborn as sns # type: ignore
-import matplotlib.pyplot as plt
 
 from webapp_mangetamain.load_config import cfg
+from webapp_mangetamain.utils.figures import show_pyplot, subplots
+from webapp_mangetamain.utils.ingestion import ListColumn, ParsedRecipes
+from webapp_mangetamain.utils.profiling import instrument
 
 # -------------------------
 # Configuration setup
@@ -24,20 +27,29 @@ NUTRITION_LIMITS = {
     k: v.__dict__ for k, v in cfg.NUTRITION_LIMITS.__dict__.items()
 }
 
+# nutrients whose points are subtracted from the total
+POSITIVE_NUTRIENTS = {"protein"}
+
 # -------------------------
 # Functions
 # -------------------------
 
-def plot_nutriscore_comparison(subset_df: pd.DataFrame, recipe: pd.DataFrame) -> None:
+@instrument
+def plot_nutriscore_comparison(subset_df: pd.DataFrame, recipe: pd.DataFrame,
+                               parsed: ParsedRecipes | None = None) -> None:
     """
     Compare NutriScore distributions between all recipes
     and those with 'health' in their tags.
+    If parsed is given, the mask comes from its tag bitmap index.
     """
-    subset_tags = recipe.loc[subset_df.index, "tags"]
-
-    health_mask = subset_tags.apply(
-        lambda tags: any("health" in str(t).lower() for t in (tags if isinstance(tags, list) else [tags]))
-    )
+    if parsed is not None:
+        health_bitmap = parsed.tag_bitmaps.matching("health", regex=False)
+        health_mask = pd.Series(health_bitmap.to_mask()[subset_df.index.to_numpy()], index=subset_df.index)
+    else:
+        subset_tags = recipe.loc[subset_df.index, "tags"]
+        health_mask = subset_tags.apply(
+            lambda tags: any("health" in str(t).lower() for t in (tags if isinstance(tags, list) else [tags]))
+        )
 
     health_subset = subset_df.loc[health_mask].copy()
     non_health_subset = subset_df.loc[~health_mask].copy()
@@ -60,7 +72,7 @@ def plot_nutriscore_comparison(subset_df: pd.DataFrame, recipe: pd.DataFrame) ->
     score_pct_health = score_pct_health.reindex(all_indexes, fill_value=0)
 
     # ---- Plot ----
-    fig, ax = plt.subplots(figsize=(8, 5))
+    fig, ax = subplots(figsize=(8, 5))
     x = range(len(all_indexes))
 
     ax.bar([i - 0.2 for i in x], score_pct_all.values, width=0.4, label="All recipes")
@@ -73,7 +85,7 @@ def plot_nutriscore_comparison(subset_df: pd.DataFrame, recipe: pd.DataFrame) ->
     ax.set_title("Nutri-Score comparison: all vs. 'health' tagged")
     ax.legend()
 
-    st.pyplot(fig)
+    show_pyplot(fig)
 
 def get_points(value: float, thresholds: list) -> int:
     """Assign points based on thresholds."""
@@ -82,28 +94,69 @@ def get_points(value: float, thresholds: list) -> int:
             return i
     return len(thresholds)
 
+def grade_from_points(total_points: int) -> str:
+    """Map a total number of points to its Nutri-Score grade."""
+    for (low, high), grade in NUTRISCORE.items():
+        if low <= total_points <= high:
+            return grade
+    return "E"
+
 def compute_nutriscore(nutrition: Dict[str, float]) -> str:
     """Compute the Nutri-Score from nutrition composition."""
     total_points = 0
     for nutrient, thresholds in THRESHOLDS.items():
         if nutrient in nutrition:
             points = get_points(nutrition[nutrient], thresholds)
-            if nutrient == "protein":
+            if nutrient in POSITIVE_NUTRIENTS:
                 total_points -= points
             else:
                 total_points += points
 
-    for (low, high), grade in NUTRISCORE.items():
-        if low <= total_points <= high:
-            return grade
-    return "E"
+    return grade_from_points(total_points)
+
+# Every reachable total, from all positive points to all negative points,
+# mapped once to its grade so batch scoring is a single array lookup.
+_MIN_POINTS = -sum(len(t) for n, t in THRESHOLDS.items() if n in POSITIVE_NUTRIENTS)
+_MAX_POINTS = sum(len(t) for n, t in THRESHOLDS.items() if n not in POSITIVE_NUTRIENTS)
+_GRADE_LOOKUP = np.array(
+    [grade_from_points(p) for p in range(_MIN_POINTS, _MAX_POINTS + 1)], dtype=object
+)
+
+@instrument
+def compute_nutriscore_batch(nutrition_df: pd.DataFrame) -> np.ndarray:
+    """
+    Vectorized compute_nutriscore over every row of nutrition_df.
+    Points per nutrient come from np.searchsorted on the thresholds
+    (same rule as get_points), grades from a precomputed lookup.
+    """
+    total_points = np.zeros(len(nutrition_df), dtype=np.int64)
+    for nutrient, thresholds in THRESHOLDS.items():
+        if nutrient in nutrition_df.columns:
+            values = pd.to_numeric(nutrition_df[nutrient], errors="coerce").to_numpy(dtype=float)
+            points = np.searchsorted(np.asarray(thresholds, dtype=float), values, side="left")
+            if nutrient in POSITIVE_NUTRIENTS:
+                total_points -= points
+            else:
+                total_points += points
+
+    return _GRADE_LOOKUP[total_points - _MIN_POINTS]
+
+@instrument
+def parse_nutrition(recipe_df: pd.DataFrame, parsed: ParsedRecipes | None = None) -> pd.DataFrame:
+    """
+    Expand recipe nutrition JSON column into numeric DataFrame.
+    When the pre-parsed columns of the loaded dataset are given, the
+    nutrition matrix is read from them instead of parsing the strings.
+    """
+    if parsed is not None:
+        matrix = parsed.nutrition[recipe_df.index.to_numpy()]
+        return pd.DataFrame(matrix, columns=nutrient_labels)
 
-def parse_nutrition(recipe_df: pd.DataFrame) -> pd.DataFrame:
-    """Expand recipe nutrition JSON column into numeric DataFrame."""
     nutrition = recipe_df["nutrition"].apply(ast.literal_eval)
     nutrition_df = pd.DataFrame(nutrition.tolist(), columns=nutrient_labels)
     return nutrition_df
 
+@instrument
 def filter_data_with_nutri(nutrition_df: pd.DataFrame) -> pd.DataFrame:
     """Filter out extreme values for clean analysis using config limits."""
     mask = pd.Series(True, index=nutrition_df.index)
@@ -114,16 +167,18 @@ def filter_data_with_nutri(nutrition_df: pd.DataFrame) -> pd.DataFrame:
 
     return nutrition_df[mask].copy()
 
+@instrument
 def add_nutriscore_column(nutrition_df: pd.DataFrame) -> pd.DataFrame:
     """Compute and add Nutri-Score column to dataframe."""
     df = nutrition_df.copy()
-    df["nutri_score"] = df.apply(lambda row: compute_nutriscore(row.to_dict()), axis=1)
+    df["nutri_score"] = compute_nutriscore_batch(df)
     return df
 
+@instrument
 def correlation_matrix(nutrition_df: pd.DataFrame):
     """Return a matplotlib figure for correlation matrix heatmap."""
     corr_matrix = nutrition_df.corr()
-    fig, ax = plt.subplots(figsize=(5.5, 4.5))
+    fig, ax = subplots(figsize=(5.5, 4.5))
     sns.heatmap(
         corr_matrix,
         annot=True,
@@ -137,10 +192,12 @@ def correlation_matrix(nutrition_df: pd.DataFrame):
     fig.tight_layout()
     return fig
 
+@instrument
 def analyze_low_scores_with_health_label(recipe_df: pd.DataFrame,
                                          nutrition_df: pd.DataFrame,
                                          health_keywords: list = None,
-                                         join_tags: bool = False) -> pd.DataFrame:
+                                         join_tags: bool = False,
+                                         parsed: ParsedRecipes | None = None) -> pd.DataFrame:
     """
     Displays a table of Nutri-Score D/E recipes and keeps only the tags corresponding to health keywords (health, healthy, diet, fit, etc.) in the ‘tags’ column.
     - recipe_df must contain at least the ‘name’ and ‘tags’ columns.
@@ -149,10 +206,13 @@ def analyze_low_scores_with_health_label(recipe_df: pd.DataFrame,
     Returns the final filtered DataFrame.
     - join_tags: if True, tags are displayed as a string “tag1, tag2”,
                  otherwise as a list [‘tag1’,'tag2'].
+    - parsed: pre-parsed columns of the loaded dataset; when given, tags are
+              read from them instead of parsing the 'tags' strings.
     Returns the final filtered DataFrame.
     """
 
-    health_keywords = cfg.health_keywords
+    if health_keywords is None:
+        health_keywords = cfg.health_keywords
     # for D and E score
     low_idx = nutrition_df[nutrition_df["nutri_score"].isin(["D", "E"])].index
     if len(low_idx) == 0:
@@ -160,13 +220,26 @@ def analyze_low_scores_with_health_label(recipe_df: pd.DataFrame,
         return pd.DataFrame()
 
     subset = recipe_df.loc[low_idx, recipe_df.columns.intersection(["name", "tags"])].copy()
+    if parsed is not None:
+        # keep the D/E recipes having a health-like tag, then only those tags
+        index = parsed.tag_bitmaps
+        # same test as extract_health_tags below, once per distinct tag
+        health_codes = np.flatnonzero([any(k in str(t).strip().lower() for k in health_keywords)
+                                       for t in index.vocabulary])
+        positions = subset.index.to_numpy()
+        subset = subset.loc[index.bitmap(health_codes).to_mask()[positions]]
+        tags = parsed.tags.take(subset.index.to_numpy())
+        keep = np.isin(tags.codes, health_codes)
+        subset["tags"] = ListColumn(
+            np.concatenate([[0], np.cumsum(keep)])[tags.offsets], tags.codes[keep], tags.vocabulary
+        ).to_lists()
 
     def parse_tags(raw):
         """Parse différents formats de tags en liste de chaînes propres."""
-        if pd.isna(raw):
-            return []
         if isinstance(raw, (list, tuple, set)):
             return [str(x).strip() for x in raw if x is not None]
+        if pd.isna(raw):
+            return []
         if isinstance(raw, str):
             s = raw.strip()
             try:
@@ -1,14 +1,137 @@
+import numpy as np
 import pandas as pd
 import seaborn as sns # tyoe: ignore
-import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 
-def make_univariate_figs(df: pd.DataFrame, feature: str, hue: str | None = None):
+from webapp_mangetamain.utils.figures import subplots
+from webapp_mangetamain.utils.profiling import instrument
+
+# above this many rows the figures are drawn from binned aggregates
+# (histograms, binned KDE, 2D densities) instead of one mark per recipe
+AGGREGATE_ABOVE = 20_000
+
+
+def _use_aggregates(df: pd.DataFrame, aggregate: bool | None) -> bool:
+    return len(df) > AGGREGATE_ABOVE if aggregate is None else aggregate
+
+
+def stratified_sample(df: pd.DataFrame, max_points: int, by: str | None = None,
+                      random_state: int = 0) -> pd.DataFrame:
+    """
+    Échantillon d'au plus max_points lignes, proportionnel à chaque strate.
+
+    Les strates sont les valeurs de la colonne ``by`` si elle existe, sinon
+    les déciles de la première colonne, pour garder les queues de distribution.
+    """
+    if len(df) <= max_points:
+        return df
+    if by is not None and by in df.columns:
+        strata = df[by]
+    else:
+        strata = pd.qcut(df.iloc[:, 0].rank(method="first"), 10, labels=False)
+    frac = max_points / len(df)
+    return df.groupby(strata, group_keys=False, observed=True).sample(frac=frac, random_state=random_state)
+
+
+def binned_kde(values: np.ndarray, gridsize: int = 512, cut: float = 3) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Estimation de densité gaussienne (bande passante de Scott) calculée par
+    FFT sur un histogramme fin : le coût dépend de gridsize, pas du nombre
+    de valeurs.
+
+    Returns:
+        Tuple (grid, density)
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if len(values) < 2 or values.std() == 0:
+        return np.empty(0), np.empty(0)
+
+    bw = values.std(ddof=1) * len(values) ** (-1 / 5)
+    lo, hi = values.min() - cut * bw, values.max() + cut * bw
+    counts, edges = np.histogram(values, bins=gridsize, range=(lo, hi))
+    grid = (edges[:-1] + edges[1:]) / 2
+    dx = edges[1] - edges[0]
+
+    # gaussian kernel sampled on the grid, convolved with the counts by FFT
+    offsets = np.arange(-gridsize + 1, gridsize) * dx
+    kernel = np.exp(-0.5 * (offsets / bw) ** 2) / (bw * np.sqrt(2 * np.pi))
+    size = 2 ** int(np.ceil(np.log2(len(counts) + len(kernel) - 1)))
+    smoothed = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    density = smoothed[gridsize - 1: 2 * gridsize - 1] / len(values)
+    return grid, np.clip(density, 0, None)
+
+
+def _box_stats(values: np.ndarray, label: str) -> dict | None:
+    """Statistiques de boxplot (moustaches à 1.5 IQR) ; les points extrêmes
+    identiques ne sont dessinés qu'une fois. None sans valeur finie."""
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return None
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    outside = values[(values < q1 - 1.5 * iqr) | (values > q3 + 1.5 * iqr)]
+    return {"label": label, "q1": q1, "med": med, "q3": q3,
+            "whislo": inside.min(), "whishi": inside.max(), "fliers": np.unique(outside)}
+
+
+@instrument
+def make_univariate_figs(df: pd.DataFrame, feature: str, hue: str | None = None,
+                         aggregate: bool | None = None, bins: int = 40):
     """
     Retourne (hist_fig, box_fig) pour une feature.
+    En mode agrégé (par défaut au-delà de AGGREGATE_ABOVE lignes), l'histogramme,
+    la KDE et les boxplots sont calculés avec NumPy puis dessinés par classes.
     """
+    if not _use_aggregates(df, aggregate):
+        return _make_univariate_figs_seaborn(df, feature, hue)
+
+    values = df[feature].to_numpy(dtype=float)
+    values = values[np.isfinite(values)]
+
+    # hist
+    hist_fig, ax = subplots(figsize=(5, 3.5))
+    counts, edges = np.histogram(values, bins=bins)
+    ax.stairs(counts, edges, fill=True, alpha=0.6)
+    grid, density = binned_kde(values)
+    if len(grid):
+        ax.plot(grid, density * len(values) * (edges[1] - edges[0]))
+    ax.set_xlim(edges[0], edges[-1])
+    ax.set_title(f"Distribution of {feature}")
+    ax.set_xlabel(feature)
+    ax.set_ylabel("Count")
+    hist_fig.tight_layout()
+
+    # box
+    box_fig, ax2 = subplots(figsize=(5, 3.5))
+    if hue and hue in df.columns:
+        # les groupes vides ne sont pas dessinés, comme avec seaborn
+        stats = [_box_stats(group[feature].to_numpy(), str(name))
+                 for name, group in df.groupby(hue, observed=True)]
+        stats = [s for s in stats if s is not None]
+        if stats:
+            ax2.bxp(stats, orientation="vertical")
+        ax2.set_title(f"{feature} by {hue}")
+        ax2.set_xlabel(hue)
+        ax2.set_ylabel(feature)
+    else:
+        stats = _box_stats(values, "")
+        if stats is not None:
+            ax2.bxp([stats], orientation="horizontal")
+        ax2.set_yticks([])
+        ax2.set_title(f"Boxplot of {feature}")
+        ax2.set_xlabel(feature)
+    box_fig.tight_layout()
+
+    return hist_fig, box_fig
+
+
+def _make_univariate_figs_seaborn(df: pd.DataFrame, feature: str, hue: str | None = None):
     data = df[feature]
     # hist
-    hist_fig, ax = plt.subplots(figsize=(5, 3.5))
+    hist_fig, ax = subplots(figsize=(5, 3.5))
     sns.histplot(data, bins=40, kde=True, ax=ax)
     ax.set_title(f"Distribution of {feature}")
     ax.set_xlabel(feature)
@@ -16,9 +139,9 @@ def make_univariate_figs(df: pd.DataFrame, feature: str, hue: str | None = None)
     hist_fig.tight_layout()
 
     # box
-    box_fig, ax2 = plt.subplots(figsize=(5, 3.5))
-    if hue and hue in data.columns:
-        sns.boxplot(data=data, x=hue, y=feature, ax=ax2)
+    box_fig, ax2 = subplots(figsize=(5, 3.5))
+    if hue and hue in df.columns:
+        sns.boxplot(data=df, x=hue, y=feature, ax=ax2)
         ax2.set_title(f"{feature} by {hue}")
         ax2.set_xlabel(hue)
         ax2.set_ylabel(feature)
@@ -31,24 +154,76 @@ def make_univariate_figs(df: pd.DataFrame, feature: str, hue: str | None = None)
     return hist_fig, box_fig
 
 
-def make_pairplot_fig(df: pd.DataFrame, features: list[str], hue: str | None = None):
-    """Retourne la figure du pairplot."""
-    data = df[features]
+@instrument
+def make_pairplot_fig(df: pd.DataFrame, features: list[str], hue: str | None = None,
+                      aggregate: bool | None = None, bins: int = 50, max_points: int | None = None):
+    """
+    Retourne la figure du pairplot.
+    En mode agrégé, la diagonale montre une KDE binnée et les autres panneaux
+    une densité 2D (histogram2d) au lieu d'un point par recette. Sinon,
+    max_points limite le nombre de points par un échantillon stratifié.
+    """
+    hue = hue if hue and hue in df.columns else None
+    if not _use_aggregates(df, aggregate):
+        data = df[features + ([hue] if hue else [])]
+        if max_points is not None:
+            data = stratified_sample(data, max_points, by=hue)
+        g = sns.pairplot(
+            data,
+            vars=features,
+            diag_kind="kde",
+            hue=hue,
+            corner=True,
+            plot_kws=dict(alpha=0.5, s=15),
+        )
+        return g.figure
+
+    n = len(features)
+    fig, axes = subplots(n, n, figsize=(2.5 * n, 2.5 * n), squeeze=False)
+    groups = list(df.groupby(hue, observed=True)) if hue else [(None, df)]
+    colors = sns.color_palette(n_colors=len(groups))
+
+    for i, y in enumerate(features):
+        for j, x in enumerate(features):
+            ax = axes[i, j]
+            if j > i:
+                ax.remove()
+                continue
+            if i == j:
+                for (name, group), color in zip(groups, colors):
+                    grid, density = binned_kde(group[x].to_numpy(dtype=float))
+                    ax.plot(grid, density, color=color, label=name)
+                ax.set_yticks([])
+            else:
+                finite = df[[x, y]].replace([np.inf, -np.inf], np.nan).dropna()
+                x_edges = np.histogram_bin_edges(finite[x], bins=bins)
+                y_edges = np.histogram_bin_edges(finite[y], bins=bins)
+                if hue:
+                    for (name, group), color in zip(groups, colors):
+                        counts, _, _ = np.histogram2d(group[x], group[y], bins=[x_edges, y_edges])
+                        ax.contour((x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2,
+                                   counts.T, levels=4, colors=[color], linewidths=0.8)
+                else:
+                    counts, _, _ = np.histogram2d(finite[x], finite[y], bins=[x_edges, y_edges])
+                    counts = np.ma.masked_equal(counts, 0)
+                    if counts.count():
+                        ax.pcolormesh(x_edges, y_edges, counts.T, cmap="Blues",
+                                      norm=LogNorm(vmin=1, vmax=counts.max()))
+            if i == n - 1:
+                ax.set_xlabel(x)
+            if j == 0:
+                ax.set_ylabel(y)
 
-    g = sns.pairplot(
-        data,
-        vars=features,
-        diag_kind="kde",
-        hue=(hue if hue and hue in data.columns else None),
-        corner=True,
-        plot_kws=dict(alpha=0.5, s=15),
-    )
-    return g.figure
+    if hue:
+        axes[0, 0].legend(title=hue, fontsize="small")
+    fig.tight_layout()
+    return fig
 
+@instrument
 def make_corr_heatmap_fig(df: pd.DataFrame, features: list[str], title: str = "Correlation matrix"):
     """Retourne la figure de la heatmap de corrélation."""
     corr = df[features].corr()
-    fig, ax = plt.subplots(figsize=(5.5, 4.5))
+    fig, ax = subplots(figsize=(5.5, 4.5))
     sns.heatmap(corr, annot=True, fmt=".2f", cmap="coolwarm", vmin=-1, vmax=1, ax=ax)
     ax.set_title(title)
     fig.tight_layout()
@@ -4,12 +4,16 @@ Analysis of tags and their relationships with recipe metrics
 """
 
 import ast
-from typing import Dict, List, Tuple
-import streamlit as st
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from webapp_mangetamain.utils.figures import show_pyplot, subplots
+from webapp_mangetamain.utils.ingestion import ListColumn, ParsedRecipes, tokenize_list
+from webapp_mangetamain.utils.profiling import instrument
+
 TAGS_OF_INTEREST = {
     'Cuisine': ['italian', 'mexican', 'asian', 'french', 'chinese', 'greek',
                 'indian', 'thai', 'japanese', 'spanish', 'middle-eastern'],
@@ -39,7 +43,13 @@ def parse_tags(tags_series: pd.Series) -> pd.Series:
         Series with tags parsed as lists
     """
     def safe_parse(x):
+        if isinstance(x, str):
+            items = tokenize_list(x)
+            if items is not None:
+                return items
         try:
+            if isinstance(x, list):
+                return x
             if pd.isna(x):
                 return []
             return ast.literal_eval(x) if isinstance(x, str) else x
@@ -49,6 +59,62 @@ def parse_tags(tags_series: pd.Series) -> pd.Series:
     return tags_series.apply(safe_parse)
 
 
+def get_tags_parsed(recipes_df: pd.DataFrame, parsed: ParsedRecipes | None = None) -> pd.Series:
+    """
+    Return the tags of each recipe as lists.
+
+    Args:
+        recipes_df: DataFrame containing a 'tags' column
+        parsed: Pre-parsed columns of the loaded dataset, aligned with its
+            positional index; used instead of parsing the 'tags' strings
+
+    Returns:
+        Series of tag lists indexed like recipes_df
+    """
+    if parsed is None:
+        return parse_tags(recipes_df['tags'])
+    tags = parsed.tags.take(recipes_df.index.to_numpy())
+    return pd.Series(tags.to_lists(), index=recipes_df.index, dtype=object)
+
+
+@instrument
+def get_tag_index(recipes_df: pd.DataFrame, parsed: ParsedRecipes | None = None) -> ListColumn:
+    """
+    Return the tags of each recipe as a CSR index: int32 codes into a sorted
+    tag vocabulary, with the offsets of each recipe's tags.
+
+    Args:
+        recipes_df: DataFrame containing a 'tags' column
+        parsed: Pre-parsed columns of the loaded dataset (optional); when
+            given, its codes are reused and no tag string is touched
+
+    Returns:
+        ListColumn aligned with the rows of recipes_df
+    """
+    if parsed is not None:
+        return parsed.tags.take(recipes_df.index.to_numpy())
+    if 'tags_parsed' not in recipes_df.columns:
+        recipes_df['tags_parsed'] = parse_tags(recipes_df['tags'])
+    return ListColumn.from_lists(recipes_df['tags_parsed'])
+
+
+def count_tags(tags: ListColumn) -> pd.Series:
+    """
+    Count the occurrences of each tag of the index.
+
+    Args:
+        tags: Tag index (see get_tag_index)
+
+    Returns:
+        Series of counts indexed by tag, most frequent first (ties in
+        alphabetical order), without the tags that do not occur
+    """
+    counts = tags.counts()
+    order = np.argsort(-counts, kind='stable')
+    order = order[counts[order] > 0]
+    return pd.Series(counts[order], index=pd.Index(tags.vocabulary[order]), name='count')
+
+
 def get_all_tags_of_interest() -> List[str]:
     """
     Return the list of all tags of interest.
@@ -73,30 +139,34 @@ def create_tag_category_mapping() -> Dict[str, str]:
     return category_map
 
 
-def get_general_tags_statistics(recipes_df: pd.DataFrame) -> Dict[str, any]:
+@instrument
+def get_general_tags_statistics(
+    recipes_df: pd.DataFrame,
+    parsed: ParsedRecipes | None = None
+) -> Dict[str, any]:
     """
     Calculate general statistics on tags.
 
+    All statistics come from one tag index: per-recipe lengths are the
+    differences of its offsets and per-tag counts a bincount of its codes.
+
     Args:
         recipes_df: DataFrame containing a 'tags' column
+        parsed: Pre-parsed columns of the loaded dataset (optional)
 
     Returns:
-        Dictionary containing general statistics
+        Dictionary containing general statistics, along with the full
+        'tag_counts' and 'tags_per_recipe' Series
     """
-    # Parse tags
-    recipes_df['tags_parsed'] = parse_tags(recipes_df['tags'])
+    tags = get_tag_index(recipes_df, parsed)
 
     # Statistics on number of tags per recipe
-    tags_per_recipe = recipes_df['tags_parsed'].apply(len)
-
-    # Create a list of all tags
-    all_tags = []
-    for tags_list in recipes_df['tags_parsed']:
-        all_tags.extend(tags_list)
+    tags_per_recipe = pd.Series(tags.lengths(), index=recipes_df.index)
 
     # Count occurrences
-    tag_counts = pd.Series(all_tags).value_counts()
-    avg_tags_general = len(all_tags) / len(tag_counts) if len(tag_counts) > 0 else 0
+    tag_counts = count_tags(tags)
+    total_tags = int(tags.offsets[-1])
+    avg_tags_general = total_tags / len(tag_counts) if len(tag_counts) > 0 else 0
 
     stats = {
         'total_recipes': len(recipes_df),
@@ -106,43 +176,42 @@ def get_general_tags_statistics(recipes_df: pd.DataFrame) -> Dict[str, any]:
         'tags_per_recipe_min': tags_per_recipe.min(),
         'tags_per_recipe_max': tags_per_recipe.max(),
         'total_unique_tags': len(tag_counts),
-        'total_tags': len(all_tags),
+        'total_tags': total_tags,
         'avg_tags_general': avg_tags_general,
         'tag_counts_stats': tag_counts.describe(),
-        'top_20_tags': tag_counts.head(20)
+        'top_20_tags': tag_counts.head(20),
+        'tag_counts': tag_counts,
+        'tags_per_recipe': tags_per_recipe
     }
 
     return stats
 
-def analyze_tags_distribution(recipes_df: pd.DataFrame) -> pd.DataFrame:
+@instrument
+def analyze_tags_distribution(
+    recipes_df: pd.DataFrame,
+    parsed: ParsedRecipes | None = None
+) -> pd.DataFrame:
     """
     Analyze tag distribution in the dataset.
 
     Args:
         recipes_df: DataFrame containing a 'tags' column
+        parsed: Pre-parsed columns of the loaded dataset (optional)
 
     Returns:
         DataFrame with statistics per tag
     """
-    # Parse tags
-    if 'tags_parsed' not in recipes_df.columns:
-        recipes_df['tags_parsed'] = parse_tags(recipes_df['tags'])
-
-    # Create a list of all tags
-    all_tags = []
-    for tags_list in recipes_df['tags_parsed']:
-        all_tags.extend(tags_list)
-
-    # Count occurrences
-    tag_counts = pd.Series(all_tags).value_counts().reset_index()
+    tag_counts = count_tags(get_tag_index(recipes_df, parsed)).reset_index()
     tag_counts.columns = ['tag', 'count']
 
     return tag_counts
 
 
+@instrument
 def create_tag_recipes_dataset(
     recipes_df: pd.DataFrame,
-    min_recipes_per_tag: int = 50
+    min_recipes_per_tag: int = 50,
+    parsed: ParsedRecipes | None = None
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Create a dataset for tag analysis with aggregated metrics.
@@ -150,38 +219,40 @@ def create_tag_recipes_dataset(
     Args:
         recipes_df: DataFrame of recipes with necessary columns
         min_recipes_per_tag: Minimum number of recipes to include a tag
+        parsed: Pre-parsed columns of the loaded dataset (optional)
 
     Returns:
         Tuple (tag_stats, tag_recipes_df)
     """
-    # Parse tags
-    if 'tags_parsed' not in recipes_df.columns:
-        recipes_df['tags_parsed'] = parse_tags(recipes_df['tags'])
-
-    # Create one row per tag-recipe pair
-    tag_recipe_pairs = []
-    for idx, row in recipes_df.iterrows():
-        for tag in row['tags_parsed']:
-            tag_recipe_pairs.append({
-                'tag': tag,
-                'recipe_id': row.get('id', idx),
-                'minutes': row.get('minutes', 0),
-                'n_ingredients': row.get('n_ingredients', 0),
-                'n_steps': row.get('n_steps', 0)
-            })
-
-    tag_recipes_df = pd.DataFrame(tag_recipe_pairs)
-
-    # Statistics per tag
-    tag_stats = tag_recipes_df.groupby('tag').agg({
-        'recipe_id': 'count',
-        'minutes': 'mean',
-        'n_ingredients': 'mean',
-        'n_steps': 'mean'
-    }).reset_index()
-
-    tag_stats.columns = ['tag', 'n_recipes', 'avg_minutes',
-                         'avg_ingredients', 'avg_steps']
+    # Tags as offsets + integer codes (vocabulary sorted like groupby keys)
+    tags = get_tag_index(recipes_df, parsed)
+
+    # One row per tag-recipe pair: repeat each recipe's metrics by its number of tags
+    lengths = tags.lengths()
+    recipe_ids = recipes_df['id'] if 'id' in recipes_df.columns else recipes_df.index
+    tag_recipes_df = pd.DataFrame({
+        'tag': tags.values(),
+        'recipe_id': np.repeat(np.asarray(recipe_ids), lengths),
+    })
+    for col in ['minutes', 'n_ingredients', 'n_steps']:
+        values = recipes_df[col].to_numpy() if col in recipes_df.columns else np.zeros(len(recipes_df), dtype=np.int64)
+        tag_recipes_df[col] = np.repeat(values, lengths)
+
+    # Statistics per tag: grouped sums over the integer tag codes
+    n_tags = len(tags.vocabulary)
+    n_recipes = tags.counts()
+    tag_stats = pd.DataFrame({'tag': tags.vocabulary, 'n_recipes': n_recipes})
+    for col, name in [('minutes', 'avg_minutes'), ('n_ingredients', 'avg_ingredients'),
+                      ('n_steps', 'avg_steps')]:
+        values = tag_recipes_df[col].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        sums = np.bincount(tags.codes[valid], weights=values[valid], minlength=n_tags)
+        counts = np.bincount(tags.codes[valid], minlength=n_tags)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            tag_stats[name] = sums / counts
+
+    # Tags of the vocabulary absent from this subset
+    tag_stats = tag_stats[tag_stats['n_recipes'] > 0].reset_index(drop=True)
 
     # Filter tags with enough recipes
     tag_stats = tag_stats[tag_stats['n_recipes'] >= min_recipes_per_tag].copy()
@@ -190,6 +261,7 @@ def create_tag_recipes_dataset(
     return tag_stats, tag_recipes_df
 
 
+@instrument
 def filter_tags_of_interest(tag_stats: pd.DataFrame) -> pd.DataFrame:
     """
     Filter dataset to keep only tags of interest.
@@ -210,6 +282,7 @@ def filter_tags_of_interest(tag_stats: pd.DataFrame) -> pd.DataFrame:
     return df_filtered
 
 
+@instrument
 def plot_top_tags_by_metric(
     tag_stats: pd.DataFrame,
     metric: str = 'n_recipes',
@@ -240,7 +313,7 @@ def plot_top_tags_by_metric(
     if title is None:
         title = f"Top {top_n} tags by {metric_labels.get(metric, metric)}"
 
-    fig, ax = plt.subplots(figsize=(10, max(8, top_n * 0.4)))
+    fig, ax = subplots(figsize=(10, max(8, top_n * 0.4)))
 
     # Create horizontal bar chart
     colors = plt.cm.viridis(df_top[metric].values / df_top[metric].values.max())
@@ -257,6 +330,7 @@ def plot_top_tags_by_metric(
     fig.tight_layout()
     return fig
 
+@instrument
 def create_heatmap_tags_metrics(tag_stats_filtered: pd.DataFrame) -> plt.Figure:
     """
     Create a heatmap of tags vs metrics.
@@ -280,7 +354,7 @@ def create_heatmap_tags_metrics(tag_stats_filtered: pd.DataFrame) -> plt.Figure:
     metric_labels = ['Time', 'Ingredients', 'Steps']
     z_data = df_norm[['avg_minutes_norm', 'avg_ingredients_norm', 'avg_steps_norm']].T.values
 
-    fig, ax = plt.subplots(figsize=(max(12, len(df_norm) * 0.3), 5))
+    fig, ax = subplots(figsize=(max(12, len(df_norm) * 0.3), 5))
 
     im = ax.imshow(z_data, cmap='viridis', aspect='auto')
 
@@ -291,7 +365,7 @@ def create_heatmap_tags_metrics(tag_stats_filtered: pd.DataFrame) -> plt.Figure:
     ax.set_yticklabels(metric_labels)
 
     # Add colorbar
-    cbar = plt.colorbar(im, ax=ax)
+    cbar = fig.colorbar(im, ax=ax)
     cbar.set_label('Normalized value', rotation=270, labelpad=20)
 
     ax.set_title('Heatmap: Tags vs Metrics (normalized values)', fontsize=14, pad=15)
@@ -302,6 +376,7 @@ def create_heatmap_tags_metrics(tag_stats_filtered: pd.DataFrame) -> plt.Figure:
     return fig
 
 
+@instrument
 def get_summary_statistics(tag_stats_filtered: pd.DataFrame) -> pd.DataFrame:
     """
     Calculate summary statistics by category.
@@ -331,6 +406,7 @@ def get_summary_statistics(tag_stats_filtered: pd.DataFrame) -> pd.DataFrame:
     return summary
 
 
+@instrument
 def find_best_tags(
     tag_stats_filtered: pd.DataFrame,
     top_n: int = 5
@@ -365,16 +441,24 @@ def find_best_tags(
 
     return results
 
-def plot_tags_per_recipe_distribution(recipes_df: pd.DataFrame) -> None:
+@instrument
+def plot_tags_per_recipe_distribution(
+    recipes_df: Optional[pd.DataFrame] = None,
+    tags_per_recipe: Optional[pd.Series] = None
+) -> None:
     """
     Create and display a histogram of the distribution of tags per recipe.
 
     Args:
-        recipes_df: DataFrame containing a 'tags_parsed' column
+        recipes_df: DataFrame containing a 'tags_parsed' column (optional
+            when tags_per_recipe is given)
+        tags_per_recipe: Precomputed number of tags per recipe (optional,
+            recipes_df is not read when given)
     """
-    tags_per_recipe = recipes_df['tags_parsed'].apply(len)
+    if tags_per_recipe is None:
+        tags_per_recipe = recipes_df['tags_parsed'].apply(len)
 
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig, ax = subplots(figsize=(10, 6))
 
     # Create histogram
     ax.hist(tags_per_recipe, bins=50, color='#636EFA', alpha=0.7, edgecolor='black')
@@ -395,10 +479,10 @@ def plot_tags_per_recipe_distribution(recipes_df: pd.DataFrame) -> None:
     ax.grid(axis='y', alpha=0.3)
 
     fig.tight_layout()
-    st.pyplot(fig)
-    plt.close(fig)
+    show_pyplot(fig)
 
 
+@instrument
 def plot_top_tags(tag_counts: pd.Series, top_n: int = 20) -> None:
     """
     Create and display a chart of the most frequent tags.
@@ -409,7 +493,7 @@ def plot_top_tags(tag_counts: pd.Series, top_n: int = 20) -> None:
     """
     top_tags = tag_counts.head(top_n)
 
-    fig, ax = plt.subplots(figsize=(10, max(8, top_n * 0.4)))
+    fig, ax = subplots(figsize=(10, max(8, top_n * 0.4)))
 
     # Create horizontal bar chart
     colors = plt.cm.viridis(top_tags.values / top_tags.values.max())
@@ -424,10 +508,10 @@ def plot_top_tags(tag_counts: pd.Series, top_n: int = 20) -> None:
     ax.grid(axis='x', alpha=0.3)
 
     fig.tight_layout()
-    st.pyplot(fig)
-    plt.close(fig)
+    show_pyplot(fig)
 
 
+@instrument
 def plot_tag_frequency_distribution(tag_counts: pd.Series) -> None:
     """
     Create and display a histogram of tag frequency distribution.
@@ -435,7 +519,7 @@ def plot_tag_frequency_distribution(tag_counts: pd.Series) -> None:
     Args:
         tag_counts: Series with tag counts
     """
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig, ax = subplots(figsize=(10, 6))
 
     # Create histogram with log scale on y-axis
     ax.hist(tag_counts.values, bins=50, color='#EF553B', alpha=0.7, edgecolor='black')
@@ -447,10 +531,10 @@ def plot_tag_frequency_distribution(tag_counts: pd.Series) -> None:
     ax.grid(axis='both', alpha=0.3)
 
     fig.tight_layout()
-    st.pyplot(fig)
-    plt.close(fig)
+    show_pyplot(fig)
 
 
+@instrument
 def plot_categories_comparison(tag_stats_filtered: pd.DataFrame) -> None:
     """
     Compare and display tag categories across multiple metrics.
@@ -465,7 +549,7 @@ def plot_categories_comparison(tag_stats_filtered: pd.DataFrame) -> None:
         'n_recipes': 'sum'
     }).reset_index()
 
-    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+    fig, axes = subplots(2, 2, figsize=(14, 10))
 
     metrics = [
         ('avg_minutes', 'Average time (min)', axes[0, 0]),
@@ -485,10 +569,10 @@ def plot_categories_comparison(tag_stats_filtered: pd.DataFrame) -> None:
 
     fig.suptitle('Comparison of tag categories', fontsize=16, y=0.995)
     fig.tight_layout()
-    st.pyplot(fig)
-    plt.close(fig)
+    show_pyplot(fig)
 
 
+@instrument
 def plot_category_detail(
     tag_stats_filtered: pd.DataFrame,
     category: str,
@@ -521,7 +605,7 @@ def plot_category_detail(
         'n_recipes': 'Number of recipes'
     }
 
-    fig, ax = plt.subplots(figsize=(10, max(6, top_n * 0.4)))
+    fig, ax = subplots(figsize=(10, max(6, top_n * 0.4)))
 
     # Create horizontal bar chart
     colors = plt.cm.viridis(df_cat[metric].values / df_cat[metric].values.max())
@@ -537,7 +621,6 @@ def plot_category_detail(
     ax.grid(axis='x', alpha=0.3)
 
     fig.tight_layout()
-    st.pyplot(fig)
-    plt.close(fig)
+    show_pyplot(fig)
 
 
@@ -0,0 +1,271 @@
+"""Incremental build of the derived datasets in ``artifacts/``.
+
+A ``Stage`` names the datasets it reads (``sources``), the settings it
+depends on (``params``) and the stages it needs first (``deps``). Its key is
+the hash of those inputs, the keys of its dependencies and its ``version``,
+so a stage is stale when any of them changed, or when one of its outputs is
+missing. ``build`` runs the stale stages of the graph in a process pool, a
+stage being submitted as soon as its dependencies are done.
+
+Each stage writes into a private temporary directory; its entries are then
+moved into the artifacts directory, one ``os.replace`` each, and the stage
+is recorded in ``manifest.json`` (rewritten atomically after every stage)
+with its key, its inputs and its outputs. A failed stage keeps its previous
+outputs and manifest entry, and the stages depending on it are skipped.
+
+``fresh_output`` lets the app use an output only if the manifest says it was
+built from the current datasets and settings.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+BUILD_DIR = ".build"
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One node of the build graph.
+
+    ``build(settings, out_dir)`` must be a module-level function (it runs in
+    a worker process) writing its outputs into ``out_dir``; a stage whose
+    result lives elsewhere (e.g. the parsed-columns cache) writes nothing.
+    """
+
+    name: str
+    build: Callable[[dict, Path], None]
+    deps: tuple[str, ...] = ()
+    sources: tuple[str, ...] = ()
+    params: tuple[str, ...] = ()
+    version: int = 1
+
+
+def _digest(obj) -> str:
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def topological_order(stages: list[Stage]) -> list[Stage]:
+    """Stages sorted so that each comes after its dependencies."""
+    by_name = {stage.name: stage for stage in stages}
+    order, state = [], {}
+
+    def visit(stage: Stage) -> None:
+        if state.get(stage.name) == "done":
+            return
+        if state.get(stage.name) == "visiting":
+            raise ValueError(f"dependency cycle through stage {stage.name!r}")
+        state[stage.name] = "visiting"
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"stage {stage.name!r} depends on unknown stage {dep!r}")
+            visit(by_name[dep])
+        state[stage.name] = "done"
+        order.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return order
+
+
+def stage_inputs(stages: list[Stage], settings: dict, fingerprints: dict[str, str]) -> dict[str, dict]:
+    """
+    Inputs of every stage: its sources and params and those of its
+    dependencies (transitively), plus the keys of its dependencies.
+
+    Args:
+        settings: Build settings, ``settings["params"]`` holding the values
+            the stages' ``params`` refer to
+        fingerprints: Content hash of each source dataset
+    """
+    inputs = {}
+    for stage in topological_order(stages):
+        sources = {name: fingerprints[name] for name in stage.sources}
+        params = {name: settings["params"][name] for name in stage.params}
+        for dep in stage.deps:
+            sources.update(inputs[dep]["sources"])
+            params.update(inputs[dep]["params"])
+        entry = {
+            "version": stage.version,
+            "sources": sources,
+            "params": params,
+            "deps": {dep: inputs[dep]["key"] for dep in stage.deps},
+        }
+        entry["key"] = _digest(entry)
+        inputs[stage.name] = entry
+    return inputs
+
+
+def read_manifest(artifacts_dir: str | os.PathLike) -> dict:
+    """Manifest of ``artifacts_dir`` (empty if missing or unreadable)."""
+    try:
+        return json.loads((Path(artifacts_dir) / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(artifacts_dir: str | os.PathLike, manifest: dict) -> None:
+    path = Path(artifacts_dir) / MANIFEST
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _outputs_exist(artifacts_dir: Path, entry: dict) -> bool:
+    return all((artifacts_dir / name).exists() for name in entry.get("outputs", []))
+
+
+def is_stale(artifacts_dir: str | os.PathLike, manifest: dict, name: str, key: str) -> bool:
+    entry = manifest.get(name)
+    return entry is None or entry.get("key") != key or not _outputs_exist(Path(artifacts_dir), entry)
+
+
+def publish(tmp_dir: Path, artifacts_dir: Path) -> list[str]:
+    """Move every entry of ``tmp_dir`` into ``artifacts_dir``, replacing older versions."""
+    outputs = []
+    for entry in sorted(tmp_dir.iterdir()):
+        target = artifacts_dir / entry.name
+        if target.is_dir() and not target.is_symlink():
+            # a directory cannot be replaced by rename while it has content
+            old = tmp_dir.with_name(tmp_dir.name + ".old")
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(target, old)
+            os.replace(entry, target)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.replace(entry, target)
+        outputs.append(entry.name)
+    return outputs
+
+
+def _run_stage(stage: Stage, settings: dict, tmp_dir: Path) -> float:
+    start = time.perf_counter()
+    stage.build(settings, tmp_dir)
+    return time.perf_counter() - start
+
+
+def build(stages: list[Stage], settings: dict, fingerprints: dict[str, str],
+          artifacts_dir: str | os.PathLike, jobs: int | None = None, force: bool = False,
+          only: list[str] | None = None, dry_run: bool = False) -> dict[str, str]:
+    """
+    Build the stale stages of ``stages``.
+
+    Args:
+        jobs: Worker processes (default: one per CPU)
+        force: Rebuild every selected stage
+        only: Build these stages (and the stale stages they depend on) only
+        dry_run: Report what would be built without running anything
+
+    Returns:
+        Status of each selected stage: "fresh", "built", "failed" or
+        "skipped" (a dependency failed); "stale" instead of "built" with
+        ``dry_run``
+    """
+    artifacts_dir = Path(artifacts_dir)
+    artifacts_dir.mkdir(parents=True, exist_ok=True)
+    order = topological_order(stages)
+    by_name = {stage.name: stage for stage in order}
+    inputs = stage_inputs(order, settings, fingerprints)
+    manifest = read_manifest(artifacts_dir)
+
+    selected = set(by_name)
+    if only:
+        unknown = set(only) - selected
+        if unknown:
+            raise ValueError(f"unknown stages: {sorted(unknown)}")
+        selected = set()
+        stack = list(only)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(by_name[name].deps)
+
+    status = {}
+    for stage in order:
+        if stage.name not in selected:
+            continue
+        requested = force and (not only or stage.name in only)
+        stale = requested or is_stale(artifacts_dir, manifest, stage.name, inputs[stage.name]["key"])
+        status[stage.name] = "stale" if stale else "fresh"
+    if dry_run:
+        return status
+
+    pending = [stage for stage in order if status.get(stage.name) == "stale"]
+    if not pending:
+        return status
+
+    build_root = artifacts_dir / BUILD_DIR
+    build_root.mkdir(exist_ok=True)
+    running = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for stage in list(pending):
+                dep_status = [status.get(dep, "fresh") for dep in stage.deps]
+                if any(s in ("failed", "skipped") for s in dep_status):
+                    logger.warning("%s: skipped, a dependency failed", stage.name)
+                    status[stage.name] = "skipped"
+                    pending.remove(stage)
+                elif all(s in ("fresh", "built") for s in dep_status):
+                    tmp_dir = build_root / stage.name
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    tmp_dir.mkdir()
+                    logger.info("%s: building", stage.name)
+                    running[pool.submit(_run_stage, stage, settings, tmp_dir)] = (stage, tmp_dir)
+                    pending.remove(stage)
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, tmp_dir = running.pop(future)
+                try:
+                    seconds = future.result()
+                except Exception:
+                    logger.exception("%s: failed", stage.name)
+                    status[stage.name] = "failed"
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    continue
+                outputs = publish(tmp_dir, artifacts_dir)
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                manifest[stage.name] = {
+                    **inputs[stage.name],
+                    "outputs": outputs,
+                    "built": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "seconds": round(seconds, 3),
+                }
+                write_manifest(artifacts_dir, manifest)
+                status[stage.name] = "built"
+                logger.info("%s: built in %.2f s (%s)", stage.name, seconds, ", ".join(outputs) or "cache only")
+
+    shutil.rmtree(build_root, ignore_errors=True)
+    return status
+
+
+def fresh_output(artifacts_dir: str | os.PathLike, name: str, settings: dict,
+                 fingerprints: dict[str, str]) -> Path | None:
+    """
+    ``artifacts_dir / name`` if stage ``name`` was built from the current
+    ``fingerprints`` and ``settings["params"]`` and its outputs exist, else None.
+    """
+    artifacts_dir = Path(artifacts_dir)
+    entry = read_manifest(artifacts_dir).get(name)
+    if entry is None or not _outputs_exist(artifacts_dir, entry):
+        return None
+    if any(fingerprints.get(source) != fp for source, fp in entry.get("sources", {}).items()):
+        return None
+    if any(settings["params"].get(param) != value for param, value in entry.get("params", {}).items()):
+        return None
+    path = artifacts_dir / name
+    return path if path.exists() else None
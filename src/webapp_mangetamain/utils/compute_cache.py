@@ -0,0 +1,42 @@
+"""Cross-session cache for the analyses behind the Streamlit tabs.
+
+``cache_computation`` wraps ``st.cache_data`` with the settings of the
+``compute_cache`` section of config.json:
+
+- ``max_entries``: size of each function's in-memory cache; once full, the
+  least recently used result is evicted;
+- ``persist``: ``"disk"`` to also pickle results under ``~/.streamlit/cache``
+  so a restarted container starts warm (mount that folder as a volume), or
+  ``null`` to keep them in memory only.
+
+The cache is shared by every session of the server process. Cached
+functions take the dataset fingerprint (``load_config.dataset_fingerprint``)
+as their first argument, so results are keyed on the data content as well
+as on the other parameters and on the function's own code. Functions whose
+result depends on config.json also take ``figure_cache.config_digest(cfg)``,
+since ``persist: "disk"`` would otherwise serve them after a config edit.
+Arguments that should not be hashed (frames, parsed columns) must start
+with ``_``.
+"""
+from typing import Callable
+
+import streamlit as st
+
+from webapp_mangetamain.load_config import cfg
+
+_settings = getattr(cfg, "compute_cache", None)
+
+MAX_ENTRIES = getattr(_settings, "max_entries", 64)
+PERSIST = getattr(_settings, "persist", None)
+
+
+def cache_computation(func: Callable | None = None, *, max_entries: int | None = None):
+    """Memoize ``func`` across sessions (usable with or without arguments)."""
+    decorator = st.cache_data(
+        max_entries=max_entries or MAX_ENTRIES,
+        persist=PERSIST,
+        show_spinner=False,
+    )
+    if func is None:
+        return decorator
+    return decorator(func)
@@ -0,0 +1,325 @@
+"""Sparse ingredient co-occurrence and Jaccard similarity.
+
+Recipes x ingredients is stored as a binary CSR incidence matrix built from
+integer-coded ingredients, so memory grows with the number of (recipe,
+ingredient) pairs rather than with recipes x ingredients. Co-occurrence is
+``X.T @ X`` computed once (its diagonal is each ingredient's recipe count)
+and Jaccard similarity is only derived for the pairs that are kept.
+
+``generate_matrix`` stores the result as a directory of ``.npy`` arrays
+(``CooccurrenceMatrices``) that the app memory-maps instead of parsing CSVs,
+along with a ``NeighborIndex`` holding each ingredient's neighbors already
+sorted by Jaccard score, so a top-k query is a slice of one row.
+"""
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def build_incidence(exploded: pd.DataFrame, id_col: str = "id",
+                    item_col: str = "ingredients") -> tuple[sparse.csr_matrix, np.ndarray]:
+    """
+    Build the binary recipes x items incidence matrix.
+
+    Args:
+        exploded: One row per (recipe, item), e.g. filter_data.ingredients_exploded
+        id_col: Recipe id column
+        item_col: Item column
+
+    Returns:
+        Tuple (incidence, labels): CSR matrix of 0/1 int32 and the sorted
+        item labels of its columns
+    """
+    rows, _ = pd.factorize(exploded[id_col], sort=True)
+    cols, labels = pd.factorize(exploded[item_col], sort=True)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+        shape=(rows.max() + 1 if len(rows) else 0, len(labels)),
+    )
+    # an item listed twice in a recipe still counts once
+    incidence.data[:] = 1
+    return incidence, np.asarray(labels, dtype=object)
+
+
+def cooccurrence_matrix(incidence: sparse.csr_matrix) -> sparse.csr_matrix:
+    """Items x items co-occurrence counts (diagonal = recipes per item)."""
+    co = (incidence.T @ incidence).tocsr()
+    co.sort_indices()
+    return co
+
+
+def jaccard_matrix(co: sparse.csr_matrix, min_co: int = 1) -> sparse.csr_matrix:
+    """
+    Jaccard similarity |A∩B| / |A∪B| for the entries of ``co`` with at least
+    ``min_co`` co-occurrences (others are absent, i.e. 0).
+    """
+    co = co.tocoo()
+    keep = co.data >= min_co
+    rows, cols, inter = co.row[keep], co.col[keep], co.data[keep].astype(float)
+    diag = co_diagonal(co)
+    union = diag[rows] + diag[cols] - inter
+    score = inter / np.where(union == 0, 1, union)
+    return sparse.csr_matrix((score, (rows, cols)), shape=co.shape)
+
+
+def co_diagonal(co: sparse.spmatrix) -> np.ndarray:
+    """Number of recipes containing each item."""
+    return np.asarray(co.diagonal(), dtype=float)
+
+
+def jaccard_pairs(co: sparse.csr_matrix, labels: np.ndarray, min_co: int = 10) -> pd.DataFrame:
+    """
+    List the ingredient pairs (a < b) with at least ``min_co`` co-occurrences.
+
+    Returns:
+        DataFrame ['ing_a', 'ing_b', 'co', 'score'] sorted by Jaccard score
+    """
+    upper = sparse.triu(co, k=1).tocoo()
+    keep = upper.data >= min_co
+    rows, cols, inter = upper.row[keep], upper.col[keep], upper.data[keep]
+    diag = co_diagonal(co)
+    union = diag[rows] + diag[cols] - inter
+    pairs = pd.DataFrame({
+        "ing_a": labels[rows],
+        "ing_b": labels[cols],
+        "co": inter,
+        "score": inter / np.where(union == 0, 1, union),
+    })
+    return pairs.sort_values("score", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def to_dense_frame(matrix: sparse.spmatrix, labels: np.ndarray, name: str = "ingredients") -> pd.DataFrame:
+    """Dense labelled square DataFrame of a sparse items x items matrix."""
+    index = pd.Index(labels, name=name)
+    return pd.DataFrame(matrix.toarray(), index=index, columns=index.copy())
+
+
+# -------------------------
+# Binary artifact
+# -------------------------
+
+@dataclass(frozen=True)
+class CooccurrenceMatrices:
+    """
+    Co-occurrence counts and Jaccard scores sharing one CSR structure.
+
+    Both matrices hold an entry for every pair of ingredients appearing
+    together in at least one recipe (diagonal included). The Jaccard scores
+    are deliberately not cut at the build's ``min_co``: the focus explorer
+    filters the rows with its own ``min_co`` slider (1 to 200), below the
+    build value too. The pair list (``jaccard_pairs``) is the one cut at
+    ``min_co``. Loaded from disk, their arrays are memory-mapped: a row is
+    read only when it is queried.
+    """
+
+    labels: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    co: np.ndarray
+    jaccard: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def index_of(self, label: str) -> int | None:
+        """Position of ``label`` in the sorted labels, or None."""
+        return _label_position(self.labels, label)
+
+    def row(self, pos: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Column positions, co-occurrence counts and Jaccard scores of row ``pos``."""
+        start, end = self.indptr[pos], self.indptr[pos + 1]
+        return self.indices[start:end], self.co[start:end], self.jaccard[start:end]
+
+    def top_neighbors(self, pos: int, k: int, min_co: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Best ``k`` neighbors of row ``pos`` by Jaccard score among those with
+        at least ``min_co`` co-occurrences (sorts the row on every call, see
+        ``NeighborIndex`` for the precomputed order).
+
+        Returns:
+            Tuple (labels, scores, co-occurrence counts)
+        """
+        cols, co, score = self.row(pos)
+        mask = (co >= min_co) & (cols != pos)
+        cols, co, score = cols[mask], co[mask], score[mask]
+        order = np.argsort(-score, kind="stable")[:k]
+        return self.labels[cols[order]], score[order], co[order]
+
+    def co_matrix(self) -> sparse.csr_matrix:
+        """Co-occurrence counts as a scipy CSR matrix."""
+        return sparse.csr_matrix((self.co, self.indices, self.indptr), shape=(len(self), len(self)))
+
+    def jaccard_matrix(self) -> sparse.csr_matrix:
+        """Jaccard scores as a scipy CSR matrix."""
+        return sparse.csr_matrix((self.jaccard, self.indices, self.indptr), shape=(len(self), len(self)))
+
+    @classmethod
+    def from_cooccurrence(cls, co: sparse.csr_matrix, labels: np.ndarray) -> "CooccurrenceMatrices":
+        """
+        Build both matrices from a co-occurrence matrix, with a Jaccard score
+        for every co-occurring pair (no ``min_co`` cut, see the class doc).
+        """
+        co = co.tocsr()
+        co.eliminate_zeros()
+        co.sort_indices()
+        diag = co_diagonal(co)
+        rows = np.repeat(np.arange(co.shape[0]), np.diff(co.indptr))
+        union = diag[rows] + diag[co.indices] - co.data
+        return cls(
+            labels=np.asarray(labels, dtype=object),
+            indptr=co.indptr.astype(np.int64),
+            indices=co.indices.astype(np.int32),
+            co=co.data.astype(np.int32),
+            jaccard=(co.data / np.where(union == 0, 1, union)).astype(np.float32),
+        )
+
+    @classmethod
+    def from_dense_csv(cls, co_csv: str | os.PathLike) -> "CooccurrenceMatrices":
+        """Convert a square co_occurrence.csv written by earlier versions."""
+        dense = pd.read_csv(co_csv, index_col=0)
+        co = sparse.csr_matrix(dense.to_numpy(dtype=np.int64))
+        return cls.from_cooccurrence(co, dense.index.astype(str).to_numpy())
+
+
+@dataclass(frozen=True)
+class NeighborIndex:
+    """
+    For each ingredient, its neighbors sorted by decreasing Jaccard score
+    (ties by label) with their co-occurrence counts, itself excluded.
+
+    Row ``pos`` is ``neighbors[indptr[pos]:indptr[pos + 1]]``; a top-k query
+    filters that slice on ``min_co`` and keeps the first ``k`` entries.
+    """
+
+    labels: np.ndarray
+    indptr: np.ndarray
+    neighbors: np.ndarray
+    score: np.ndarray
+    co: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def index_of(self, label: str) -> int | None:
+        """Position of ``label`` in the sorted labels, or None."""
+        return _label_position(self.labels, label)
+
+    def top_neighbors(self, pos: int, k: int, min_co: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Best ``k`` neighbors of row ``pos`` with at least ``min_co`` co-occurrences.
+
+        Returns:
+            Tuple (labels, scores, co-occurrence counts)
+        """
+        start, end = self.indptr[pos], self.indptr[pos + 1]
+        co = self.co[start:end]
+        keep = np.flatnonzero(co >= min_co)[:k] + start
+        return self.labels[self.neighbors[keep]], self.score[keep], self.co[keep]
+
+    @classmethod
+    def from_matrices(cls, matrices: CooccurrenceMatrices) -> "NeighborIndex":
+        """Reorder every row of the matrices by score, dropping the diagonal."""
+        indptr = np.asarray(matrices.indptr)
+        rows = np.repeat(np.arange(len(matrices), dtype=np.int32), np.diff(indptr))
+        indices = np.asarray(matrices.indices)
+        jaccard = np.asarray(matrices.jaccard)
+        off_diagonal = np.flatnonzero(rows != indices)
+
+        # rows ascending, then score descending, then column ascending
+        order = off_diagonal[np.lexsort((indices[off_diagonal], -jaccard[off_diagonal], rows[off_diagonal]))]
+        counts = np.bincount(rows[off_diagonal], minlength=len(matrices))
+        return cls(
+            labels=matrices.labels,
+            indptr=np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            neighbors=indices[order].astype(np.int32),
+            score=jaccard[order].astype(np.float32),
+            co=np.asarray(matrices.co)[order].astype(np.int32),
+        )
+
+
+def _label_position(labels: np.ndarray, label: str) -> int | None:
+    pos = int(np.searchsorted(labels, label))
+    if pos < len(labels) and labels[pos] == label:
+        return pos
+    return None
+
+
+_ARRAYS = ["indptr", "indices", "co", "jaccard"]
+_NEIGHBOR_ARRAYS = ["indptr", "neighbors", "score", "co"]
+
+_loaded_indexes: dict[tuple[str, int], NeighborIndex] = {}
+
+
+def _save_arrays(obj, names: list[str], directory: str | os.PathLike) -> None:
+    """Write ``obj.labels`` and the named arrays as ``.npy`` files, atomically."""
+    directory = Path(directory)
+    tmp = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    np.save(tmp / "labels.npy", obj.labels.astype(str))
+    for name in names:
+        np.save(tmp / f"{name}.npy", getattr(obj, name))
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+
+
+def _load_arrays(directory: Path, names: list[str], mmap_mode: str | None) -> dict[str, np.ndarray]:
+    arrays = {name: np.load(directory / f"{name}.npy", mmap_mode=mmap_mode) for name in names}
+    arrays["labels"] = np.load(directory / "labels.npy").astype(object)
+    return arrays
+
+
+def save_cooccurrence(matrices: CooccurrenceMatrices, directory: str | os.PathLike) -> None:
+    """Write the matrices as ``.npy`` files plus a label index, atomically."""
+    _save_arrays(matrices, _ARRAYS, directory)
+
+
+def save_neighbor_index(index: NeighborIndex, directory: str | os.PathLike) -> None:
+    """Write the neighbor index as ``.npy`` files plus a label index, atomically."""
+    _save_arrays(index, _NEIGHBOR_ARRAYS, directory)
+
+
+def load_cooccurrence(directory: str | os.PathLike, mmap_mode: str | None = "r") -> CooccurrenceMatrices:
+    """
+    Memory-map the matrices written by ``save_cooccurrence``.
+
+    If the directory does not exist but the dense co_occurrence.csv of an
+    earlier version sits next to it, it is converted once.
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        legacy_csv = directory.parent / "co_occurrence.csv"
+        if not legacy_csv.exists():
+            raise FileNotFoundError(
+                f"{directory} not found: run ingredient_data_process.generate_matrix() first"
+            )
+        save_cooccurrence(CooccurrenceMatrices.from_dense_csv(legacy_csv), directory)
+
+    return CooccurrenceMatrices(**_load_arrays(directory, _ARRAYS, mmap_mode))
+
+
+def load_neighbor_index(directory: str | os.PathLike,
+                        cooccurrence_dir: str | os.PathLike | None = None) -> NeighborIndex:
+    """
+    Memory-map the index written by ``save_neighbor_index``, once per process.
+
+    If it is missing it is built from ``cooccurrence_dir`` (by default the
+    sibling cooccurrence/ directory) and saved.
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        source = Path(cooccurrence_dir) if cooccurrence_dir else directory.parent / "cooccurrence"
+        save_neighbor_index(NeighborIndex.from_matrices(load_cooccurrence(source)), directory)
+
+    # keyed on the build time so that a rebuilt index is picked up
+    key = (str(directory.resolve()), (directory / "indptr.npy").stat().st_mtime_ns)
+    if key not in _loaded_indexes:
+        _loaded_indexes[key] = NeighborIndex(**_load_arrays(directory, _NEIGHBOR_ARRAYS, "r"))
+    return _loaded_indexes[key]
@@ -0,0 +1,131 @@
+"""On-disk columnar cache for the source CSV datasets.
+
+The first load of a CSV parses it once and writes a typed Parquet copy in the
+cache directory. Later loads (new container, new worker, streamlit restart)
+read the Parquet file instead of parsing the text again. A cache entry is
+keyed on the SHA-256 of the source file; its size and mtime are kept in a
+small sidecar so an unchanged source is recognised without being re-hashed.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from webapp_mangetamain.utils.profiling import instrument
+
+DEFAULT_CACHE_DIR = "artifacts/cache"
+
+# frames already loaded in this process, keyed by resolved source path
+_loaded_frames: dict[str, pd.DataFrame] = {}
+
+
+def file_sha256(path: str | os.PathLike, chunk_size: int = 1 << 20) -> str:
+    """Return the hex SHA-256 digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write_text(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def source_fingerprint(source: str | os.PathLike, cache_dir: str | os.PathLike = DEFAULT_CACHE_DIR) -> str:
+    """
+    Return the SHA-256 of ``source``, reusing the recorded hash when the
+    file size and mtime are unchanged since it was last computed.
+    """
+    source = Path(source)
+    stat = source.stat()
+    meta_path = Path(cache_dir) / f"{source.stem}.meta.json"
+
+    meta = {}
+    if meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            meta = {}
+
+    if (
+        meta.get("source") == str(source.resolve())
+        and meta.get("size") == stat.st_size
+        and meta.get("mtime_ns") == stat.st_mtime_ns
+        and meta.get("sha256")
+    ):
+        return meta["sha256"]
+
+    sha = file_sha256(source)
+    meta_path.parent.mkdir(parents=True, exist_ok=True)
+    _atomic_write_text(meta_path, json.dumps({
+        "source": str(source.resolve()),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": sha,
+    }, indent=2))
+    return sha
+
+
+def cache_path_for(source: str | os.PathLike, cache_dir: str | os.PathLike = DEFAULT_CACHE_DIR,
+                   suffix: str = ".parquet") -> Path:
+    """Return the cache file path of ``source`` for its current content."""
+    source = Path(source)
+    sha = source_fingerprint(source, cache_dir)
+    return Path(cache_dir) / f"{source.stem}-{sha[:16]}{suffix}"
+
+
+def parquet_cache(source: str | os.PathLike, cache_dir: str | os.PathLike = DEFAULT_CACHE_DIR) -> Path:
+    """Return the Parquet copy of ``source``, writing it first if needed."""
+    parquet_path = cache_path_for(source, cache_dir)
+    if not parquet_path.exists():
+        df = pd.read_csv(source)
+        tmp = parquet_path.with_name(parquet_path.name + ".tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, parquet_path)
+        # older cache entries of the same source are now stale
+        for stale in parquet_path.parent.glob(f"{Path(source).stem}-*.parquet"):
+            if stale != parquet_path:
+                stale.unlink(missing_ok=True)
+    return parquet_path
+
+
+def read_columns(source: str | os.PathLike, cache_dir: str | os.PathLike = DEFAULT_CACHE_DIR,
+                 columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Read ``columns`` of ``source`` from its Parquet copy (all if None;
+    columns absent from the file are skipped). Nothing is kept in memory.
+    """
+    parquet_path = parquet_cache(source, cache_dir)
+    if columns is not None:
+        available = set(pq.read_schema(parquet_path).names)
+        columns = [c for c in columns if c in available]
+    return pd.read_parquet(parquet_path, columns=columns)
+
+
+@instrument
+def load_dataset(source: str | os.PathLike, cache_dir: str | os.PathLike = DEFAULT_CACHE_DIR) -> pd.DataFrame:
+    """
+    Load a CSV dataset through the Parquet cache.
+
+    The frame is parsed at most once per process for a given path, even if
+    several config keys point at the same file. Callers that add columns
+    should work on a ``copy(deep=False)`` of the returned frame.
+    """
+    key = str(Path(source).resolve())
+    if key in _loaded_frames:
+        return _loaded_frames[key]
+
+    df = read_columns(source, cache_dir)
+    _loaded_frames[key] = df
+    return df
+
+
+def clear_memory_cache() -> None:
+    """Forget the frames loaded in this process (the disk cache is kept)."""
+    _loaded_frames.clear()
@@ -0,0 +1,223 @@
+"""Render cache for the matplotlib figures of the tabs.
+
+``show_figure`` calls a figure builder (a function returning a ``Figure`` or
+a tuple of figures), renders the result to PNG or SVG bytes, closes the
+figures and serves the bytes with ``st.image``. The bytes are stored under a
+key made of:
+
+- the dataset fingerprint (``load_config.dataset_fingerprint``);
+- the builder's module and name, and a hash of its module source
+  (``code_digest``), so editing a builder invalidates its images;
+- a hash of the config.json sections that shape the frames
+  (``config_digest``) and ``KEY_VERSION``;
+- the arguments passed through ``*args`` / ``**kwargs`` and ``key`` (widget
+  state), which must have a stable ``repr``.
+
+Frames go through ``data=``: they are passed to the builder first but are
+not part of the key, since they derive from the fingerprinted dataset and
+the config. Any widget value that shapes them must then be given in
+``key``, and ``KEY_VERSION`` bumped when code outside the builder's module
+changes them. On a hit, matplotlib is not touched at all.
+
+The cache is shared by every session of the server process and bounded in
+bytes (least recently used images are evicted first). With ``disk_dir`` set
+in the ``figure_cache`` section of config.json, images are also written
+there, so a restarted server starts warm.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from types import CodeType
+from typing import Callable
+
+import streamlit as st
+from matplotlib.figure import Figure
+
+from webapp_mangetamain.load_config import cfg
+from webapp_mangetamain.utils.figures import close
+
+# bump when a change outside the builders' modules (data preparation,
+# plotting helpers) changes the rendered figures
+KEY_VERSION = 2
+
+# config.json sections that do not change what the figures show
+_NEUTRAL_SECTIONS = ("cache_dir", "artifacts_dir", "compute_cache", "figure_cache", "profiling", "streaming")
+
+
+def _code_bytes(code: CodeType) -> bytes:
+    parts = [code.co_code]
+    for const in code.co_consts:
+        parts.append(_code_bytes(const) if isinstance(const, CodeType) else repr(const).encode("utf-8"))
+    return b"".join(parts)
+
+
+@functools.lru_cache(maxsize=None)
+def code_digest(func: Callable) -> str:
+    """Hash of the source of the module defining ``func`` (of its bytecode if there is no source file)."""
+    # builders are wrapped by @instrument: hash the module of the builder, not profiling.py
+    func = inspect.unwrap(func)
+    try:
+        source = Path(inspect.getsourcefile(func)).read_bytes()
+    except (TypeError, OSError):
+        source = _code_bytes(func.__code__)
+    return hashlib.sha256(source).hexdigest()
+
+
+def config_digest(config) -> str:
+    """Hash of the sections of ``config`` (a ``load_config.Config``) that shape the figure frames."""
+    sections = {name: value for name, value in vars(config).items() if name not in _NEUTRAL_SECTIONS}
+    return hashlib.sha256(json.dumps(sections, sort_keys=True, default=vars).encode("utf-8")).hexdigest()
+
+
+class FigureCache:
+    """Size-bounded LRU of rendered figures, with an optional disk tier."""
+
+    def __init__(self, max_bytes: int = 64 << 20, fmt: str = "png", dpi: int = 200,
+                 disk_dir: str | None = None, max_disk_bytes: int = 256 << 20, config_digest: str = ""):
+        self.max_bytes = max_bytes
+        self.fmt = fmt
+        self.dpi = dpi
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self.config_digest = config_digest
+        self._images: OrderedDict[str, list[bytes]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def key_for(self, fingerprint: str, func: Callable, args: tuple, kwargs: dict, key: tuple = ()) -> str:
+        """Hash of everything that determines the rendered images."""
+        payload = repr((KEY_VERSION, fingerprint, func.__module__, func.__qualname__, code_digest(func),
+                        self.config_digest, args, sorted(kwargs.items()), key, self.fmt, self.dpi))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> list[bytes] | None:
+        """Images stored under ``key`` (memory first, then disk), or None."""
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                return self._images[key]
+        images = self._read_disk(key)
+        if images is not None:
+            self._remember(key, images)
+        return images
+
+    def put(self, key: str, images: list[bytes]) -> None:
+        """Store ``images`` under ``key``, evicting the oldest entries if needed."""
+        self._remember(key, images)
+        self._write_disk(key, images)
+
+    def render(self, fingerprint: str, func: Callable, *args, data: tuple = (), key: tuple = (),
+               **kwargs) -> list[bytes]:
+        """
+        Rendered images of ``func(*data, *args, **kwargs)``, built only on a miss.
+
+        Returns:
+            One image (bytes) per figure returned by ``func``
+        """
+        cache_key = self.key_for(fingerprint, func, args, kwargs, key)
+        images = self.get(cache_key)
+        if images is None:
+            figures = func(*data, *args, **kwargs)
+            if not isinstance(figures, (tuple, list)):
+                figures = [figures]
+            images = [self.to_bytes(fig) for fig in figures]
+            self.put(cache_key, images)
+        return images
+
+    def to_bytes(self, fig: Figure) -> bytes:
+        """Render ``fig`` the way st.pyplot does, then close it."""
+        buffer = BytesIO()
+        try:
+            fig.savefig(buffer, format=self.fmt, dpi=self.dpi, bbox_inches="tight")
+        finally:
+            close(fig)
+        return buffer.getvalue()
+
+    def clear(self) -> None:
+        """Forget the in-memory images (the disk tier is kept)."""
+        with self._lock:
+            self._images.clear()
+            self._size = 0
+
+    def _remember(self, key: str, images: list[bytes]) -> None:
+        size = sum(len(image) for image in images)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._images:
+                self._size -= sum(len(image) for image in self._images.pop(key))
+            self._images[key] = images
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._size -= sum(len(image) for image in evicted)
+
+    def _disk_paths(self, key: str) -> list[Path]:
+        return sorted(self.disk_dir.glob(f"{key}-*.{self.fmt}"))
+
+    def _read_disk(self, key: str) -> list[bytes] | None:
+        if self.disk_dir is None:
+            return None
+        paths = self._disk_paths(key)
+        if not paths:
+            return None
+        for path in paths:
+            path.touch()
+        return [path.read_bytes() for path in paths]
+
+    def _write_disk(self, key: str, images: list[bytes]) -> None:
+        if self.disk_dir is None:
+            return
+        self.disk_dir.mkdir(parents=True, exist_ok=True)
+        for i, image in enumerate(images):
+            path = self.disk_dir / f"{key}-{i:02d}.{self.fmt}"
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_bytes(image)
+            tmp.replace(path)
+
+        # oldest files (by last use) go first once the tier is full
+        files = sorted(self.disk_dir.glob(f"*.{self.fmt}"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        for path in files:
+            if total <= self.max_disk_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+
+
+_settings = getattr(cfg, "figure_cache", None)
+
+FIGURE_CACHE = FigureCache(
+    max_bytes=getattr(_settings, "max_bytes", 64 << 20),
+    fmt=getattr(_settings, "format", "png"),
+    dpi=getattr(_settings, "dpi", 200),
+    disk_dir=getattr(_settings, "disk_dir", None),
+    max_disk_bytes=getattr(_settings, "max_disk_bytes", 256 << 20),
+    config_digest=config_digest(cfg),
+)
+
+
+def show_image(image: bytes, fmt: str | None = None) -> None:
+    """Display rendered figure bytes at container width."""
+    if (fmt or FIGURE_CACHE.fmt) == "svg":
+        st.image(image.decode("utf-8"), width="stretch")
+    else:
+        st.image(image, width="stretch")
+
+
+def render_figures(fingerprint: str, func: Callable, *args, data: tuple = (), key: tuple = (),
+                   **kwargs) -> list[bytes]:
+    """``FIGURE_CACHE.render``: images of the figures built by ``func``."""
+    return FIGURE_CACHE.render(fingerprint, func, *args, data=data, key=key, **kwargs)
+
+
+def show_figure(fingerprint: str, func: Callable, *args, data: tuple = (), key: tuple = (),
+                **kwargs) -> None:
+    """Display the figures built by ``func`` through the render cache."""
+    for image in render_figures(fingerprint, func, *args, data=data, key=key, **kwargs):
+        show_image(image)
@@ -0,0 +1,60 @@
+"""Figure factory for the plotting functions.
+
+Figures made with ``plt.subplots`` are registered with pyplot and stay alive
+(canvas, axes and render buffers) until ``plt.close`` is called on them. In a
+Streamlit server every rerun builds new figures, so any figure not closed on
+every path, exceptions included, grows the process memory for good.
+
+The builders of the tabs therefore create their figures with ``subplots``
+below: the figure is a plain ``matplotlib.figure.Figure`` that pyplot does not
+track, and it is released as soon as the caller drops it. ``show_pyplot`` and
+the ``figure`` context manager additionally close the figure whatever
+happens, which also covers figures made by seaborn figure-level functions
+(``sns.pairplot``), that are always registered with pyplot.
+"""
+from contextlib import contextmanager
+from typing import Iterator
+
+import matplotlib.pyplot as plt
+import streamlit as st
+from matplotlib.figure import Figure
+
+
+def subplots(nrows: int = 1, ncols: int = 1, *, figsize: tuple[float, float] | None = None,
+             **kwargs) -> tuple[Figure, object]:
+    """
+    ``plt.subplots`` without pyplot's figure registry.
+
+    Args:
+        figsize: Figure size in inches (matplotlib default if None)
+        **kwargs: Passed to ``Figure.subplots`` (sharex, squeeze, ...)
+
+    Returns:
+        Tuple (figure, axes) as returned by ``plt.subplots``
+    """
+    fig = Figure(figsize=figsize)
+    return fig, fig.subplots(nrows, ncols, **kwargs)
+
+
+def close(fig: Figure) -> None:
+    """Release ``fig``, whether or not pyplot tracks it."""
+    plt.close(fig)
+    fig.clear()
+
+
+@contextmanager
+def figure(nrows: int = 1, ncols: int = 1, **kwargs) -> Iterator[tuple[Figure, object]]:
+    """``subplots`` as a context manager: the figure is closed on exit."""
+    fig, axes = subplots(nrows, ncols, **kwargs)
+    try:
+        yield fig, axes
+    finally:
+        close(fig)
+
+
+def show_pyplot(fig: Figure) -> None:
+    """Display ``fig`` with st.pyplot, then close it (even if display fails)."""
+    try:
+        st.pyplot(fig)
+    finally:
+        close(fig)
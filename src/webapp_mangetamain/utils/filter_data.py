@@ -1,56 +1,113 @@
-"""filter drinks and foods"""
+"""filter drinks and foods
+
+Les fonctions de ce module sont pures et s'importent sans charger de
+données. Les tables dérivées du dataset (``recipes_clean``,
+``ingredients_exploded``, ``ingredient_counts``, ``tags_exploded``,
+``recipes_with_continent``, ``ingredient_and_continent``, ``cooccurrence``...)
+sont des attributs de ``DatasetContext``, calculés au premier accès puis
+mémorisés ; ``filter_data.<nom>`` renvoie celui du contexte par défaut.
+"""
+from functools import cached_property
+from pathlib import Path
+
 import pandas as pd
 import numpy as np
-import load_config
-import ast
-import re
-from load_config import cfg, recipe
+import webapp_mangetamain.load_config as load_config
+from webapp_mangetamain.load_config import cfg
+from webapp_mangetamain.utils.cooccurrence import (
+    CooccurrenceMatrices,
+    NeighborIndex,
+    load_cooccurrence,
+    load_neighbor_index,
+)
+from webapp_mangetamain.utils.food_drink import classify_tags, is_drink_recipe
+from webapp_mangetamain.utils.ingredient_cube import ContinentIngredientCube, load_ingredient_cube
+from webapp_mangetamain.utils.ingestion import ListColumn, ParsedRecipes, parse_list
+from webapp_mangetamain.utils.profiling import instrument
 
 
-recipes = load_config.recipe
+# colonnes filtrées par general_complexity_prepocessing
+TRIM_COLUMNS = ["minutes", "n_steps", "n_ingredients"]
 
+_trimming = getattr(cfg, "complexity_trimming", None)
+TRIM_QUANTILE = getattr(_trimming, "quantile", 0.99)
+TRIM_MODE = getattr(_trimming, "mode", "sequential")
 
-def general_complexity_prepocessing(df: pd.DataFrame):
-    df = df.copy()
-    
-    for c in ["minutes", "n_steps", "n_ingredients"]:
-        df = df[df[c] > 0]
 
-    for c in ["minutes", "n_steps", "n_ingredients"]:
-        q = df[c].quantile(0.99)
-        df = df[df[c] <= q]
-        
-        df["log_minutes"] = np.log1p(df["minutes"])
+@instrument
+def complexity_mask(df: pd.DataFrame, columns: list[str] = TRIM_COLUMNS,
+                    quantile: float = TRIM_QUANTILE, mode: str = TRIM_MODE) -> np.ndarray:
+    """
+    Masque booléen des recettes gardées pour l'analyse de complexité :
+    valeurs strictement positives dans ``columns`` et sous leur quantile.
+
+    Args:
+        mode: "sequential" : le quantile d'une colonne est calculé sur les
+            lignes gardées par les colonnes précédentes (comportement
+            historique) ; "joint" : tous les quantiles sont calculés en une
+            passe sur les mêmes lignes (valeurs positives).
 
+    Returns:
+        Tableau numpy de booléens aligné sur les lignes de ``df``
+    """
+    values = np.column_stack([df[c].to_numpy(dtype=float) for c in columns])
+    mask = (values > 0).all(axis=1)
+    if mode == "joint":
+        bounds = np.quantile(values[mask], quantile, axis=0)
+        mask &= (values <= bounds).all(axis=1)
+    elif mode == "sequential":
+        for j in range(len(columns)):
+            mask &= values[:, j] <= np.quantile(values[mask, j], quantile)
+    else:
+        raise ValueError(f"unknown trimming mode {mode!r} (expected 'sequential' or 'joint')")
+    return mask
+
+
+@instrument
+def general_complexity_prepocessing(df: pd.DataFrame, mode: str = TRIM_MODE,
+                                    mask: np.ndarray | None = None) -> pd.DataFrame:
+    """
+    Recettes sans valeurs aberrantes de durée, d'étapes et d'ingrédients
+    (voir complexity_mask), avec la colonne ``log_minutes``.
+    Le masque peut être fourni s'il est déjà calculé.
+    """
+    if mask is None:
+        mask = complexity_mask(df, mode=mode)
+    df = df.loc[mask].copy()
+    df["log_minutes"] = np.log1p(df["minutes"])
     return df
 
 
-recipes_clean = general_complexity_prepocessing(recipes)
+@instrument
+def explode_list_column(df: pd.DataFrame, column: ListColumn, name: str) -> pd.DataFrame:
+    """
+    Build the (id, name) exploded DataFrame of ``df`` from a pre-parsed
+    list column, with names lowercased and stripped.
+    ``column`` is aligned with the positional index of the loaded dataset.
+    """
+    col = column.take(df.index.to_numpy()).map_vocabulary(lambda v: v.lower().strip())
+    lengths = col.lengths()
+    return pd.DataFrame(
+        {"id": np.repeat(df["id"].to_numpy(), lengths), name: col.values()},
+        index=np.repeat(df.index.to_numpy(), lengths),
+    )
 
 
-def parse_ingredients_column(df: pd.DataFrame) -> pd.DataFrame:
+@instrument
+def parse_ingredients_column(df: pd.DataFrame, parsed: ParsedRecipes | None = None) -> pd.DataFrame:
     """
     Transforme la colonne 'ingredients' en une vraie liste Python
     et crée un DataFrame (id, ingredient) propre pour analyse.
+    Si les colonnes pré-parsées du dataset chargé sont fournies,
+    elles sont utilisées au lieu de re-parser les chaînes.
     """
+    if parsed is not None:
+        return explode_list_column(df, parsed.ingredients, "ingredients")
+
     # on garde seulement les colonnes utiles
     df = df[["id", "ingredients"]].copy()
 
-    # 2parser les listes de chaînes de caractères
-    def parse_list(x):
-        if isinstance(x, list):
-            return x
-        if isinstance(x, str):
-            try:
-                val = ast.literal_eval(x)
-                if isinstance(val, list):
-                    return val
-                else:
-                    return [val]
-            except Exception:
-                return [x]
-        return []
-
+    # parser les listes de chaînes de caractères
     df["ingredients"] = df["ingredients"].apply(parse_list)
 
     # exploser pour avoir 1 ligne = 1 ingrédient par recette
@@ -67,6 +124,7 @@ def parse_ingredients_column(df: pd.DataFrame) -> pd.DataFrame:
     return exploded 
 
 
+@instrument
 def preprocess_ingredients(df: pd.DataFrame) -> pd.DataFrame:
     """
     Explode recipe ingredients and count occurrences.
@@ -81,21 +139,6 @@ def preprocess_ingredients(df: pd.DataFrame) -> pd.DataFrame:
     )
     return ingredient_counts
 
-ingredients_exploded = parse_ingredients_column(recipes_clean)
-ingredient_counts = preprocess_ingredients(ingredients_exploded)
-
-ingredient_counts = (
-    ingredient_counts
-    .rename("count")                # nomme la série
-    .reset_index()                  # passe l'index en colonne
-    .rename(columns={"index": "ingredient"})
-)
-
-
-
-co_occurrence = pd.read_csv("artifacts/co_occurrence.csv", index_col=0)
-jaccard = pd.read_csv("artifacts/jaccard.csv", index_col=0)
-
 
 def filter_counts_window(ingredient_counts: pd.DataFrame, min_count: int, max_count: int | None = None) -> pd.DataFrame:
     """
@@ -106,62 +149,68 @@ def filter_counts_window(ingredient_counts: pd.DataFrame, min_count: int, max_co
     else:
         mask = (ingredient_counts["count"] >= min_count) & (ingredient_counts["count"] <= max_count)
     return ingredient_counts.loc[mask].reset_index(drop=True)
-recipes_clean = general_complexity_prepocessing(recipe)
 
 
 # ################
 # drinks vs foods
 # ################
 
-_drink_re = re.compile("|".join(cfg.DRINK_KEYWORDS), flags=re.IGNORECASE)
+@instrument
+def classify_drink_recipes(tags: ListColumn) -> np.ndarray:
+    """
+    Label boisson (True) / nourriture (False) de chaque recette de ``tags``.
+    Les regex DRINK_KEYWORDS, DRINK_FALSE_POSITIVES et FOOD_KEYWORDS de la
+    config sont évaluées une seule fois par tag distinct (voir utils/food_drink.py).
+    """
+    tag_kinds = classify_tags(tags.vocabulary, cfg.DRINK_KEYWORDS, cfg.DRINK_FALSE_POSITIVES, cfg.FOOD_KEYWORDS)
+    return is_drink_recipe(tags, tag_kinds)
+
 
-def separate_foods_drinks(recipes_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+@instrument
+def separate_foods_drinks(recipes_df: pd.DataFrame,
+                          parsed: ParsedRecipes | None = None,
+                          drink_labels: np.ndarray | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
     """
     Sépare les recettes en deux DataFrames : boissons et nourriture.
 
     Args:
         recipes_df: DataFrame contenant les recettes avec une colonne 'tags'.
+        parsed: colonnes pré-parsées du dataset chargé (optionnel) ; les
+            tags sont alors lus depuis leur index au lieu des chaînes.
+        drink_labels: labels boisson déjà calculés pour tout le dataset
+            chargé (load_config.get_drink_labels), indexés par position.
 
     Returns:
         Tuple de deux DataFrames : (food_recipes, drink_recipes).
     """
-    tags_exploded = recipes_df.explode("tags")
-
-    drink_ids = tags_exploded[
-        tags_exploded["tags"].str.contains(_drink_re, regex=True)
-    ]["id"].unique()
-
-    drink_recipes = recipes_df[recipes_df["id"].isin(drink_ids)]
-    food_recipes = recipes_df[~recipes_df["id"].isin(drink_ids)]
+    positions = recipes_df.index.to_numpy()
+    if drink_labels is not None:
+        drink_mask = np.asarray(drink_labels)[positions]
+    elif parsed is not None:
+        drink_mask = classify_drink_recipes(parsed.tags.take(positions))
+    else:
+        drink_mask = classify_drink_recipes(ListColumn.from_lists(recipes_df["tags"].apply(parse_list)))
 
-    return food_recipes, drink_recipes
+    return recipes_df[~drink_mask], recipes_df[drink_mask]
 
 
 
 
-def parse_tags_column(df: pd.DataFrame) -> pd.DataFrame:
+@instrument
+def parse_tags_column(df: pd.DataFrame, parsed: ParsedRecipes | None = None) -> pd.DataFrame:
     """
     Transforme la colonne 'tags' en une vraie liste Python
     et crée un DataFrame (id, tags) propre pour analyse.
+    Si les colonnes pré-parsées du dataset chargé sont fournies,
+    elles sont utilisées au lieu de re-parser les chaînes.
     """
+    if parsed is not None:
+        return explode_list_column(df, parsed.tags, "tags")
+
     # on garde seulement les colonnes utiles
     df = df[["id", "tags"]].copy()
 
     #  parser les listes de chaînes de caractères
-    def parse_list(x):
-        if isinstance(x, list):
-            return x
-        if isinstance(x, str):
-            try:
-                val = ast.literal_eval(x)
-                if isinstance(val, list):
-                    return val
-                else:
-                    return [val]
-            except Exception:
-                return [x]
-        return []
-
     df["tags"] = df["tags"].apply(parse_list)
 
     # exploser pour avoir 1 ligne = 1 ingrédient par recette
@@ -177,8 +226,6 @@ def parse_tags_column(df: pd.DataFrame) -> pd.DataFrame:
 
     return exploded
 
-tags_exploded = parse_tags_column(recipes_clean)
-
 
 WORLD_CUISINES = {
     "North America": [
@@ -221,17 +268,216 @@ CUISINE_TO_REGION = {}
 for region, cuisines in WORLD_CUISINES.items():
     for tag in cuisines:
         CUISINE_TO_REGION[tag] = region
-tags_exploded["continent"] = tags_exploded["tags"].map(CUISINE_TO_REGION)
 
+# régions dans l'ordre de WORLD_CUISINES : code int8 d'une région et bit de son masque
+REGIONS = list(WORLD_CUISINES)
 
-recipe_continent = tags_exploded.dropna(subset=["continent"]).drop_duplicates("id")
 
-recipes_with_continent = recipes_clean.merge(
-    recipe_continent[["id", "continent"]],
-    on="id",
-    how="left"
-)
+def region_lookup(vocabulary: np.ndarray) -> np.ndarray:
+    """
+    Code de région (position dans REGIONS) de chaque tag du vocabulaire,
+    -1 pour les tags qui ne sont pas une cuisine.
+    """
+    codes = {region: i for i, region in enumerate(REGIONS)}
+    return np.array(
+        [codes.get(CUISINE_TO_REGION.get(str(tag).lower().strip()), -1) for tag in vocabulary],
+        dtype=np.int8,
+    )
+
+
+def recipe_tags(df: pd.DataFrame, parsed: ParsedRecipes | None = None) -> ListColumn:
+    """Tags des recettes de ``df``, pré-parsés si possible."""
+    if parsed is not None:
+        return parsed.tags.take(df.index.to_numpy())
+    return ListColumn.from_lists(parse_list(x) for x in df["tags"])
+
+
+@instrument
+def resolve_regions(tags: ListColumn) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Région de chaque recette sans exploser les tags : la région du premier
+    tag de cuisine de la liste, et le masque de toutes ses régions.
+
+    Returns:
+        Tuple (continent, regions) : codes int8 de REGIONS (-1 sans cuisine)
+        et masque uint8 où le bit ``i`` vaut 1 si un tag est de REGIONS[i]
+    """
+    item_regions = region_lookup(tags.vocabulary)[tags.codes]
+    hits = np.flatnonzero(item_regions >= 0)
+    rows = tags.row_positions()[hits]
+    hit_regions = item_regions[hits]
 
-recipes_with_continent["log_minutes"] = np.log1p(recipes_with_continent["minutes"])
+    continent = np.full(len(tags), -1, dtype=np.int8)
+    # les tags sont dans l'ordre des lignes : le premier de chaque ligne gagne
+    first_rows, first = np.unique(rows, return_index=True)
+    continent[first_rows] = hit_regions[first]
+
+    regions = np.zeros(len(tags), dtype=np.uint8)
+    for i in range(len(REGIONS)):
+        regions[rows[hit_regions == i]] |= np.uint8(1 << i)
+    return continent, regions
+
+
+def continent_column(codes: np.ndarray) -> pd.Categorical:
+    """Colonne catégorielle (codes int8) des noms de région, NaN pour -1."""
+    return pd.Categorical.from_codes(codes, categories=REGIONS)
+
+
+def region_names(mask: int) -> list[str]:
+    """Régions d'un masque de ``resolve_regions``."""
+    return [region for i, region in enumerate(REGIONS) if int(mask) >> i & 1]
+
+
+# ################
+# dataset context
+# ################
+
+class DatasetContext:
+    """
+    Tables dérivées d'un dataset de recettes, calculées au premier accès.
+
+    Args:
+        recipes: DataFrame des recettes (par défaut load_config.recipe,
+            chargé seulement quand une table en a besoin)
+        parsed: colonnes pré-parsées alignées sur ``recipes`` (par défaut
+            load_config.recipe_parsed si ``recipes`` n'est pas fourni)
+        artifacts_dir: dossier des artefacts générés par generate_matrix
+        trim_mode: calcul des quantiles de complexity_mask ("sequential"
+            ou "joint")
+    """
 
-ingredient_and_continent = recipe_continent.merge(ingredients_exploded, on="id", how='left')
+    def __init__(self, recipes: pd.DataFrame | None = None, parsed: ParsedRecipes | None = None,
+                 artifacts_dir: str = "artifacts", trim_mode: str = TRIM_MODE):
+        self._recipes = recipes
+        self._parsed = parsed
+        self.artifacts_dir = Path(artifacts_dir)
+        self.trim_mode = trim_mode
+
+    @cached_property
+    def recipes(self) -> pd.DataFrame:
+        return load_config.recipe if self._recipes is None else self._recipes
+
+    @cached_property
+    def parsed(self) -> ParsedRecipes | None:
+        return load_config.recipe_parsed if self._recipes is None else self._parsed
+
+    @cached_property
+    def clean_mask(self) -> np.ndarray:
+        # un seul masque pour les onglets complexité, cuisine locale et ingrédients
+        return complexity_mask(self.recipes, mode=self.trim_mode)
+
+    @cached_property
+    @instrument
+    def recipes_clean(self) -> pd.DataFrame:
+        return general_complexity_prepocessing(self.recipes, mask=self.clean_mask)
+
+    @cached_property
+    @instrument
+    def ingredients_exploded(self) -> pd.DataFrame:
+        return parse_ingredients_column(self.recipes_clean, self.parsed)
+
+    @cached_property
+    @instrument
+    def ingredient_counts(self) -> pd.DataFrame:
+        return (
+            preprocess_ingredients(self.ingredients_exploded)
+            .rename("count")                # nomme la série
+            .reset_index()                  # passe l'index en colonne
+            .rename(columns={"index": "ingredient"})
+        )
+
+    @cached_property
+    def cooccurrence(self) -> CooccurrenceMatrices:
+        # memory-mapped co-occurrence / Jaccard matrices (see utils/cooccurrence.py)
+        return load_cooccurrence(self.artifacts_dir / "cooccurrence")
+
+    @cached_property
+    def neighbor_index(self) -> NeighborIndex:
+        return load_neighbor_index(self.artifacts_dir / "neighbors")
+
+    @cached_property
+    @instrument
+    def tags_exploded(self) -> pd.DataFrame:
+        tags_exploded = parse_tags_column(self.recipes_clean, self.parsed)
+        tags_exploded["continent"] = tags_exploded["tags"].map(CUISINE_TO_REGION)
+        return tags_exploded
+
+    @cached_property
+    @instrument
+    def recipe_regions(self) -> tuple[np.ndarray, np.ndarray]:
+        # (continent int8, masque des régions) de chaque recette de recipes_clean
+        return resolve_regions(recipe_tags(self.recipes_clean, self.parsed))
+
+    @cached_property
+    @instrument
+    def recipe_continent(self) -> pd.DataFrame:
+        continent, _ = self.recipe_regions
+        has_continent = continent >= 0
+        return pd.DataFrame({
+            "id": self.recipes_clean["id"].to_numpy()[has_continent],
+            "continent": continent_column(continent[has_continent]),
+        })
+
+    @cached_property
+    @instrument
+    def recipes_with_continent(self) -> pd.DataFrame:
+        # log_minutes vient déjà de recipes_clean
+        continent, regions = self.recipe_regions
+        return self.recipes_clean.assign(continent=continent_column(continent), regions=regions)
+
+    @cached_property
+    @instrument
+    def ingredient_and_continent(self) -> pd.DataFrame:
+        continent, _ = self.recipe_regions
+        exploded = self.ingredients_exploded
+        # lignes explosées -> position de leur recette dans recipes_clean
+        codes = continent[self.recipes_clean.index.get_indexer(exploded.index)]
+        has_continent = codes >= 0
+        return exploded[has_continent].assign(continent=continent_column(codes[has_continent]))
+
+    @cached_property
+    @instrument
+    def ingredient_cube(self) -> ContinentIngredientCube:
+        # comptes continent x ingrédient de l'onglet Local Food, lus dans
+        # artifacts/ si build_artifacts les a produits pour ce dataset
+        if self._recipes is None and self.trim_mode == TRIM_MODE:
+            path = load_config.prebuilt("ingredient_cube")
+            if path is not None:
+                return load_ingredient_cube(path)
+        return ContinentIngredientCube.from_frame(self.ingredient_and_continent)
+
+    def loaded_tables(self) -> dict[str, pd.DataFrame]:
+        """Tables déjà calculées (DataFrames seulement), par nom."""
+        return {name: value for name, value in vars(self).items()
+                if name in LAZY_TABLES and isinstance(value, pd.DataFrame)}
+
+
+# attributs du module servis par le contexte par défaut
+LAZY_TABLES = [name for name, value in vars(DatasetContext).items() if isinstance(value, cached_property)]
+
+_context: DatasetContext | None = None
+
+
+def get_context() -> DatasetContext:
+    """Contexte par défaut, construit sur load_config.recipe au premier appel."""
+    global _context
+    if _context is None:
+        _context = DatasetContext()
+    return _context
+
+
+def reset_context() -> None:
+    """Oublie les tables calculées (elles seront recalculées au prochain accès)."""
+    global _context
+    _context = None
+
+
+def get_neighbor_index() -> NeighborIndex:
+    """Voisins de chaque ingrédient triés par Jaccard, chargés à la première demande."""
+    return get_context().neighbor_index
+
+
+def __getattr__(name):
+    if name in LAZY_TABLES:
+        return getattr(get_context(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
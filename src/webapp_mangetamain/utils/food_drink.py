@@ -0,0 +1,105 @@
+"""Food / drink classification of recipes from their tags.
+
+The keyword regexes of config.json are evaluated once per distinct tag, not
+per recipe:
+
+- a tag matching ``FOOD_KEYWORDS`` is a food tag;
+- otherwise, a tag matching ``DRINK_KEYWORDS`` but none of
+  ``DRINK_FALSE_POSITIVES`` (e.g. "coffee-cakes") is a drink tag.
+
+A recipe is a drink when it has a drink tag and no food tag. Recipe labels
+are then a bincount of the tag kinds over the tag index, and can be
+persisted in the dataset cache as a boolean column (``load_drink_labels``).
+"""
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from webapp_mangetamain.utils.dataset_cache import DEFAULT_CACHE_DIR, cache_path_for
+from webapp_mangetamain.utils.ingestion import ListColumn
+from webapp_mangetamain.utils.profiling import instrument
+
+TAG_NEUTRAL = 0
+TAG_DRINK = 1
+TAG_FOOD = 2
+
+
+def compile_keywords(patterns: Iterable[str]) -> re.Pattern | None:
+    """Case-insensitive alternation of ``patterns`` (None if there are none)."""
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in patterns), flags=re.IGNORECASE)
+
+
+def classify_tags(vocabulary: np.ndarray, drink_keywords: Iterable[str],
+                  drink_false_positives: Iterable[str] = (),
+                  food_keywords: Iterable[str] = ()) -> np.ndarray:
+    """
+    Kind of each tag of ``vocabulary``.
+
+    Returns:
+        int8 array of TAG_NEUTRAL / TAG_DRINK / TAG_FOOD
+    """
+    drink_re = compile_keywords(drink_keywords)
+    false_positive_re = compile_keywords(drink_false_positives)
+    food_re = compile_keywords(food_keywords)
+
+    def kind(tag: str) -> int:
+        if food_re is not None and food_re.search(tag):
+            return TAG_FOOD
+        if drink_re is not None and drink_re.search(tag):
+            if false_positive_re is None or not false_positive_re.search(tag):
+                return TAG_DRINK
+        return TAG_NEUTRAL
+
+    return np.fromiter((kind(str(tag)) for tag in vocabulary), dtype=np.int8, count=len(vocabulary))
+
+
+def is_drink_recipe(tags: ListColumn, tag_kinds: np.ndarray) -> np.ndarray:
+    """Boolean drink label of each row of ``tags`` (kinds indexed by tag code)."""
+    rows = tags.row_positions()
+    kinds = tag_kinds[tags.codes]
+    has_drink = np.bincount(rows[kinds == TAG_DRINK], minlength=len(tags)) > 0
+    has_food = np.bincount(rows[kinds == TAG_FOOD], minlength=len(tags)) > 0
+    return has_drink & ~has_food
+
+
+def rules_hash(*keyword_lists: Iterable[str]) -> str:
+    """Short hash of the keyword lists, to key persisted labels on the rules."""
+    payload = json.dumps([list(k) for k in keyword_lists])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+@instrument
+def load_drink_labels(source: str | os.PathLike, tags: ListColumn,
+                      drink_keywords: Iterable[str], drink_false_positives: Iterable[str] = (),
+                      food_keywords: Iterable[str] = (),
+                      cache_dir: str | os.PathLike = DEFAULT_CACHE_DIR) -> np.ndarray:
+    """
+    Drink labels of the recipes of ``source``, stored in the cache directory
+    under the source hash and the hash of the rules.
+
+    Args:
+        source: CSV the tags were parsed from
+        tags: Tag column of the whole dataset (e.g. ParsedRecipes.tags)
+    """
+    keywords = [list(drink_keywords), list(drink_false_positives), list(food_keywords)]
+    path = cache_path_for(source, cache_dir, suffix=f".drinks-{rules_hash(*keywords)}.npy")
+    if path.exists():
+        return np.load(path)
+
+    labels = is_drink_recipe(tags, classify_tags(tags.vocabulary, *keywords))
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp.npy")
+    np.save(tmp, labels)
+    os.replace(tmp, path)
+    for stale in path.parent.glob(f"{Path(source).stem}-*.drinks-*.npy"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    return labels
@@ -0,0 +1,380 @@
+"""Parse the stringified list columns of a recipe dataset once.
+
+Food.com stores ``tags``, ``ingredients``, ``steps`` and ``nutrition`` as
+Python list literals in text. This module turns them into compact arrays a
+single time per source file and persists the result next to the Parquet
+cache, so analyzers never run ``ast.literal_eval`` themselves:
+
+- list columns become a ``ListColumn``: ``offsets`` (int64, one more than the
+  number of recipes), ``codes`` (int32 index into ``vocabulary``) and a sorted
+  ``vocabulary`` of the distinct strings;
+- ``nutrition`` becomes a (n_recipes, 7) float matrix.
+
+Rows are aligned with the positional index of the frame returned by
+``load_config``, so ``parsed.take(df.index)`` selects the rows of any subset
+of that frame.
+
+Food.com lists are written like Python's ``repr`` (``['a', 'b']``):
+``tokenize_list`` splits that form directly and only the rows it cannot
+handle go through ``parse_list``. Large frames are parsed in shards by a
+process pool; each shard sends back its offsets, codes and vocabulary as
+NumPy arrays (the vocabulary as one UTF-8 buffer), not Python lists.
+"""
+import ast
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property
+from itertools import chain
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from webapp_mangetamain.utils.dataset_cache import DEFAULT_CACHE_DIR, cache_path_for, read_columns
+from webapp_mangetamain.utils.profiling import instrument
+
+LIST_COLUMNS = ["tags", "ingredients", "steps"]
+NUTRITION_WIDTH = 7
+
+# rows per shard of the parallel parser; smaller frames are parsed in-process
+PARSE_SHARD_ROWS = 20_000
+
+_NUMBER_LIST = re.compile(r"\[[-+0-9.eE, ]+\]")
+
+_parsed_recipes: dict[str, "ParsedRecipes"] = {}
+
+
+def parse_list(x) -> list:
+    """
+    Parse one stringified list, tolerating already-parsed and odd values:
+    lists are returned as-is, non-list literals are wrapped, unparsable
+    strings become a one-element list and anything else an empty list.
+    """
+    if isinstance(x, list):
+        return x
+    if isinstance(x, str):
+        try:
+            val = ast.literal_eval(x)
+            if isinstance(val, list):
+                return val
+            else:
+                return [val]
+        except Exception:
+            return [x]
+    return []
+
+
+def tokenize_list(text: str) -> list[str] | None:
+    """
+    Split a list of strings written like Python's repr (``['a', 'b']``)
+    without evaluating it. Returns None when ``text`` is not exactly in that
+    form (double quotes, escapes, numbers, other spacing...).
+    """
+    if text == "[]":
+        return []
+    # under 4 characters the "['" prefix and "']" suffix overlap ("[']")
+    if (len(text) < 4 or not (text.startswith("['") and text.endswith("']"))
+            or '"' in text or "\\" in text):
+        return None
+    body = text[2:-2]
+    items = body.split("', '")
+    # items hold no quote (repr would have used double quotes): any other
+    # quote than the separators' means the text is not a plain list
+    if body.count("'") != 2 * (len(items) - 1):
+        return None
+    return items
+
+
+def parse_items(x) -> list[str]:
+    """
+    Items of one stringified list as strings (None items dropped), through
+    ``tokenize_list`` when possible and ``parse_list`` otherwise.
+    """
+    if isinstance(x, str):
+        items = tokenize_list(x)
+        if items is not None:
+            return items
+    return [str(v) for v in parse_list(x) if v is not None]
+
+
+def parse_numbers(x, width: int) -> list[float] | None:
+    """``width`` floats of a stringified number list, or None if invalid."""
+    if isinstance(x, str) and _NUMBER_LIST.fullmatch(x):
+        try:
+            values = [float(v) for v in x[1:-1].split(",")]
+        except ValueError:
+            values = None
+        if values is not None:
+            return values if len(values) == width else None
+    values = parse_list(x)
+    if len(values) != width:
+        return None
+    try:
+        return [float(v) for v in values]
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class ListColumn:
+    """A column of string lists stored as offsets + dictionary codes."""
+
+    offsets: np.ndarray
+    codes: np.ndarray
+    vocabulary: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @classmethod
+    def from_lists(cls, lists) -> "ListColumn":
+        """Build a column from an iterable of lists (None items are dropped)."""
+        lists = [[str(v) for v in lst if v is not None] for lst in lists]
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(lst) for lst in lists], out=offsets[1:])
+        flat = np.array(list(chain.from_iterable(lists)), dtype=object)
+        codes, vocabulary = pd.factorize(flat, sort=True)
+        return cls(offsets, codes.astype(np.int32), np.asarray(vocabulary, dtype=object))
+
+    def lengths(self) -> np.ndarray:
+        """Number of items of each row."""
+        return np.diff(self.offsets)
+
+    def counts(self) -> np.ndarray:
+        """Number of occurrences of each vocabulary entry."""
+        return np.bincount(self.codes, minlength=len(self.vocabulary))
+
+    def row_positions(self) -> np.ndarray:
+        """Row number of each item of ``codes``."""
+        return np.repeat(np.arange(len(self), dtype=np.int64), self.lengths())
+
+    def values(self) -> np.ndarray:
+        """Flat array of the item strings."""
+        return self.vocabulary[self.codes]
+
+    def take(self, positions) -> "ListColumn":
+        """Return the rows at ``positions`` (same vocabulary)."""
+        positions = np.asarray(positions, dtype=np.int64)
+        starts = self.offsets[positions]
+        lengths = self.offsets[positions + 1] - starts
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        items = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return ListColumn(offsets, self.codes[items], self.vocabulary)
+
+    def map_vocabulary(self, func: Callable[[str], str]) -> "ListColumn":
+        """Apply ``func`` to every distinct string, merging values that collide."""
+        mapped = np.array([func(v) for v in self.vocabulary], dtype=object)
+        vocabulary, inverse = np.unique(mapped, return_inverse=True)
+        return ListColumn(self.offsets, inverse.astype(np.int32)[self.codes], vocabulary)
+
+    def to_lists(self) -> list[list[str]]:
+        """Materialize the rows as Python lists."""
+        values = self.values().tolist()
+        bounds = self.offsets.tolist()
+        return [values[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+@dataclass(frozen=True)
+class ParsedRecipes:
+    """Pre-parsed list and nutrition columns of a recipe dataset."""
+
+    tags: ListColumn
+    ingredients: ListColumn
+    steps: ListColumn
+    nutrition: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.nutrition)
+
+    def take(self, positions) -> "ParsedRecipes":
+        """Return the recipes at ``positions``."""
+        positions = np.asarray(positions, dtype=np.int64)
+        return ParsedRecipes(
+            tags=self.tags.take(positions),
+            ingredients=self.ingredients.take(positions),
+            steps=self.steps.take(positions),
+            nutrition=self.nutrition[positions],
+        )
+
+    @cached_property
+    def tag_bitmaps(self):
+        """Inverted tag -> recipes index (``TagBitmapIndex``), built on first use."""
+        from webapp_mangetamain.utils.tag_bitmap import TagBitmapIndex
+
+        return TagBitmapIndex.from_tags(self.tags)
+
+
+def parse_nutrition_matrix(series, width: int = NUTRITION_WIDTH) -> np.ndarray:
+    """Parse a stringified nutrition column into a float matrix (NaN rows when invalid)."""
+    out = np.full((len(series), width), np.nan)
+    for i, raw in enumerate(series):
+        values = parse_numbers(raw, width)
+        if values is not None:
+            out[i] = values
+    return out
+
+
+def encode_strings(values) -> tuple[np.ndarray, np.ndarray]:
+    """UTF-8 buffer and offsets of ``values``."""
+    encoded = [s.encode("utf-8") for s in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def decode_strings(blob: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Strings of a buffer written by ``encode_strings``, as an object array."""
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return np.array([data[a:b].decode("utf-8") for a, b in zip(bounds[:-1], bounds[1:])], dtype=object)
+
+
+def _parse_shard(raw: dict[str, list], nutrition: list | None, nutrition_width: int, encode: bool) -> dict:
+    """
+    Parse a slice of the raw columns. Each list column comes back as
+    (lengths, codes, vocabulary), the codes indexing a shard-local
+    vocabulary (encoded with ``encode_strings`` when sent to another process).
+    """
+    out = {}
+    for col, values in raw.items():
+        lists = [parse_items(x) for x in values]
+        lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+        codes, vocabulary = pd.factorize(np.array(list(chain.from_iterable(lists)), dtype=object))
+        vocabulary = np.asarray(vocabulary, dtype=object)
+        out[col] = (lengths, codes.astype(np.int32), encode_strings(vocabulary) if encode else vocabulary)
+    if nutrition is not None:
+        out["nutrition"] = parse_nutrition_matrix(nutrition, nutrition_width)
+    return out
+
+
+def _merge_lists(parts: list[tuple], encoded: bool) -> ListColumn:
+    """One ListColumn (sorted vocabulary) from the shards' (lengths, codes, vocabulary)."""
+    vocabularies = [decode_strings(*vocab) if encoded else vocab for _, _, vocab in parts]
+    starts = np.cumsum([0] + [len(v) for v in vocabularies])
+    inverse, vocabulary = pd.factorize(
+        np.concatenate(vocabularies) if vocabularies else np.array([], dtype=object), sort=True
+    )
+    codes = np.concatenate(
+        [inverse[start + codes] for (_, codes, _), start in zip(parts, starts)]
+    ) if parts else np.array([], dtype=np.int64)
+    offsets = np.zeros(sum(len(lengths) for lengths, _, _ in parts) + 1, dtype=np.int64)
+    if parts:
+        np.cumsum(np.concatenate([lengths for lengths, _, _ in parts]), out=offsets[1:])
+    return ListColumn(offsets, codes.astype(np.int32), np.asarray(vocabulary, dtype=object))
+
+
+@instrument
+def parse_recipes(df: pd.DataFrame, nutrition_width: int = NUTRITION_WIDTH, jobs: int | None = None) -> ParsedRecipes:
+    """
+    Parse every list column of ``df`` (missing columns become empty lists).
+
+    Args:
+        jobs: Worker processes for frames of at least 2 * PARSE_SHARD_ROWS
+            rows (default: one per CPU; 1 parses in-process)
+    """
+    n = len(df)
+    raw = {col: df[col].tolist() if col in df.columns else [None] * n for col in LIST_COLUMNS}
+    nutrition = df["nutrition"].tolist() if "nutrition" in df.columns else None
+
+    jobs = (os.cpu_count() or 1) if jobs is None else jobs
+    n_shards = min(n // PARSE_SHARD_ROWS, 4 * jobs) if jobs > 1 else 1
+    if n_shards <= 1:
+        shards = [_parse_shard(raw, nutrition, nutrition_width, encode=False)]
+    else:
+        bounds = np.linspace(0, n, n_shards + 1).astype(int).tolist()
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            shards = list(pool.map(
+                _parse_shard,
+                [{col: values[a:b] for col, values in raw.items()} for a, b in zip(bounds[:-1], bounds[1:])],
+                [nutrition[a:b] if nutrition is not None else None for a, b in zip(bounds[:-1], bounds[1:])],
+                [nutrition_width] * n_shards,
+                [True] * n_shards,
+            ))
+
+    columns = {col: _merge_lists([shard[col] for shard in shards], encoded=n_shards > 1) for col in LIST_COLUMNS}
+    if nutrition is not None:
+        nutrition = np.concatenate([shard["nutrition"] for shard in shards])
+    else:
+        nutrition = np.full((n, nutrition_width), np.nan)
+    return ParsedRecipes(nutrition=nutrition, **columns)
+
+
+# -------------------------
+# Persistence
+# -------------------------
+
+def _save_vocabulary(directory: Path, name: str, vocabulary: np.ndarray) -> None:
+    blob, offsets = encode_strings(vocabulary)
+    np.save(directory / f"{name}.vocab.npy", blob)
+    np.save(directory / f"{name}.vocab_offsets.npy", offsets)
+
+
+def _load_vocabulary(directory: Path, name: str) -> np.ndarray:
+    return decode_strings(np.load(directory / f"{name}.vocab.npy"), np.load(directory / f"{name}.vocab_offsets.npy"))
+
+
+def save_parsed(parsed: ParsedRecipes, directory: str | os.PathLike) -> None:
+    """Write ``parsed`` as a directory of ``.npy`` files, atomically."""
+    directory = Path(directory)
+    tmp = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    for col in LIST_COLUMNS:
+        column = getattr(parsed, col)
+        np.save(tmp / f"{col}.offsets.npy", column.offsets)
+        np.save(tmp / f"{col}.codes.npy", column.codes)
+        _save_vocabulary(tmp, col, column.vocabulary)
+    np.save(tmp / "nutrition.npy", parsed.nutrition)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+
+
+def load_parsed(directory: str | os.PathLike, mmap_mode: str | None = "r") -> ParsedRecipes:
+    """Read a directory written by ``save_parsed`` (arrays are memory-mapped)."""
+    directory = Path(directory)
+    columns = {
+        col: ListColumn(
+            offsets=np.load(directory / f"{col}.offsets.npy", mmap_mode=mmap_mode),
+            codes=np.load(directory / f"{col}.codes.npy", mmap_mode=mmap_mode),
+            vocabulary=_load_vocabulary(directory, col),
+        )
+        for col in LIST_COLUMNS
+    }
+    nutrition = np.load(directory / "nutrition.npy", mmap_mode=mmap_mode)
+    return ParsedRecipes(nutrition=nutrition, **columns)
+
+
+@instrument
+def load_parsed_recipes(source: str | os.PathLike, cache_dir: str | os.PathLike = DEFAULT_CACHE_DIR,
+                        nutrition_width: int = NUTRITION_WIDTH, jobs: int | None = None) -> ParsedRecipes:
+    """
+    Return the parsed columns of the CSV at ``source``.
+
+    They are computed from the list columns of the Parquet copy of
+    ``source`` on first use, stored in the cache directory under the source
+    hash and reused afterwards (``jobs``: see ``parse_recipes``).
+    """
+    key = str(Path(source).resolve())
+    if key in _parsed_recipes:
+        return _parsed_recipes[key]
+
+    directory = cache_path_for(source, cache_dir, suffix=".parsed")
+    if directory.is_dir():
+        parsed = load_parsed(directory)
+    else:
+        raw = read_columns(source, cache_dir, LIST_COLUMNS + ["nutrition"])
+        parsed = parse_recipes(raw, nutrition_width, jobs=jobs)
+        save_parsed(parsed, directory)
+        for stale in directory.parent.glob(f"{Path(source).stem}-*.parsed"):
+            if stale != directory:
+                shutil.rmtree(stale, ignore_errors=True)
+
+    _parsed_recipes[key] = parsed
+    return parsed
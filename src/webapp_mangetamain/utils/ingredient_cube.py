@@ -0,0 +1,177 @@
+"""Continent x ingredient counts behind the Local Food tab.
+
+``ContinentIngredientCube`` is built once from ``ingredient_and_continent``:
+for each continent, the ingredients used by its recipes and their number of
+occurrences, stored as CSR arrays (continents are rows, ingredient codes the
+columns), plus the number of recipes containing each ingredient. A
+(top_n, global_threshold) query masks the ubiquitous ingredients and
+partitions each continent's row, without touching the exploded frame again.
+``save_ingredient_cube`` / ``load_ingredient_cube`` keep it as ``.npy``
+arrays for the offline artifact build.
+"""
+import os
+import shutil
+from dataclasses import dataclass, fields
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def _top_positions(counts: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the ``k`` largest ``counts``, by decreasing count then
+    increasing position (``sort_values`` followed by ``head`` on a frame
+    sorted by position).
+    """
+    if len(counts) > k:
+        kth = np.partition(counts, len(counts) - k)[len(counts) - k]
+        above = np.flatnonzero(counts > kth)
+        ties = np.flatnonzero(counts == kth)[:k - len(above)]
+        positions = np.concatenate([above, ties])
+    else:
+        positions = np.arange(len(counts))
+    return positions[np.argsort(-counts[positions], kind="stable")]
+
+
+@dataclass(frozen=True)
+class ContinentIngredientCube:
+    """
+    Ingredient occurrences per continent.
+
+    Row ``i`` (continent ``continents[i]``) holds the ingredient codes
+    ``indices[indptr[i]:indptr[i + 1]]`` (sorted, i.e. by label) and their
+    occurrences ``counts``. ``doc_freq[j]`` is the number of recipes
+    containing ``ingredients[j]`` among the ``n_recipes`` that have a
+    continent; ``empty_rows[i]`` counts the recipes of continent ``i``
+    without any ingredient.
+    """
+
+    continents: np.ndarray
+    ingredients: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    counts: np.ndarray
+    doc_freq: np.ndarray
+    n_recipes: int
+    empty_rows: np.ndarray
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ContinentIngredientCube":
+        """
+        Build the cube from one row per (recipe, ingredient).
+
+        Args:
+            df: DataFrame with ['id', 'continent', 'ingredients'] and
+                normalized ingredient names, e.g.
+                filter_data.ingredient_and_continent
+        """
+        df = df.dropna(subset=["continent"])
+        continent_codes, continents = pd.factorize(df["continent"], sort=True)
+        ingredient_codes, ingredients = pd.factorize(df["ingredients"], sort=True)
+        recipe_codes, recipes = pd.factorize(df["id"])
+        n_continents, n_ingredients = len(continents), len(ingredients)
+
+        has_ingredient = ingredient_codes >= 0
+        empty_rows = np.bincount(continent_codes[~has_ingredient], minlength=n_continents)
+        continent_codes = continent_codes[has_ingredient]
+        ingredient_codes = ingredient_codes[has_ingredient]
+        recipe_codes = recipe_codes[has_ingredient]
+
+        cells, counts = np.unique(
+            continent_codes.astype(np.int64) * n_ingredients + ingredient_codes, return_counts=True
+        )
+        rows = cells // max(n_ingredients, 1)
+        indptr = np.zeros(n_continents + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_continents), out=indptr[1:])
+
+        # an ingredient listed twice in a recipe is one recipe for the frequency
+        pairs = np.unique(recipe_codes.astype(np.int64) * n_ingredients + ingredient_codes)
+        doc_freq = np.bincount(pairs % max(n_ingredients, 1), minlength=n_ingredients)
+
+        return cls(
+            continents=np.asarray(continents, dtype=object),
+            ingredients=np.asarray(ingredients, dtype=object),
+            indptr=indptr,
+            indices=(cells % max(n_ingredients, 1)).astype(np.int32),
+            counts=counts.astype(np.int64),
+            doc_freq=doc_freq.astype(np.int64),
+            n_recipes=len(recipes),
+            empty_rows=empty_rows.astype(np.int64),
+        )
+
+    def row(self, pos: int) -> tuple[np.ndarray, np.ndarray]:
+        """Ingredient codes and occurrences of continent ``pos``."""
+        start, end = self.indptr[pos], self.indptr[pos + 1]
+        return self.indices[start:end], self.counts[start:end]
+
+    def common_ingredients(self, global_threshold: float) -> np.ndarray:
+        """Mask of the ingredients found in more than ``global_threshold`` of the recipes."""
+        return self.doc_freq / max(self.n_recipes, 1) > global_threshold
+
+    def top(self, top_n: int = 10, global_threshold: float = 0.30) -> pd.DataFrame:
+        """
+        Most used ingredients of each continent, ubiquitous ones excluded.
+
+        Args:
+            top_n: Number of ingredients kept per continent
+            global_threshold: Exclude the ingredients found in more than this
+                share of the recipes
+
+        Returns:
+            DataFrame ['continent', 'ingredients', 'count'] sorted by
+            decreasing count, continent as an ordered Categorical (continents
+            with the most remaining ingredient rows first)
+        """
+        common = self.common_ingredients(global_threshold)
+        continent_rows, codes, counts = [], [], []
+        remaining = self.empty_rows.copy()
+        for pos in range(len(self.continents)):
+            row_codes, row_counts = self.row(pos)
+            kept = ~common[row_codes]
+            row_codes, row_counts = row_codes[kept], row_counts[kept]
+            remaining[pos] += row_counts.sum()
+            best = _top_positions(row_counts, top_n)
+            continent_rows.append(np.full(len(best), pos))
+            codes.append(row_codes[best])
+            counts.append(row_counts[best])
+
+        continent_rows = np.concatenate(continent_rows) if continent_rows else np.array([], dtype=np.int64)
+        codes = np.concatenate(codes) if codes else np.array([], dtype=np.int32)
+        counts = np.concatenate(counts) if counts else np.array([], dtype=np.int64)
+        order = np.argsort(-counts, kind="stable")
+
+        present = np.flatnonzero(remaining > 0)
+        continent_order = self.continents[present[np.argsort(-remaining[present], kind="stable")]]
+        return pd.DataFrame({
+            "continent": pd.Categorical(
+                self.continents[continent_rows[order]], categories=continent_order, ordered=True
+            ),
+            "ingredients": self.ingredients[codes[order]],
+            "count": counts[order],
+        }, index=pd.RangeIndex(len(order)))
+
+
+def save_ingredient_cube(cube: ContinentIngredientCube, directory: str | os.PathLike) -> None:
+    """Write the cube as one ``.npy`` file per field, atomically."""
+    directory = Path(directory)
+    tmp = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for field in fields(cube):
+        value = getattr(cube, field.name)
+        if isinstance(value, np.ndarray) and value.dtype == object:
+            value = value.astype(str)
+        np.save(tmp / f"{field.name}.npy", np.asarray(value))
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+
+
+def load_ingredient_cube(directory: str | os.PathLike) -> ContinentIngredientCube:
+    """Read a cube written by ``save_ingredient_cube``."""
+    directory = Path(directory)
+    arrays = {field.name: np.load(directory / f"{field.name}.npy") for field in fields(ContinentIngredientCube)}
+    for name in ("continents", "ingredients"):
+        arrays[name] = arrays[name].astype(object)
+    arrays["n_recipes"] = int(arrays["n_recipes"])
+    return ContinentIngredientCube(**arrays)
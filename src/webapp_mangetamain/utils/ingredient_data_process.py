@@ -1,71 +1,66 @@
-"""Create csv files in /artifact."""
+"""Create the ingredient co-occurrence artifacts in /artifact (``cooccurrence`` stage of build_artifacts)."""
 from pathlib import Path
 import logging
 
-import numpy as np
 import pandas as pd
 
-import utils.filter_data as filter_data
-
-logger = logging.getLogger("__name__")
-
-def generate_matrix():
-    top_ingredients = filter_data.ingredient_counts
-    ingredients_exploded = filter_data.ingredients_exploded
-    relevant_ingredients = top_ingredients[(top_ingredients > 100)  & (top_ingredients < 5000) ]
-
-    relevant_ingredients_exploded = ingredients_exploded[ingredients_exploded["ingredients"].str.lower().isin(relevant_ingredients.index)]
-    relevant_ingredients_exploded = relevant_ingredients_exploded[["id", "ingredients"]]
-
-    bin_df = (
-        relevant_ingredients_exploded
-        .assign(val=1)
-        .pivot_table(index="id", columns="ingredients", values="val", fill_value=0)
-    )
-
-    co_occurrence = bin_df.T.dot(bin_df)
-
-    diag = np.diag(co_occurrence)
-    union = (diag[:, None] + diag[None, :] - co_occurrence.values)
-
-    jaccard = pd.DataFrame(
-        co_occurrence.values / np.where(union == 0, 1, union),
-        index=co_occurrence.index,
-        columns=co_occurrence.columns)
-
-
-    jacc = jaccard.copy()
-    jacc.index.name = "ing_a"
-    jacc.columns.name = "ing_b"
-
-    np.fill_diagonal(jacc.values, 0.0)
-
-    min_co = 10
-    co = (bin_df.T @ bin_df).astype(int)
-    co.index.name = "ing_a"
-    co.columns.name = "ing_b"
-    mask = co >= min_co
-    jacc_filt = jacc.where(mask, other=0.0)
-
-    pairs = (
-        jacc_filt.stack()
-                .reset_index(name="score")
-                .query("ing_a < ing_b and score > 0")
-                .sort_values("score", ascending=False)
-    )
-    logger.info("Nb relevant ingredients: ", len(relevant_ingredients))
-    logger.info(len(pairs))
-
-    path = Path("artifacts")
+import webapp_mangetamain.utils.filter_data as filter_data
+from webapp_mangetamain.utils.cooccurrence import (
+    CooccurrenceMatrices,
+    NeighborIndex,
+    build_incidence,
+    cooccurrence_matrix,
+    jaccard_matrix,
+    jaccard_pairs,
+    save_cooccurrence,
+    save_neighbor_index,
+    to_dense_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def generate_matrix(min_count: int = 100, max_count: int = 5000, min_co: int = 10,
+                    dense: bool = False, output_dir: str = "artifacts",
+                    context: filter_data.DatasetContext | None = None) -> pd.DataFrame:
+    """
+    Compute ingredient co-occurrence and Jaccard similarity and write them to output_dir.
+
+    Only ingredients used by more than min_count and fewer than max_count
+    recipes are kept. Both matrices are saved in the binary cooccurrence/
+    directory, each ingredient's neighbors sorted by score in neighbors/
+    (read by the ingredient focus explorer), and the pairs with at least
+    min_co co-occurrences in ingredient_pairs.csv. With dense=True the square
+    co_occurrence.csv and jaccard.csv are exported as well. The ingredient
+    tables come from ``context`` (default: the dataset of config.json).
+
+    Returns:
+        DataFrame of pairs ['ing_a', 'ing_b', 'co', 'score'] sorted by score
+    """
+    context = filter_data.get_context() if context is None else context
+    counts = context.ingredient_counts.set_index("ingredients")["count"]
+    relevant_ingredients = counts[(counts > min_count) & (counts < max_count)]
+    logger.info("Nb relevant ingredients: %d", len(relevant_ingredients))
+
+    ingredients_exploded = context.ingredients_exploded
+    relevant_ingredients_exploded = ingredients_exploded[
+        ingredients_exploded["ingredients"].isin(relevant_ingredients.index)
+    ]
+
+    incidence, labels = build_incidence(relevant_ingredients_exploded)
+    co = cooccurrence_matrix(incidence)
+    pairs = jaccard_pairs(co, labels, min_co=min_co)
+    logger.info("Nb pairs with co-occurrence >= %d: %d", min_co, len(pairs))
+
+    path = Path(output_dir)
     path.mkdir(exist_ok=True)
+    matrices = CooccurrenceMatrices.from_cooccurrence(co, labels)
+    save_cooccurrence(matrices, path / "cooccurrence")
+    save_neighbor_index(NeighborIndex.from_matrices(matrices), path / "neighbors")
+    pairs.to_csv(path / "ingredient_pairs.csv", index=False)
 
-    logger.info("co occurence: ", co_occurrence.head())
-    logger.info(jaccard.head())
-
-    co_occurrence.to_csv("artifacts/co_occurrence.csv")
-    jaccard.to_csv("artifacts/jaccard.csv")
-
-
-
-
+    if dense:
+        to_dense_frame(co, labels).to_csv(path / "co_occurrence.csv")
+        to_dense_frame(jaccard_matrix(co), labels).to_csv(path / "jaccard.csv")
 
+    return pairs
@@ -0,0 +1,248 @@
+"""Spans measuring the hot paths of the app.
+
+``instrument`` decorates the loading, parsing, scoring, aggregation and
+plotting functions of the analyzers; ``span`` measures any other block.
+Each call records, under the span name (``module.function`` without the
+``webapp_mangetamain.`` prefix):
+
+- wall time and CPU time (``time.process_time``, so threads included);
+- the number of rows of the first argument that has a length (frame,
+  series, array, ``ListColumn``...);
+- with ``trace_memory``, the peak of memory allocated during the call
+  (``tracemalloc``, nested spans included), above what was allocated
+  when the call started.
+
+The profiler is off by default: a decorated function then costs one
+attribute test per call. It is turned on by the ``profiling`` section of
+config.json, by the ``MANGETAMAIN_PROFILING`` environment variable (``1``,
+or ``memory`` to also trace allocations) or from the diagnostics page of
+the app. ``dump`` writes the statistics as JSON and in the Prometheus text
+format, e.g. for a node exporter textfile collector.
+
+tracemalloc is process wide: with concurrent sessions, the peak of a span
+may include allocations made by another thread at the same time. It also
+slows Python code down noticeably, hence the separate switch.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, Iterator
+
+PREFIX = "webapp_mangetamain."
+SAMPLES = 256
+
+
+class SpanStats:
+    """Aggregated measurements of one span name."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall_total = 0.0
+        self.cpu_total = 0.0
+        self.wall_max = 0.0
+        self.peak_alloc_max = 0
+        self.rows_total = 0
+        self.rows_last = None
+        self.recent = deque(maxlen=SAMPLES)
+
+    def add(self, wall: float, cpu: float, peak_alloc: int | None, rows: int | None) -> None:
+        self.calls += 1
+        self.wall_total += wall
+        self.cpu_total += cpu
+        self.wall_max = max(self.wall_max, wall)
+        if peak_alloc is not None:
+            self.peak_alloc_max = max(self.peak_alloc_max, peak_alloc)
+        if rows is not None:
+            self.rows_total += rows
+            self.rows_last = rows
+        self.recent.append(wall)
+
+    def as_dict(self) -> dict:
+        recent = sorted(self.recent)
+        return {
+            "span": self.name,
+            "calls": self.calls,
+            "wall_total_s": self.wall_total,
+            "wall_mean_s": self.wall_total / self.calls,
+            "wall_p50_s": recent[len(recent) // 2],
+            "wall_p95_s": recent[min(len(recent) - 1, int(len(recent) * 0.95))],
+            "wall_max_s": self.wall_max,
+            "cpu_total_s": self.cpu_total,
+            "peak_alloc_max_bytes": self.peak_alloc_max,
+            "rows_total": self.rows_total,
+            "rows_last": self.rows_last,
+        }
+
+
+class Profiler:
+    """Registry of span statistics, shared by every session of the process."""
+
+    def __init__(self, enabled: bool = False, trace_memory: bool = False, dump_dir: str | None = None):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.dump_dir = Path(dump_dir) if dump_dir else None
+        self._stats: dict[str, SpanStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracing = False
+
+    def configure(self, enabled: bool | None = None, trace_memory: bool | None = None,
+                  dump_dir: str | None = None) -> None:
+        """Change the settings given (None keeps the current value)."""
+        if enabled is not None:
+            self.enabled = enabled
+        if trace_memory is not None:
+            self.trace_memory = trace_memory
+            if not trace_memory and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+                self._local = threading.local()
+        if dump_dir is not None:
+            self.dump_dir = Path(dump_dir) if dump_dir else None
+
+    @contextmanager
+    def span(self, name: str, rows: int | None = None) -> Iterator[None]:
+        """Measure the enclosed block under ``name``."""
+        tracing = self.trace_memory
+        if tracing:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            stack = self._memory_stack()
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # keep the enclosing span's peak before resetting it
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            stack.append([current, current])
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            peak_alloc = None
+            if tracing and tracemalloc.is_tracing():
+                start, child_peak = stack.pop()
+                peak = max(tracemalloc.get_traced_memory()[1], child_peak)
+                peak_alloc = peak - start
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+            self.record(name, wall, cpu, peak_alloc, rows)
+
+    def record(self, name: str, wall: float, cpu: float, peak_alloc: int | None = None,
+               rows: int | None = None) -> None:
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = SpanStats(name)
+            stats.add(wall, cpu, peak_alloc, rows)
+
+    def _memory_stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def snapshot(self) -> list[dict]:
+        """Statistics of every span, slowest (total wall time) first."""
+        with self._lock:
+            rows = [stats.as_dict() for stats in self._stats.values()]
+        return sorted(rows, key=lambda row: row["wall_total_s"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def to_json(self) -> str:
+        return json.dumps({"created": time.time(), "spans": self.snapshot()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Statistics in the Prometheus text exposition format."""
+        metrics = [
+            ("calls_total", "counter", "calls", "Number of calls of the span."),
+            ("wall_seconds_total", "counter", "wall_total_s", "Wall time spent in the span."),
+            ("cpu_seconds_total", "counter", "cpu_total_s", "CPU time spent in the span."),
+            ("wall_seconds_max", "gauge", "wall_max_s", "Slowest call of the span."),
+            ("wall_seconds_p95", "gauge", "wall_p95_s", "95th percentile of the recent calls."),
+            ("peak_alloc_bytes_max", "gauge", "peak_alloc_max_bytes", "Largest allocation peak of a call."),
+            ("rows_total", "counter", "rows_total", "Input rows processed by the span."),
+        ]
+        snapshot = self.snapshot()
+        lines = []
+        for suffix, kind, field, doc in metrics:
+            metric = f"mangetamain_span_{suffix}"
+            lines += [f"# HELP {metric} {doc}", f"# TYPE {metric} {kind}"]
+            for row in snapshot:
+                label = row["span"].replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{metric}{{span="{label}"}} {row[field]}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, directory: str | os.PathLike | None = None) -> Path | None:
+        """Write ``spans.json`` and ``spans.prom`` to ``directory`` (default: dump_dir)."""
+        directory = Path(directory) if directory is not None else self.dump_dir
+        if directory is None:
+            return None
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, text in [("spans.json", self.to_json()), ("spans.prom", self.to_prometheus())]:
+            tmp = directory / f".{name}.tmp"
+            tmp.write_text(text)
+            os.replace(tmp, directory / name)
+        return directory
+
+
+def _from_environment() -> Profiler:
+    value = os.environ.get("MANGETAMAIN_PROFILING", "").strip().lower()
+    return Profiler(enabled=value not in ("", "0", "false"), trace_memory=value == "memory")
+
+
+PROFILER = _from_environment()
+
+
+def span_name(func: Callable) -> str:
+    """``module.qualname`` of ``func``, whatever path its module was imported by."""
+    module = func.__module__
+    if module.startswith(PREFIX):
+        module = module[len(PREFIX):]
+    return f"{module}.{func.__qualname__}"
+
+
+def _rows_of(args: tuple) -> int | None:
+    for arg in args:
+        if not isinstance(arg, (str, bytes, dict)) and hasattr(arg, "__len__"):
+            try:
+                return len(arg)
+            except TypeError:
+                continue
+    return None
+
+
+def span(name: str, rows: int | None = None):
+    """Context manager measuring a block (does nothing while profiling is off)."""
+    if not PROFILER.enabled:
+        return nullcontext()
+    return PROFILER.span(name, rows)
+
+
+def instrument(func: Callable | None = None, *, name: str | None = None):
+    """Measure every call of ``func`` (usable with or without arguments)."""
+    def decorator(func: Callable) -> Callable:
+        label = name or span_name(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            with PROFILER.span(label, _rows_of(args)):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    if func is None:
+        return decorator
+    return decorator(func)
@@ -0,0 +1,143 @@
+"""Compact in-memory layout of the recipe frames.
+
+``RECIPE_SCHEMA`` gives the kind of each Food.com column, and
+``apply_schema`` converts a frame accordingly:
+
+- ``integer``: the smallest signed integer type holding the values, but at
+  least int32 (int8/int16 columns silently overflow in arithmetic);
+- ``float``: float32;
+- ``category``: pandas categorical (few distinct values, e.g. dates);
+- ``string``: Arrow-backed strings (one buffer instead of a Python object
+  per value);
+- ``list``: stringified lists. Once ``ParsedRecipes`` holds them as arrays
+  the raw text is not needed anymore, so ``load_compact_dataset`` does not
+  even read those columns; otherwise they are kept as Arrow strings.
+
+Columns missing from the schema keep their dtype, numeric ones being
+downcast like ``integer`` / ``float`` columns.
+"""
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from webapp_mangetamain.utils.dataset_cache import DEFAULT_CACHE_DIR, parquet_cache
+from webapp_mangetamain.utils.profiling import instrument
+
+logger = logging.getLogger(__name__)
+
+STRING_DTYPE = "string[pyarrow]"
+
+RECIPE_SCHEMA = {
+    "name": "string",
+    "id": "integer",
+    "minutes": "integer",
+    "contributor_id": "integer",
+    "submitted": "category",
+    "tags": "list",
+    "nutrition": "list",
+    "n_steps": "integer",
+    "steps": "list",
+    "description": "string",
+    "ingredients": "list",
+    "n_ingredients": "integer",
+    "rating": "float",
+}
+
+# compact frames already loaded in this process, keyed by (resolved path, drop_lists)
+_compact_frames: dict[tuple[str, bool], pd.DataFrame] = {}
+
+
+def compact_column(series: pd.Series, kind: str | None) -> pd.Series:
+    """Return ``series`` converted to the compact dtype of ``kind``."""
+    if kind is None:
+        if pd.api.types.is_integer_dtype(series.dtype):
+            kind = "integer"
+        elif pd.api.types.is_float_dtype(series.dtype):
+            kind = "float"
+        else:
+            return series
+
+    if kind == "integer":
+        if series.isna().any() or not pd.api.types.is_numeric_dtype(series.dtype):
+            # float64 keeps every integer up to 2**53 exact
+            return pd.to_numeric(series, errors="coerce").astype(np.float64)
+        if series.empty or (series.min() >= np.iinfo(np.int32).min and series.max() <= np.iinfo(np.int32).max):
+            return series.astype(np.int32)
+        return series.astype(np.int64)
+    if kind == "float":
+        return pd.to_numeric(series, errors="coerce").astype(np.float32)
+    if kind == "category":
+        return series.astype("category")
+    if kind in ("string", "list"):
+        return series.astype(STRING_DTYPE)
+    raise ValueError(f"unknown column kind {kind!r}")
+
+
+def apply_schema(df: pd.DataFrame, schema: dict[str, str] = RECIPE_SCHEMA,
+                 drop_lists: bool = False) -> pd.DataFrame:
+    """
+    Compact copy of ``df`` following ``schema``.
+
+    Args:
+        drop_lists: Leave out the ``list`` columns (use ParsedRecipes instead)
+    """
+    columns = {}
+    for col in df.columns:
+        kind = schema.get(col)
+        if kind == "list" and drop_lists:
+            continue
+        columns[col] = compact_column(df[col], kind)
+    return pd.DataFrame(columns, index=df.index)
+
+
+@instrument
+def load_compact_dataset(source: str | os.PathLike, cache_dir: str | os.PathLike = DEFAULT_CACHE_DIR,
+                         schema: dict[str, str] = RECIPE_SCHEMA, drop_lists: bool = True) -> pd.DataFrame:
+    """
+    Load ``source`` through its Parquet cache with compact dtypes.
+
+    With ``drop_lists`` the list columns are not read at all. The frame is
+    loaded once per process and path; callers that add columns should work
+    on a ``copy(deep=False)``.
+    """
+    key = (str(Path(source).resolve()), drop_lists)
+    if key in _compact_frames:
+        return _compact_frames[key]
+
+    parquet_path = parquet_cache(source, cache_dir)
+    columns = pq.read_schema(parquet_path).names
+    if drop_lists:
+        columns = [c for c in columns if schema.get(c) != "list"]
+    df = apply_schema(pd.read_parquet(parquet_path, columns=columns), schema, drop_lists)
+    logger.info("%s: %d rows, %.1f MB in memory", Path(source).name, len(df), frame_memory(df) / 2**20)
+
+    _compact_frames[key] = df
+    return df
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """Bytes used by ``df``, values of object columns included."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def memory_report(frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Size of each frame of ``frames``, largest first.
+
+    Returns:
+        DataFrame indexed by frame name with ['rows', 'columns', 'memory_mb']
+    """
+    report = pd.DataFrame(
+        [(name, len(df), df.shape[1], frame_memory(df) / 2**20) for name, df in frames.items()],
+        columns=["frame", "rows", "columns", "memory_mb"],
+    )
+    return report.set_index("frame").sort_values("memory_mb", ascending=False)
+
+
+def clear_memory_cache() -> None:
+    """Forget the compact frames loaded in this process."""
+    _compact_frames.clear()
@@ -0,0 +1,883 @@
+"""Chunked ingestion of recipe files larger than memory.
+
+``stream_recipes`` reads the source CSV ``chunk_rows`` recipes at a time
+(``pd.read_csv(chunksize=...)``), parses each chunk with ``parse_recipes``
+and never holds more than one chunk in memory:
+
+- the row-level data goes to a ``RowStore`` on disk: the scalar columns in
+  ``rows.parquet`` (one row group per chunk) and the parsed list columns and
+  nutrition matrix in ``parsed/``, the layout of ``save_parsed`` (codes are
+  remapped to one sorted vocabulary once every chunk is written), so
+  ``RowStore.parsed`` is memory-mapped like the parsed-columns cache;
+- every chart input is folded into a mergeable aggregate: per-tag counts
+  and metric sums (``TagAggregate``), nutrient histograms, co-moments and
+  Nutri-Score counts (``NutritionAggregate``), ingredient counts
+  (``IngredientAggregate``) and continent x ingredient counts
+  (``ContinentAggregate``). Two aggregates of disjoint rows ``merge`` into
+  the aggregate of their union.
+
+The complexity trimming of ``filter_data.complexity_mask`` needs quantiles
+over the whole dataset, which no chunk knows. They are computed exactly from
+the value counts of the three integer columns, read back from
+``rows.parquet`` (one scan per column in "sequential" mode), and the
+ingredient and continent aggregates are then built from a second pass over
+the row store, each chunk being trimmed with the global bounds.
+"""
+import heapq
+import json
+import logging
+import os
+import shutil
+from dataclasses import dataclass, fields, is_dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, get_type_hints
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from webapp_mangetamain.utils.filter_data import REGIONS, TRIM_COLUMNS, TRIM_MODE, TRIM_QUANTILE, resolve_regions
+from webapp_mangetamain.utils.food_drink import classify_tags, is_drink_recipe
+from webapp_mangetamain.utils.ingestion import (
+    LIST_COLUMNS,
+    ListColumn,
+    ParsedRecipes,
+    encode_strings,
+    load_parsed,
+    parse_recipes,
+)
+from webapp_mangetamain.utils.ingredient_cube import ContinentIngredientCube
+from webapp_mangetamain.utils.profiling import instrument
+from webapp_mangetamain.utils.schema import RECIPE_SCHEMA, STRING_DTYPE
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 100_000
+HISTOGRAM_BINS = 50
+
+ROWS_FILE = "rows.parquet"
+PARSED_DIR = "parsed"
+AGGREGATES_DIR = "aggregates"
+
+# histogram range of the nutrients without NUTRITION_LIMITS (percent of daily value)
+DEFAULT_NUTRIENT_RANGE = (0.0, 2000.0)
+
+# recipe metric -> tag_stats column, as in tag_analyzer.create_tag_recipes_dataset
+TAG_METRICS = {"minutes": "avg_minutes", "n_ingredients": "avg_ingredients", "n_steps": "avg_steps"}
+
+# recipe groups of the Nutri-Score comparison charts
+GRADE_GROUPS = ["all", "health", "food", "food_health"]
+
+# elements copied at once when a raw file becomes a .npy file
+_BLOCK = 1 << 20
+
+
+# -------------------------
+# Exact quantiles from value counts
+# -------------------------
+
+def quantile_from_counts(values, counts, q: float) -> float:
+    """
+    ``np.quantile(sample, q)`` (linear method) of the sample where
+    ``values[i]`` occurs ``counts[i]`` times, NaN for an empty sample.
+    """
+    values = np.asarray(values, dtype=float)
+    counts = np.asarray(counts, dtype=np.int64)
+    keep = counts > 0
+    order = np.argsort(values[keep], kind="stable")
+    values = values[keep][order]
+    cumulative = np.cumsum(counts[keep][order])
+    n = int(cumulative[-1]) if len(cumulative) else 0
+    if n == 0:
+        return np.nan
+
+    # same arithmetic as numpy's virtual index and _lerp
+    virtual = (n - 1) * q
+    if virtual >= n - 1:
+        return float(values[-1])
+    previous = int(np.floor(virtual))
+    a = values[np.searchsorted(cumulative, previous, side="right")]
+    b = values[np.searchsorted(cumulative, previous + 1, side="right")]
+    t = virtual - previous
+    diff = b - a
+    return float(b - diff * (1 - t) if t >= 0.5 else a + diff * t)
+
+
+def describe_histogram(histogram: pd.Series) -> pd.Series:
+    """
+    ``Series.describe()`` of the sample where each index value occurs as
+    many times as its count in ``histogram``.
+    """
+    values = histogram.index.to_numpy(dtype=float)
+    counts = histogram.to_numpy(dtype=float)
+    n = counts.sum()
+    present = values[counts > 0]
+    mean = (values * counts).sum() / n if n else np.nan
+    std = np.sqrt(((values - mean) ** 2 * counts).sum() / (n - 1)) if n > 1 else np.nan
+    return pd.Series({
+        "count": n,
+        "mean": mean,
+        "std": std,
+        "min": present.min() if n else np.nan,
+        "25%": quantile_from_counts(values, counts, 0.25),
+        "50%": quantile_from_counts(values, counts, 0.5),
+        "75%": quantile_from_counts(values, counts, 0.75),
+        "max": present.max() if n else np.nan,
+    })
+
+
+def _histogram(values: np.ndarray) -> pd.Series:
+    """Occurrences of each non-negative integer of ``values`` (zeros left out)."""
+    counts = pd.Series(np.bincount(values) if len(values) else np.zeros(0, dtype=np.int64))
+    return counts[counts > 0].astype(np.int64)
+
+
+def _add_counts(a: pd.Series, b: pd.Series) -> pd.Series:
+    return a.add(b, fill_value=0).astype(np.int64)
+
+
+def _merge(total, part):
+    return part if total is None else total.merge(part)
+
+
+# -------------------------
+# Mergeable aggregates
+# -------------------------
+
+@dataclass
+class TagAggregate:
+    """
+    Tag occurrences and recipe metrics summed per tag, indexed by tag.
+
+    ``sums`` and ``valid`` hold, for every metric of TAG_METRICS, the sum and
+    number of the non-missing values of the recipes carrying the tag;
+    ``tags_per_recipe`` maps a number of tags to the recipes having it.
+    """
+
+    counts: pd.Series
+    sums: pd.DataFrame
+    valid: pd.DataFrame
+    tags_per_recipe: pd.Series
+    n_recipes: int
+
+    @classmethod
+    def from_chunk(cls, frame: pd.DataFrame, tags: ListColumn) -> "TagAggregate":
+        """Aggregate of the recipes of ``frame``, ``tags`` being their parsed tags."""
+        lengths = tags.lengths()
+        counts = tags.counts()
+        present = np.flatnonzero(counts > 0)
+        index = pd.Index(tags.vocabulary[present], name="tag")
+        sums, valid = {}, {}
+        for col in TAG_METRICS:
+            values = frame[col].to_numpy(dtype=float) if col in frame.columns else np.zeros(len(frame))
+            item_values = np.repeat(values, lengths)
+            ok = ~np.isnan(item_values)
+            sums[col] = np.bincount(tags.codes[ok], weights=item_values[ok], minlength=len(tags.vocabulary))[present]
+            valid[col] = np.bincount(tags.codes[ok], minlength=len(tags.vocabulary))[present]
+        return cls(
+            counts=pd.Series(counts[present], index=index, dtype=np.int64),
+            sums=pd.DataFrame(sums, index=index),
+            valid=pd.DataFrame(valid, index=index, dtype=np.int64),
+            tags_per_recipe=_histogram(lengths),
+            n_recipes=len(frame),
+        )
+
+    def merge(self, other: "TagAggregate") -> "TagAggregate":
+        return TagAggregate(
+            counts=_add_counts(self.counts, other.counts),
+            sums=self.sums.add(other.sums, fill_value=0),
+            valid=self.valid.add(other.valid, fill_value=0).astype(np.int64),
+            tags_per_recipe=_add_counts(self.tags_per_recipe, other.tags_per_recipe),
+            n_recipes=self.n_recipes + other.n_recipes,
+        )
+
+    def tag_counts(self) -> pd.Series:
+        """Occurrences of each tag, like ``tag_analyzer.count_tags``."""
+        counts = self.counts[self.counts > 0].sort_index().sort_values(ascending=False, kind="stable")
+        return pd.Series(counts.to_numpy(), index=pd.Index(counts.index.to_numpy(dtype=object)), name="count")
+
+    def tag_stats(self, min_recipes_per_tag: int = 50) -> pd.DataFrame:
+        """Per-tag metrics, like the first result of ``create_tag_recipes_dataset``."""
+        counts = self.counts[self.counts > 0].sort_index()
+        tag_stats = pd.DataFrame({"tag": counts.index.to_numpy(dtype=object), "n_recipes": counts.to_numpy()})
+        for col, name in TAG_METRICS.items():
+            with np.errstate(invalid="ignore", divide="ignore"):
+                tag_stats[name] = (self.sums[col] / self.valid[col]).reindex(counts.index).to_numpy()
+        tag_stats = tag_stats[tag_stats["n_recipes"] >= min_recipes_per_tag].copy()
+        return tag_stats.sort_values("n_recipes", ascending=False)
+
+    def general_statistics(self) -> dict:
+        """
+        The statistics of ``tag_analyzer.get_general_tags_statistics``,
+        without its row-level 'tags_per_recipe' Series.
+        """
+        tag_counts = self.tag_counts()
+        per_recipe = describe_histogram(self.tags_per_recipe)
+        total_tags = int((self.tags_per_recipe.index.to_numpy() * self.tags_per_recipe.to_numpy()).sum())
+        return {
+            "total_recipes": self.n_recipes,
+            "tags_per_recipe_stats": per_recipe,
+            "tags_per_recipe_mean": per_recipe["mean"],
+            "tags_per_recipe_median": per_recipe["50%"],
+            "tags_per_recipe_min": per_recipe["min"],
+            "tags_per_recipe_max": per_recipe["max"],
+            "total_unique_tags": len(tag_counts),
+            "total_tags": total_tags,
+            "avg_tags_general": total_tags / len(tag_counts) if len(tag_counts) > 0 else 0,
+            "tag_counts_stats": tag_counts.describe(),
+            "top_20_tags": tag_counts.head(20),
+            "tag_counts": tag_counts,
+        }
+
+
+@dataclass
+class NutritionAggregate:
+    """
+    Nutrient distributions and Nutri-Score counts.
+
+    ``histograms[j]`` counts the values of nutrient ``labels[j]`` below
+    ``edges[j][0]``, in each bin of ``edges[j]`` (the last one closed), and
+    above ``edges[j][-1]``. ``mean`` and ``comoments`` (sums of the products
+    of deviations) cover the ``n`` recipes whose nutrients are all known.
+    ``grade_counts`` counts the scored recipes per grade and GRADE_GROUPS.
+    """
+
+    labels: list[str]
+    edges: np.ndarray
+    histograms: np.ndarray
+    n: int
+    mean: np.ndarray
+    comoments: np.ndarray
+    grade_counts: pd.DataFrame
+
+    @classmethod
+    def from_chunk(cls, matrix: np.ndarray, labels: list[str], edges: np.ndarray,
+                   grades: np.ndarray | None = None,
+                   groups: dict[str, np.ndarray] | None = None) -> "NutritionAggregate":
+        """
+        Aggregate of the rows of a nutrition matrix.
+
+        Args:
+            grades: Nutri-Score of each row, None for the rows not scored
+            groups: Row masks of the GRADE_GROUPS other than "all"
+        """
+        bins = edges.shape[1] - 1
+        histograms = np.zeros((len(labels), bins + 2), dtype=np.int64)
+        for j in range(len(labels)):
+            values = matrix[:, j][np.isfinite(matrix[:, j])]
+            positions = np.searchsorted(edges[j], values, side="right")
+            positions[values == edges[j][-1]] = bins
+            histograms[j] = np.bincount(positions, minlength=bins + 2)
+
+        complete = matrix[np.isfinite(matrix).all(axis=1)]
+        mean = complete.mean(axis=0) if len(complete) else np.zeros(len(labels))
+        deviations = complete - mean
+
+        counts = {}
+        if grades is not None:
+            scored = pd.notna(grades)
+            for name, mask in {"all": np.ones(len(grades), dtype=bool), **(groups or {})}.items():
+                counts[name] = pd.Series(grades[scored & mask]).value_counts()
+        grade_counts = pd.DataFrame(counts, columns=GRADE_GROUPS).fillna(0).astype(np.int64).sort_index()
+        grade_counts.index.name = "nutri_score"
+
+        return cls(
+            labels=list(labels),
+            edges=np.asarray(edges, dtype=float),
+            histograms=histograms,
+            n=len(complete),
+            mean=mean,
+            comoments=deviations.T @ deviations,
+            grade_counts=grade_counts,
+        )
+
+    def merge(self, other: "NutritionAggregate") -> "NutritionAggregate":
+        # pairwise update of the means and co-moments (Chan et al.)
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        mean = self.mean + delta * (other.n / n) if n else self.mean
+        comoments = self.comoments + other.comoments + (np.outer(delta, delta) * (self.n * other.n / n) if n else 0)
+        return NutritionAggregate(
+            labels=self.labels,
+            edges=self.edges,
+            histograms=self.histograms + other.histograms,
+            n=n,
+            mean=mean,
+            comoments=comoments,
+            grade_counts=self.grade_counts.add(other.grade_counts, fill_value=0).astype(np.int64).sort_index(),
+        )
+
+    def histogram(self, label: str) -> pd.Series:
+        """Counts of the bins of nutrient ``label`` (values out of range left out)."""
+        j = self.labels.index(label)
+        return pd.Series(self.histograms[j, 1:-1], index=pd.IntervalIndex.from_breaks(self.edges[j], closed="left"))
+
+    def correlation(self) -> pd.DataFrame:
+        """Pearson correlation of the nutrients, like ``nutrition_df.corr()``."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scale = np.sqrt(np.diag(self.comoments))
+            corr = self.comoments / np.outer(scale, scale)
+        return pd.DataFrame(corr, index=self.labels, columns=self.labels)
+
+
+@dataclass
+class IngredientAggregate:
+    """
+    Occurrences of each normalized ingredient, and the number of recipes per
+    number of distinct ingredients (recipes without ingredient left out).
+    """
+
+    counts: pd.Series
+    per_recipe: pd.Series
+
+    @classmethod
+    def from_chunk(cls, ingredients: ListColumn) -> "IngredientAggregate":
+        """Aggregate of a chunk of normalized ingredient lists."""
+        counts = ingredients.counts()
+        present = np.flatnonzero(counts > 0)
+        size = max(len(ingredients.vocabulary), 1)
+        # an ingredient listed twice in a recipe counts once per recipe
+        pairs = np.unique(ingredients.row_positions() * size + ingredients.codes)
+        distinct = np.bincount(pairs // size, minlength=len(ingredients))
+        return cls(
+            counts=pd.Series(counts[present], index=pd.Index(ingredients.vocabulary[present], name="ingredients")),
+            per_recipe=_histogram(distinct[distinct > 0]),
+        )
+
+    def merge(self, other: "IngredientAggregate") -> "IngredientAggregate":
+        return IngredientAggregate(
+            counts=_add_counts(self.counts, other.counts),
+            per_recipe=_add_counts(self.per_recipe, other.per_recipe),
+        )
+
+    def ingredient_counts(self) -> pd.DataFrame:
+        """['ingredients', 'count'] by decreasing count, like ``filter_data.ingredient_counts``."""
+        counts = self.counts.sort_index().sort_values(ascending=False, kind="stable").rename("count")
+        return counts.reset_index()
+
+    def overview(self) -> dict:
+        """Global figures of the Ingredient tab."""
+        n_recipes = int(self.per_recipe.sum())
+        total = (self.per_recipe.index.to_numpy() * self.per_recipe.to_numpy()).sum()
+        return {
+            "n_recipes": n_recipes,
+            "n_unique_ingredients": len(self.counts),
+            "mean_ingredients_per_recipe": total / n_recipes if n_recipes else np.nan,
+        }
+
+
+@dataclass
+class ContinentAggregate:
+    """
+    Recipes per continent (REGIONS), ingredient occurrences per (continent,
+    ingredient), and the number of recipes with a continent containing each
+    ingredient among the ``n_recipes`` that have a continent and an ingredient.
+    """
+
+    recipes: pd.Series
+    cells: pd.Series
+    doc_freq: pd.Series
+    n_recipes: int
+
+    @classmethod
+    def from_chunk(cls, continent: np.ndarray, ingredients: ListColumn) -> "ContinentAggregate":
+        """
+        Aggregate of a chunk of recipes.
+
+        Args:
+            continent: Region code of each recipe (``resolve_regions``)
+            ingredients: Normalized ingredient lists of the same recipes
+        """
+        regions = np.asarray(REGIONS, dtype=object)
+        size = max(len(ingredients.vocabulary), 1)
+        rows = ingredients.row_positions()
+        item_continent = continent[rows].astype(np.int64)
+        keep = item_continent >= 0
+        codes = ingredients.codes[keep]
+
+        cells, counts = np.unique(item_continent[keep] * size + codes, return_counts=True)
+        pairs = np.unique(rows[keep] * size + codes)
+        doc_freq = np.bincount(pairs % size, minlength=len(ingredients.vocabulary))
+        present = np.flatnonzero(doc_freq > 0)
+        return cls(
+            recipes=pd.Series(np.bincount(continent[continent >= 0], minlength=len(REGIONS)),
+                              index=pd.Index(REGIONS, name="continent"), dtype=np.int64),
+            cells=pd.Series(counts, index=pd.MultiIndex.from_arrays(
+                [regions[cells // size], ingredients.vocabulary[cells % size]], names=["continent", "ingredients"]
+            ), dtype=np.int64),
+            doc_freq=pd.Series(doc_freq[present], index=pd.Index(ingredients.vocabulary[present], name="ingredients")),
+            n_recipes=int(((continent >= 0) & (ingredients.lengths() > 0)).sum()),
+        )
+
+    def merge(self, other: "ContinentAggregate") -> "ContinentAggregate":
+        return ContinentAggregate(
+            recipes=_add_counts(self.recipes, other.recipes).reindex(REGIONS, fill_value=0),
+            cells=_add_counts(self.cells, other.cells),
+            doc_freq=_add_counts(self.doc_freq, other.doc_freq),
+            n_recipes=self.n_recipes + other.n_recipes,
+        )
+
+    def cube(self) -> ContinentIngredientCube:
+        """The cube ``ContinentIngredientCube.from_frame`` builds from ``ingredient_and_continent``."""
+        cells = self.cells[self.cells > 0]
+        observed = set(cells.index.get_level_values("continent"))
+        continents = np.array([region for region in REGIONS if region in observed], dtype=object)
+        ingredients = np.unique(cells.index.get_level_values("ingredients").to_numpy(dtype=object))
+        rows = pd.Index(continents).get_indexer(cells.index.get_level_values("continent"))
+        codes = pd.Index(ingredients).get_indexer(cells.index.get_level_values("ingredients"))
+        order = np.lexsort((codes, rows))
+        indptr = np.zeros(len(continents) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(continents)), out=indptr[1:])
+        return ContinentIngredientCube(
+            continents=continents,
+            ingredients=ingredients,
+            indptr=indptr,
+            indices=codes[order].astype(np.int32),
+            counts=cells.to_numpy()[order].astype(np.int64),
+            doc_freq=self.doc_freq.reindex(ingredients, fill_value=0).to_numpy(dtype=np.int64),
+            n_recipes=self.n_recipes,
+            empty_rows=np.zeros(len(continents), dtype=np.int64),
+        )
+
+
+@dataclass
+class RecipeAggregates:
+    """
+    Aggregates of a streamed dataset: tags and nutrition over all recipes,
+    ingredients and continents over the recipes kept by the trimming bounds
+    ``trim_bounds`` (one per TRIM_COLUMNS).
+    """
+
+    n_rows: int
+    trim_bounds: np.ndarray
+    tags: TagAggregate
+    nutrition: NutritionAggregate
+    ingredients: IngredientAggregate
+    continents: ContinentAggregate
+
+
+def _save_fields(obj, directory: Path) -> None:
+    directory.mkdir(parents=True)
+    meta = {}
+    for field in fields(obj):
+        value = getattr(obj, field.name)
+        if is_dataclass(value):
+            _save_fields(value, directory / field.name)
+        elif isinstance(value, pd.Series):
+            value.to_frame("value").to_parquet(directory / f"{field.name}.series.parquet")
+        elif isinstance(value, pd.DataFrame):
+            value.to_parquet(directory / f"{field.name}.parquet")
+        elif isinstance(value, np.ndarray):
+            np.save(directory / f"{field.name}.npy", value)
+        else:
+            meta[field.name] = value
+    (directory / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+
+def _load_fields(cls, directory: Path):
+    meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+    hints = get_type_hints(cls)
+    values = {}
+    for field in fields(cls):
+        name = field.name
+        if is_dataclass(hints[name]):
+            values[name] = _load_fields(hints[name], directory / name)
+        elif (directory / f"{name}.series.parquet").exists():
+            values[name] = pd.read_parquet(directory / f"{name}.series.parquet")["value"].rename(None)
+        elif (directory / f"{name}.parquet").exists():
+            values[name] = pd.read_parquet(directory / f"{name}.parquet")
+        elif (directory / f"{name}.npy").exists():
+            values[name] = np.load(directory / f"{name}.npy")
+        else:
+            values[name] = meta[name]
+    return cls(**values)
+
+
+def save_aggregates(aggregates: RecipeAggregates, directory: str | os.PathLike) -> None:
+    """Write ``aggregates`` as Parquet / ``.npy`` / JSON files, atomically."""
+    directory = Path(directory)
+    tmp = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    _save_fields(aggregates, tmp)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp, directory)
+
+
+def load_aggregates(directory: str | os.PathLike) -> RecipeAggregates:
+    """Read the aggregates of a directory written by ``stream_recipes``."""
+    return _load_fields(RecipeAggregates, Path(directory) / AGGREGATES_DIR)
+
+
+# -------------------------
+# Row store
+# -------------------------
+
+def _row_frame(frame: pd.DataFrame, schema: dict[str, str] = RECIPE_SCHEMA) -> pd.DataFrame:
+    """Scalar columns of a chunk, with dtypes that do not depend on the chunk's values."""
+    columns = {}
+    for col in frame.columns:
+        kind = schema.get(col)
+        series = frame[col]
+        if kind is None:
+            kind = "number" if pd.api.types.is_numeric_dtype(series.dtype) else "string"
+        if kind == "list":
+            continue
+        if kind == "integer":
+            columns[col] = pd.to_numeric(series, errors="coerce").astype("Int64")
+        elif kind == "float":
+            columns[col] = pd.to_numeric(series, errors="coerce").astype(np.float32)
+        elif kind == "number":
+            columns[col] = series.astype(np.float64)
+        else:
+            columns[col] = series.astype(STRING_DTYPE)
+    return pd.DataFrame(columns)
+
+
+def _read_raw(path: Path, dtype, shape: tuple = ()) -> np.ndarray:
+    """Memory-mapped content of a raw file (empty array if there is none)."""
+    if not path.exists() or path.stat().st_size == 0:
+        return np.empty((0,) + shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r").reshape((-1,) + shape)
+
+
+def _write_npy(path: Path, blocks: Iterable[tuple[int, np.ndarray]], dtype, shape: tuple) -> None:
+    """Write a ``.npy`` file of ``shape`` from (start, block) pieces without holding it in memory."""
+    if int(np.prod(shape)) == 0:
+        np.save(path, np.empty(shape, dtype=dtype))
+        return
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=shape)
+    for start, block in blocks:
+        out[start:start + len(block)] = block
+    out.flush()
+    del out
+
+
+def _copy_blocks(source: np.ndarray) -> Iterator[tuple[int, np.ndarray]]:
+    for start in range(0, len(source), _BLOCK):
+        yield start, np.asarray(source[start:start + _BLOCK])
+
+
+def _offset_blocks(lengths: np.ndarray) -> Iterator[tuple[int, np.ndarray]]:
+    """Blocks of the offsets (leading 0, then cumulative sums) of ``lengths``."""
+    yield 0, np.zeros(1, dtype=np.int64)
+    total = 0
+    for start, block in _copy_blocks(lengths):
+        sums = np.cumsum(block, dtype=np.int64) + total
+        total = int(sums[-1])
+        yield start + 1, sums
+
+
+def _iter_vocabulary(blob_path: Path, offsets_path: Path, chunk: int) -> Iterator[tuple[str, int, int]]:
+    offsets = np.load(offsets_path)
+    blob = np.load(blob_path, mmap_mode="r") if offsets[-1] > 0 else np.empty(0, dtype=np.uint8)
+    for code, (a, b) in enumerate(zip(offsets[:-1].tolist(), offsets[1:].tolist())):
+        yield bytes(blob[a:b]).decode("utf-8"), chunk, code
+
+
+class RowStoreWriter:
+    """
+    Write the chunks of a recipe file to a ``RowStore`` directory.
+
+    Chunks go to a temporary directory: the scalar columns to Parquet, the
+    list columns as raw lengths and chunk-local codes with each chunk's
+    sorted vocabulary. ``close`` merges the vocabularies, remaps the codes
+    to the merged one, writes ``parsed/`` and moves the directory in place.
+    """
+
+    def __init__(self, directory: str | os.PathLike, nutrition_width: int, schema: dict[str, str] = RECIPE_SCHEMA):
+        self.directory = Path(directory)
+        self.nutrition_width = nutrition_width
+        self.schema = schema
+        self.tmp = self.directory.with_name(self.directory.name + ".tmp")
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        (self.tmp / "parts").mkdir(parents=True)
+        self._writer: pq.ParquetWriter | None = None
+        self._code_counts: dict[str, list[int]] = {col: [] for col in LIST_COLUMNS}
+        self.n_rows = 0
+
+    def _append_raw(self, name: str, values: np.ndarray) -> None:
+        with open(self.tmp / "parts" / f"{name}.bin", "ab") as f:
+            f.write(np.ascontiguousarray(values).tobytes())
+
+    def append(self, frame: pd.DataFrame, parsed: ParsedRecipes) -> None:
+        """Add a chunk: its rows and their parsed columns."""
+        table = pa.Table.from_pandas(_row_frame(frame, self.schema), preserve_index=False)
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.tmp / ROWS_FILE, table.schema)
+        else:
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+
+        chunk = len(self._code_counts[LIST_COLUMNS[0]])
+        for col in LIST_COLUMNS:
+            column = getattr(parsed, col)
+            self._append_raw(f"{col}.lengths", column.lengths().astype(np.int64))
+            self._append_raw(f"{col}.codes", column.codes.astype(np.int32))
+            blob, offsets = encode_strings(column.vocabulary)
+            np.save(self.tmp / "parts" / f"{col}-{chunk:05d}.vocab.npy", blob)
+            np.save(self.tmp / "parts" / f"{col}-{chunk:05d}.vocab_offsets.npy", offsets)
+            self._code_counts[col].append(len(column.codes))
+        self._append_raw("nutrition", np.asarray(parsed.nutrition, dtype=np.float64))
+        self.n_rows += len(frame)
+
+    def _merge_vocabularies(self, col: str, parsed_dir: Path) -> list[np.ndarray]:
+        """Write the sorted union of the chunks' vocabularies; return each chunk's code mapping."""
+        parts = self.tmp / "parts"
+        n_chunks = len(self._code_counts[col])
+        mappings, streams = [], []
+        for chunk in range(n_chunks):
+            blob_path = parts / f"{col}-{chunk:05d}.vocab.npy"
+            offsets_path = parts / f"{col}-{chunk:05d}.vocab_offsets.npy"
+            mappings.append(np.empty(len(np.load(offsets_path)) - 1, dtype=np.int32))
+            streams.append(_iter_vocabulary(blob_path, offsets_path, chunk))
+
+        code, previous = -1, None
+        encoded, lengths = [], []
+        with open(parts / f"{col}.vocab.bin", "wb") as blob_file, \
+                open(parts / f"{col}.vocab_lengths.bin", "wb") as lengths_file:
+            for value, chunk, local in heapq.merge(*streams):
+                if value != previous:
+                    code += 1
+                    previous = value
+                    encoded.append(value.encode("utf-8"))
+                    lengths.append(len(encoded[-1]))
+                    if len(encoded) >= _BLOCK:
+                        blob_file.write(b"".join(encoded))
+                        lengths_file.write(np.asarray(lengths, dtype=np.int64).tobytes())
+                        encoded, lengths = [], []
+                mappings[chunk][local] = code
+            blob_file.write(b"".join(encoded))
+            lengths_file.write(np.asarray(lengths, dtype=np.int64).tobytes())
+
+        blob = _read_raw(parts / f"{col}.vocab.bin", np.uint8)
+        vocab_lengths = _read_raw(parts / f"{col}.vocab_lengths.bin", np.int64)
+        _write_npy(parsed_dir / f"{col}.vocab.npy", _copy_blocks(blob), np.uint8, blob.shape)
+        _write_npy(parsed_dir / f"{col}.vocab_offsets.npy", _offset_blocks(vocab_lengths),
+                   np.int64, (len(vocab_lengths) + 1,))
+        return mappings
+
+    def _remapped_codes(self, col: str, mappings: list[np.ndarray]) -> Iterator[tuple[int, np.ndarray]]:
+        codes = _read_raw(self.tmp / "parts" / f"{col}.codes.bin", np.int32)
+        start = 0
+        for mapping, count in zip(mappings, self._code_counts[col]):
+            for offset in range(0, count, _BLOCK):
+                block = np.asarray(codes[start + offset:start + min(offset + _BLOCK, count)])
+                yield start + offset, mapping[block]
+            start += count
+
+    def close(self) -> "RowStore":
+        """Finish the store and return it."""
+        if self._writer is None:
+            raise ValueError("no chunk was written")
+        self._writer.close()
+
+        parts = self.tmp / "parts"
+        parsed_dir = self.tmp / PARSED_DIR
+        parsed_dir.mkdir()
+        for col in LIST_COLUMNS:
+            mappings = self._merge_vocabularies(col, parsed_dir)
+            lengths = _read_raw(parts / f"{col}.lengths.bin", np.int64)
+            _write_npy(parsed_dir / f"{col}.offsets.npy", _offset_blocks(lengths), np.int64, (self.n_rows + 1,))
+            _write_npy(parsed_dir / f"{col}.codes.npy", self._remapped_codes(col, mappings),
+                       np.int32, (sum(self._code_counts[col]),))
+        nutrition = _read_raw(parts / "nutrition.bin", np.float64, (self.nutrition_width,))
+        _write_npy(parsed_dir / "nutrition.npy", _copy_blocks(nutrition), np.float64,
+                   (self.n_rows, self.nutrition_width))
+        del nutrition
+
+        shutil.rmtree(parts)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(self.tmp, self.directory)
+        return RowStore(self.directory)
+
+
+@dataclass(frozen=True)
+class RowStore:
+    """
+    Row-level data of a streamed dataset: the scalar columns in
+    ``rows.parquet`` and the parsed list columns in ``parsed/``, aligned by
+    row position.
+    """
+
+    directory: Path
+
+    def __len__(self) -> int:
+        return pq.ParquetFile(self.directory / ROWS_FILE).metadata.num_rows
+
+    def rows(self, columns: list[str] | None = None) -> pd.DataFrame:
+        """``columns`` of every row (all if None)."""
+        return pd.read_parquet(self.directory / ROWS_FILE, columns=columns)
+
+    def iter_rows(self, columns: list[str] | None = None) -> Iterator[tuple[int, pd.DataFrame]]:
+        """``columns`` one row group at a time, with the position of its first row."""
+        parquet = pq.ParquetFile(self.directory / ROWS_FILE)
+        start = 0
+        for group in range(parquet.num_row_groups):
+            frame = parquet.read_row_group(group, columns=columns).to_pandas()
+            yield start, frame
+            start += len(frame)
+
+    @cached_property
+    def parsed(self) -> ParsedRecipes:
+        """Parsed columns of every row, memory-mapped."""
+        return load_parsed(self.directory / PARSED_DIR)
+
+
+# -------------------------
+# Trimming
+# -------------------------
+
+def _trim_values(frame: pd.DataFrame, columns: list[str]) -> np.ndarray:
+    return np.column_stack([frame[c].to_numpy(dtype=float, na_value=np.nan) for c in columns])
+
+
+def trim_mask(values: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+    """Rows with positive values, none above its column's bound."""
+    return (values > 0).all(axis=1) & (values <= bounds).all(axis=1)
+
+
+@instrument
+def trim_bounds(store: RowStore, columns: list[str] = TRIM_COLUMNS, quantile: float = TRIM_QUANTILE,
+                mode: str = TRIM_MODE) -> np.ndarray:
+    """
+    Upper bound of each of ``columns``, so that ``trim_mask`` keeps the rows
+    ``filter_data.complexity_mask`` would keep on the whole store.
+    """
+    if mode == "joint":
+        passes = [list(range(len(columns)))]
+    elif mode == "sequential":
+        passes = [[j] for j in range(len(columns))]
+    else:
+        raise ValueError(f"unknown trimming mode {mode!r} (expected 'sequential' or 'joint')")
+
+    bounds = np.full(len(columns), np.inf)
+    for targets in passes:
+        counts = {j: pd.Series(dtype=np.int64) for j in targets}
+        for _, frame in store.iter_rows(columns):
+            values = _trim_values(frame, columns)
+            kept = values[trim_mask(values, bounds)]
+            for j in targets:
+                counts[j] = _add_counts(counts[j], pd.Series(kept[:, j]).value_counts())
+        for j in targets:
+            bounds[j] = quantile_from_counts(counts[j].index, counts[j].to_numpy(), quantile)
+    return bounds
+
+
+# -------------------------
+# Streaming
+# -------------------------
+
+def nutrition_edges(labels: list[str], limits: dict[str, dict] | None = None,
+                    bins: int = HISTOGRAM_BINS) -> np.ndarray:
+    """
+    Histogram edges of each nutrient: ``bins`` equal bins over its
+    NUTRITION_LIMITS range, or over DEFAULT_NUTRIENT_RANGE without limits.
+    """
+    limits = limits or {}
+    return np.array([
+        np.linspace(limits[label]["min"], limits[label]["max"], bins + 1) if label in limits
+        else np.linspace(*DEFAULT_NUTRIENT_RANGE, bins + 1)
+        for label in labels
+    ])
+
+
+def _rows_with(tags: ListColumn, matched: np.ndarray) -> np.ndarray:
+    """Rows of ``tags`` having a tag whose code is set in ``matched``."""
+    return np.bincount(tags.row_positions()[matched[tags.codes]], minlength=len(tags)) > 0
+
+
+def _nutriscore_inputs(parsed: ParsedRecipes, labels: list[str], limits: dict[str, dict] | None,
+                       score: Callable[[pd.DataFrame], np.ndarray] | None,
+                       tag_rules: tuple) -> tuple[np.ndarray | None, dict[str, np.ndarray]]:
+    """Grades of the recipes within ``limits`` and the masks of the Nutri-Score groups."""
+    if score is None:
+        return None, {}
+    nutrition = pd.DataFrame(np.asarray(parsed.nutrition), columns=labels)
+    within = np.ones(len(nutrition), dtype=bool)
+    for nutrient, bounds in (limits or {}).items():
+        if nutrient in nutrition.columns:
+            within &= nutrition[nutrient].between(bounds["min"], bounds["max"], inclusive="both").to_numpy()
+    grades = np.full(len(nutrition), None, dtype=object)
+    if within.any():
+        grades[within] = score(nutrition[within])
+
+    tags = parsed.tags
+    health = _rows_with(tags, np.array(["health" in str(tag).lower() for tag in tags.vocabulary], dtype=bool))
+    food = ~is_drink_recipe(tags, classify_tags(tags.vocabulary, *tag_rules))
+    return grades, {"health": health, "food": food, "food_health": food & health}
+
+
+def _normalized(vocabulary: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Lowercased, stripped vocabulary and the code mapping into it (``map_vocabulary``)."""
+    mapped = np.array([v.lower().strip() for v in vocabulary], dtype=object)
+    normalized, inverse = np.unique(mapped, return_inverse=True)
+    return normalized, inverse.astype(np.int32)
+
+
+@instrument
+def stream_recipes(source: str | os.PathLike, directory: str | os.PathLike, nutrition_labels: list[str],
+                   chunk_rows: int = CHUNK_ROWS, nutrition_limits: dict[str, dict] | None = None,
+                   score: Callable[[pd.DataFrame], np.ndarray] | None = None,
+                   drink_keywords: Iterable[str] = (), drink_false_positives: Iterable[str] = (),
+                   food_keywords: Iterable[str] = (), trim_quantile: float = TRIM_QUANTILE,
+                   trim_mode: str = TRIM_MODE, bins: int = HISTOGRAM_BINS,
+                   jobs: int | None = None) -> RecipeAggregates:
+    """
+    Ingest the CSV at ``source`` chunk by chunk into ``directory``: its
+    ``RowStore`` and its aggregates (``aggregates/``, see ``load_aggregates``).
+
+    Args:
+        nutrition_labels: Names of the values of the nutrition lists
+        chunk_rows: Recipes read, parsed and aggregated at once
+        nutrition_limits: Range of the recipes scored, per nutrient (and
+            of the nutrient histograms), like NUTRITION_LIMITS
+        score: Nutri-Score grades of a nutrition frame
+            (``nutriscore_analyzer.compute_nutriscore_batch``); no grade is
+            counted without it
+        drink_keywords, drink_false_positives, food_keywords: Rules of the
+            food / drink split of the Nutri-Score counts (see food_drink)
+        trim_quantile, trim_mode: Complexity trimming (see complexity_mask)
+            of the ingredient and continent aggregates
+        bins: Bins of each nutrient histogram
+        jobs: Worker processes of ``parse_recipes`` for each chunk
+    """
+    directory = Path(directory)
+    labels = list(nutrition_labels)
+    edges = nutrition_edges(labels, nutrition_limits, bins)
+    tag_rules = (list(drink_keywords), list(drink_false_positives), list(food_keywords))
+
+    writer = RowStoreWriter(directory, len(labels))
+    tags = nutrition = None
+    for chunk in pd.read_csv(source, chunksize=chunk_rows):
+        chunk = chunk.reset_index(drop=True)
+        parsed = parse_recipes(chunk, len(labels), jobs=jobs)
+        writer.append(chunk, parsed)
+        tags = _merge(tags, TagAggregate.from_chunk(chunk, parsed.tags))
+        grades, groups = _nutriscore_inputs(parsed, labels, nutrition_limits, score, tag_rules)
+        nutrition = _merge(nutrition, NutritionAggregate.from_chunk(parsed.nutrition, labels, edges, grades, groups))
+    if tags is None:
+        shutil.rmtree(writer.tmp, ignore_errors=True)
+        raise ValueError(f"{source} has no recipe rows")
+    store = writer.close()
+
+    # second pass, over the row store: trimmed ingredients and continents
+    bounds = trim_bounds(store, TRIM_COLUMNS, trim_quantile, trim_mode)
+    vocabulary, inverse = _normalized(store.parsed.ingredients.vocabulary)
+    ingredients = continents = None
+    for start, frame in store.iter_rows(TRIM_COLUMNS):
+        kept = start + np.flatnonzero(trim_mask(_trim_values(frame, TRIM_COLUMNS), bounds))
+        column = store.parsed.ingredients.take(kept)
+        normalized = ListColumn(column.offsets, inverse[column.codes], vocabulary)
+        continent, _ = resolve_regions(store.parsed.tags.take(kept))
+        ingredients = _merge(ingredients, IngredientAggregate.from_chunk(normalized))
+        continents = _merge(continents, ContinentAggregate.from_chunk(continent, normalized))
+
+    aggregates = RecipeAggregates(
+        n_rows=writer.n_rows, trim_bounds=bounds, tags=tags, nutrition=nutrition,
+        ingredients=ingredients, continents=continents,
+    )
+    save_aggregates(aggregates, directory / AGGREGATES_DIR)
+    logger.info("%s: %d rows streamed to %s", Path(source).name, writer.n_rows, directory)
+    return aggregates
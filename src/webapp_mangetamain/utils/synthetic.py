@@ -0,0 +1,194 @@
+"""Deterministic synthetic recipes with the Food.com schema.
+
+The frames have the columns of ``recipes_with_ratings.csv``, with ``tags``,
+``ingredients``, ``steps`` and ``nutrition`` stored as Python list literals
+like the real file, so every loader and analyzer of the app runs on them
+unchanged. They are meant for benchmarks and scale tests, offline:
+
+- tags and ingredients are drawn from Zipf-like (power-law) distributions
+  over fixed vocabularies. The most frequent tags are real Food.com tags,
+  and the cuisine, drink and health tags the app looks for are spread over
+  the ranks, so continents, drinks and 'health' subsets are all non-empty;
+- ``minutes`` is log-normal with a few extreme outliers, as in the real data;
+- ``nutrition`` holds the 7 values of ``cfg.nutrient_labels`` (calories, then
+  percentages of daily value), log-normal.
+
+Rows are generated in chunks of ``CHUNK_ROWS`` recipes, chunk ``k`` from the
+random generator seeded with ``(seed, k)``: the same ``n_recipes`` and
+``seed`` always give the same frame, and ``write_recipes_csv`` can stream
+millions of recipes without holding them in memory.
+"""
+import os
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from webapp_mangetamain.utils.filter_data import WORLD_CUISINES
+
+CHUNK_ROWS = 100_000
+
+# named sizes of the benchmark suite
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "5m": 5_000_000}
+
+COLUMNS = [
+    "name", "id", "minutes", "contributor_id", "submitted", "tags", "nutrition",
+    "n_steps", "steps", "description", "ingredients", "n_ingredients", "rating",
+]
+
+# most frequent Food.com tags, in decreasing order of frequency
+COMMON_TAGS = [
+    "preparation", "time-to-make", "course", "main-ingredient", "dietary", "easy",
+    "occasion", "cuisine", "low-in-something", "main-dish", "equipment",
+    "60-minutes-or-less", "number-of-servings", "meat", "30-minutes-or-less",
+    "vegetables", "taste-mood", "4-hours-or-less", "north-american", "3-steps-or-less",
+    "15-minutes-or-less", "low-sodium", "desserts", "low-carb", "healthy",
+    "dinner-party", "low-cholesterol", "low-calorie", "vegetarian", "beginner-cook",
+    "5-ingredients-or-less", "holiday-event", "inexpensive", "fruit", "american",
+    "eggs-dairy", "poultry", "low-saturated-fat", "european", "side-dishes",
+    "oven", "kid-friendly", "low-protein", "breakfast", "beverages", "italian",
+    "healthy-2", "chicken", "brunch", "low-fat", "mexican", "cocktails", "diet",
+    "asian", "smoothies", "coffee-cakes", "french", "indian", "punch", "shakes",
+]
+
+COMMON_INGREDIENTS = [
+    "salt", "butter", "sugar", "onion", "water", "eggs", "olive oil", "flour",
+    "milk", "garlic cloves", "pepper", "brown sugar", "garlic", "all-purpose flour",
+    "baking powder", "egg", "salt and pepper", "parmesan cheese", "lemon juice",
+    "baking soda", "vegetable oil", "vanilla", "black pepper", "cinnamon", "tomatoes",
+    "sour cream", "garlic powder", "vanilla extract", "oil", "honey", "onions",
+    "cream cheese", "garlic clove", "celery", "unsalted butter", "cornstarch",
+    "granulated sugar", "soy sauce", "carrots", "chicken broth", "ground beef",
+]
+
+
+def zipf_weights(n: int, exponent: float = 1.1) -> np.ndarray:
+    """Probabilities proportional to ``1 / rank ** exponent`` for ranks 1..n."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def _vocabulary(head: list[str], spread: list[str], n: int, filler: str) -> np.ndarray:
+    """``head`` at the top ranks, ``spread`` evenly over the other ranks, ``filler`` names elsewhere."""
+    head = list(dict.fromkeys(head))
+    spread = [s for s in dict.fromkeys(spread) if s not in head]
+    n = max(n, len(head) + len(spread))
+    names = [f"{filler}{i}" for i in range(n - len(head) - len(spread))]
+    step = max(1, len(names) // max(1, len(spread)))
+    for i, name in enumerate(spread):
+        names.insert(min(len(names), i * (step + 1)), name)
+    return np.array(head + names, dtype=object)
+
+
+def tag_vocabulary(n_tags: int = 550) -> np.ndarray:
+    """Tags ordered by rank (most frequent first), with every cuisine of WORLD_CUISINES."""
+    cuisines = [tag for tags in WORLD_CUISINES.values() for tag in tags]
+    return _vocabulary(COMMON_TAGS, cuisines, n_tags, "tag-")
+
+
+def ingredient_vocabulary(n_ingredients: int = 15_000) -> np.ndarray:
+    """Ingredients ordered by rank (most frequent first)."""
+    return _vocabulary(COMMON_INGREDIENTS, [], n_ingredients, "ingredient ")
+
+
+def _sample_lists(rng: np.random.Generator, lengths: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Draw ``lengths[i]`` codes for each row from ``weights``, without duplicates
+    inside a row (so rows may end up shorter).
+
+    Returns:
+        Tuple (offsets, codes), codes sorted by rank inside each row
+    """
+    rows = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+    codes = rng.choice(len(weights), size=len(rows), p=weights)
+    keys = np.unique(rows * len(weights) + codes)
+    rows, codes = np.divmod(keys, len(weights))
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(lengths)), out=offsets[1:])
+    return offsets, codes
+
+
+def _format_lists(offsets: np.ndarray, codes: np.ndarray, vocabulary: np.ndarray) -> list[str]:
+    """Stringified Python lists of the vocabulary entries of each row."""
+    quoted = np.array([repr(str(v)) for v in vocabulary], dtype=object)
+    items = quoted[codes].tolist()
+    bounds = offsets.tolist()
+    return ["[" + ", ".join(items[a:b]) + "]" for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def _generate_chunk(n: int, first_id: int, rng: np.random.Generator, tags: np.ndarray,
+                    ingredients: np.ndarray, steps: np.ndarray) -> pd.DataFrame:
+    tag_offsets, tag_codes = _sample_lists(
+        rng, np.clip(rng.poisson(17, n), 3, 60), zipf_weights(len(tags), 1.0))
+    ing_offsets, ing_codes = _sample_lists(
+        rng, np.clip(rng.poisson(9, n), 1, 40), zipf_weights(len(ingredients), 1.1))
+    step_offsets, step_codes = _sample_lists(
+        rng, np.clip(rng.poisson(9, n), 1, 100), zipf_weights(len(steps), 0.8))
+
+    # minutes: log-normal around 40 minutes, zeros and a few very long recipes
+    minutes = np.rint(rng.lognormal(np.log(40), 0.9, n)).astype(np.int64)
+    minutes[rng.random(n) < 0.003] = 0
+    outliers = rng.random(n) < 0.001
+    minutes[outliers] = rng.integers(10_000, 2_000_000, outliers.sum())
+
+    # calories, then % daily value of fat, sugar, sodium, protein, saturated fat, carbs
+    medians = np.array([320.0, 20.0, 25.0, 15.0, 20.0, 20.0, 8.0])
+    nutrition = np.round(rng.lognormal(np.log(medians), 0.9, (n, len(medians))), 1)
+
+    ids = np.arange(first_id, first_id + n, dtype=np.int64)
+    submitted = np.datetime64("1999-08-06") + rng.integers(0, 7_000, n)
+    return pd.DataFrame({
+        "name": [f"synthetic recipe {i}" for i in ids.tolist()],
+        "id": ids,
+        "minutes": minutes,
+        "contributor_id": rng.zipf(1.5, n) % 30_000,
+        "submitted": submitted.astype(str),
+        "tags": _format_lists(tag_offsets, tag_codes, tags),
+        "nutrition": [str(row) for row in nutrition.tolist()],
+        "n_steps": np.diff(step_offsets),
+        "steps": _format_lists(step_offsets, step_codes, steps),
+        "description": "synthetic recipe",
+        "ingredients": _format_lists(ing_offsets, ing_codes, ingredients),
+        "n_ingredients": np.diff(ing_offsets),
+        "rating": rng.choice([0.0, 1.0, 2.0, 3.0, 4.0, 5.0], n,
+                             p=[0.06, 0.01, 0.01, 0.04, 0.16, 0.72]),
+    }, columns=COLUMNS)
+
+
+def iter_recipe_chunks(n_recipes: int, seed: int = 0) -> Iterator[pd.DataFrame]:
+    """Yield the synthetic recipes ``CHUNK_ROWS`` rows at a time."""
+    tags = tag_vocabulary()
+    ingredients = ingredient_vocabulary()
+    steps = np.array([f"step {i} of the method" for i in range(5_000)], dtype=object)
+    for k, start in enumerate(range(0, n_recipes, CHUNK_ROWS)):
+        rng = np.random.default_rng([seed, k])
+        n = min(CHUNK_ROWS, n_recipes - start)
+        yield _generate_chunk(n, start + 1, rng, tags, ingredients, steps)
+
+
+def generate_recipes(n_recipes: int | str, seed: int = 0) -> pd.DataFrame:
+    """
+    Synthetic recipes with the Food.com schema.
+
+    Args:
+        n_recipes: Number of recipes, or a key of SIZES ("10k", "1m"...)
+        seed: Seed of the random generator
+
+    Returns:
+        DataFrame with the columns of COLUMNS and a RangeIndex
+    """
+    n_recipes = SIZES.get(n_recipes, n_recipes) if isinstance(n_recipes, str) else n_recipes
+    return pd.concat(list(iter_recipe_chunks(n_recipes, seed)), ignore_index=True)
+
+
+def write_recipes_csv(path: str | os.PathLike, n_recipes: int | str, seed: int = 0) -> Path:
+    """Write the synthetic recipes to ``path`` chunk by chunk (atomically)."""
+    n_recipes = SIZES.get(n_recipes, n_recipes) if isinstance(n_recipes, str) else n_recipes
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    for k, chunk in enumerate(iter_recipe_chunks(n_recipes, seed)):
+        chunk.to_csv(tmp, mode="w" if k == 0 else "a", header=k == 0, index=False)
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,134 @@
+"""Inverted tag -> recipes index with bitmap set operations.
+
+``TagBitmapIndex`` transposes the tag ``ListColumn`` of a dataset: for each
+tag of the vocabulary it stores the sorted positions of the recipes carrying
+it (the CSC counterpart of the recipe -> tags CSR index). A query resolves to
+a ``TagBitmap``, a packed bit array with one bit per recipe of the dataset,
+so predicates combine with ``&``, ``|`` and ``~`` over ``n_recipes / 8``
+bytes:
+
+    index = parsed.tag_bitmaps
+    mask = (index.matching("health") & ~index.any_of(["desserts"])).to_mask()
+
+Pattern groups (``matching``) are evaluated once over the distinct tags,
+never over the recipes, and memoized on the index. Positions are those of
+the loaded dataset, so ``mask[df.index]`` selects the rows of any subset of
+it.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Iterable
+
+import numpy as np
+
+from webapp_mangetamain.utils.ingestion import ListColumn
+
+
+@dataclass(frozen=True)
+class TagBitmap:
+    """Set of recipe positions stored as packed bits (``np.packbits`` order)."""
+
+    bits: np.ndarray
+    size: int
+
+    @classmethod
+    def from_positions(cls, positions: np.ndarray, size: int) -> "TagBitmap":
+        mask = np.zeros(size, dtype=bool)
+        mask[positions] = True
+        return cls.from_mask(mask)
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray) -> "TagBitmap":
+        return cls(np.packbits(mask), len(mask))
+
+    def to_mask(self) -> np.ndarray:
+        """Boolean mask over the recipes of the dataset."""
+        return np.unpackbits(self.bits, count=self.size).astype(bool)
+
+    def positions(self) -> np.ndarray:
+        """Sorted positions of the recipes in the set."""
+        return np.flatnonzero(self.to_mask())
+
+    def count(self) -> int:
+        """Number of recipes in the set."""
+        return int(np.bitwise_count(self.bits).sum())
+
+    def __and__(self, other: "TagBitmap") -> "TagBitmap":
+        return TagBitmap(self.bits & other.bits, self.size)
+
+    def __or__(self, other: "TagBitmap") -> "TagBitmap":
+        return TagBitmap(self.bits | other.bits, self.size)
+
+    def __invert__(self) -> "TagBitmap":
+        bits = ~self.bits
+        # padding bits of the last byte stay cleared
+        if self.size % 8:
+            bits[-1] &= np.uint8(0xFF << (8 - self.size % 8) & 0xFF)
+        return TagBitmap(bits, self.size)
+
+
+@dataclass(frozen=True)
+class TagBitmapIndex:
+    """
+    Recipes of each tag: ``positions[indptr[code]:indptr[code + 1]]`` are
+    the recipes tagged with ``vocabulary[code]``.
+    """
+
+    vocabulary: np.ndarray
+    indptr: np.ndarray
+    positions: np.ndarray
+    n_recipes: int
+    _groups: dict = field(default_factory=dict, repr=False, compare=False)
+
+    @classmethod
+    def from_tags(cls, tags: ListColumn) -> "TagBitmapIndex":
+        """Build the index from the recipe -> tags column."""
+        order = np.argsort(tags.codes, kind="stable")
+        counts = np.bincount(tags.codes, minlength=len(tags.vocabulary))
+        indptr = np.zeros(len(tags.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return cls(
+            vocabulary=tags.vocabulary,
+            indptr=indptr,
+            positions=tags.row_positions()[order].astype(np.int32),
+            n_recipes=len(tags),
+        )
+
+    def codes_matching(self, pattern: str, regex: bool = True, case: bool = False) -> np.ndarray:
+        """Codes of the tags containing ``pattern`` (a regex unless regex=False)."""
+        compiled = re.compile(pattern if regex else re.escape(pattern), 0 if case else re.IGNORECASE)
+        matched = np.fromiter((compiled.search(tag) is not None for tag in self.vocabulary),
+                              dtype=bool, count=len(self.vocabulary))
+        return np.flatnonzero(matched)
+
+    def codes_of(self, tags: Iterable[str]) -> np.ndarray:
+        """Codes of the given tags (unknown tags are ignored)."""
+        tags = np.asarray(list(tags), dtype=object)
+        if len(self.vocabulary) == 0 or len(tags) == 0:
+            return np.empty(0, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.vocabulary, tags), len(self.vocabulary) - 1)
+        return np.unique(pos[self.vocabulary[pos] == tags])
+
+    def bitmap(self, codes: np.ndarray) -> TagBitmap:
+        """Recipes carrying at least one of the tags ``codes``."""
+        codes = np.asarray(codes, dtype=np.int64)
+        starts, ends = self.indptr[codes], self.indptr[codes + 1]
+        lengths = ends - starts
+        items = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return TagBitmap.from_positions(self.positions[items], self.n_recipes)
+
+    def matching(self, pattern: str | re.Pattern, regex: bool = True, case: bool = False) -> TagBitmap:
+        """Recipes with a tag containing ``pattern``, memoized per pattern."""
+        if isinstance(pattern, re.Pattern):
+            pattern, case = pattern.pattern, not (pattern.flags & re.IGNORECASE)
+        key = (pattern, regex, case)
+        if key not in self._groups:
+            self._groups[key] = self.bitmap(self.codes_matching(pattern, regex=regex, case=case))
+        return self._groups[key]
+
+    def any_of(self, tags: Iterable[str]) -> TagBitmap:
+        """Recipes carrying at least one of ``tags``, memoized per tag set."""
+        key = ("any_of", frozenset(tags))
+        if key not in self._groups:
+            self._groups[key] = self.bitmap(self.codes_of(key[1]))
+        return self._groups[key]
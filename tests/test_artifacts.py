@@ -0,0 +1,160 @@
+import pytest
+import json
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.build_artifacts import OPTIONAL_STAGES, STAGES
+from src.webapp_mangetamain.load_config import artifact_settings
+from src.webapp_mangetamain.utils.artifacts import Stage, build, fresh_output, read_manifest
+from src.webapp_mangetamain.utils.dataset_cache import clear_memory_cache as clear_frames
+from src.webapp_mangetamain.utils.dataset_cache import source_fingerprint
+from src.webapp_mangetamain.utils.filter_data import DatasetContext
+from src.webapp_mangetamain.utils.ingestion import parse_recipes
+from src.webapp_mangetamain.utils.ingredient_cube import load_ingredient_cube
+from src.webapp_mangetamain.utils.schema import clear_memory_cache
+from src.webapp_mangetamain.utils.synthetic import generate_recipes
+
+
+# ==================== FIXTURES ====================
+
+
+def write_source(settings, out_dir):
+    (out_dir / "source.txt").write_text(f"source {settings['params']['greeting']}")
+
+
+def write_upper(settings, out_dir):
+    (out_dir / "upper.txt").write_text(settings["params"]["greeting"].upper())
+
+
+def write_count(settings, out_dir):
+    (out_dir / "count.txt").write_text(str(settings["params"]["count"]))
+
+
+def fail(settings, out_dir):
+    raise RuntimeError("broken stage")
+
+
+def write_nothing(settings, out_dir):
+    pass
+
+
+TOY_STAGES = [
+    Stage("source", write_source, sources=("data",), params=("greeting",)),
+    Stage("upper", write_upper, deps=("source",)),
+    Stage("count", write_count, params=("count",)),
+]
+
+
+@pytest.fixture
+def settings():
+    return {"params": {"greeting": "hello", "count": 3}}
+
+
+@pytest.fixture
+def recipes_settings(tmp_path):
+    """Build settings pointing at a small synthetic dataset."""
+    csv = tmp_path / "recipes.csv"
+    generate_recipes(1500, seed=5).to_csv(csv, index=False)
+    settings = artifact_settings()
+    settings["sources"] = {"recipe": str(csv), "recipe_rating": str(csv)}
+    settings["cache_dir"] = str(tmp_path / "cache")
+    settings["params"].update(min_count=5, max_count=2000, min_co=2)
+    yield settings
+    clear_memory_cache()
+    clear_frames()
+
+
+# ==================== TESTS ====================
+
+
+def test_only_stale_stages_rebuild(tmp_path, settings):
+    """A changed param rebuilds its stage and the stages depending on it."""
+    fingerprints = {"data": "v1"}
+    assert build(TOY_STAGES, settings, fingerprints, tmp_path, jobs=2) == {
+        "source": "built", "upper": "built", "count": "built"}
+    assert set(build(TOY_STAGES, settings, fingerprints, tmp_path).values()) == {"fresh"}
+
+    settings["params"]["greeting"] = "bye"
+    status = build(TOY_STAGES, settings, fingerprints, tmp_path)
+    assert status == {"source": "built", "upper": "built", "count": "fresh"}
+    assert (tmp_path / "upper.txt").read_text() == "BYE"
+
+    (tmp_path / "count.txt").unlink()
+    assert build(TOY_STAGES, settings, {"data": "v1"}, tmp_path, dry_run=True)["count"] == "stale"
+    assert build(TOY_STAGES, settings, {"data": "v2"}, tmp_path) == {
+        "source": "built", "upper": "built", "count": "built"}
+    assert not (tmp_path / ".build").exists()
+
+
+def test_failed_stage_skips_its_dependents(tmp_path, settings):
+    """A failing stage keeps no manifest entry and its dependents do not run."""
+    stages = [Stage("source", fail), Stage("upper", write_upper, deps=("source",)),
+              Stage("count", write_count, params=("count",))]
+    status = build(stages, settings, {}, tmp_path)
+
+    assert status == {"source": "failed", "upper": "skipped", "count": "built"}
+    assert set(read_manifest(tmp_path)) == {"count"}
+    with pytest.raises(ValueError):
+        build(stages + [Stage("loop", fail, deps=("loop",))], settings, {}, tmp_path)
+
+
+def test_fresh_output_checks_sources_and_params(tmp_path, settings):
+    """An output is served only for the fingerprints and params it was built from."""
+    stages = [Stage("count", write_count, sources=("data",), params=("count",))]
+    build(stages, settings, {"data": "v1"}, tmp_path)
+    (tmp_path / "count").mkdir()
+
+    assert fresh_output(tmp_path, "count", settings, {"data": "v1"}) == tmp_path / "count"
+    assert fresh_output(tmp_path, "count", settings, {"data": "v2"}) is None
+    settings["params"]["count"] = 4
+    assert fresh_output(tmp_path, "count", settings, {"data": "v1"}) is None
+    assert json.loads((tmp_path / "manifest.json").read_text())["count"]["params"] == {"count": 3}
+
+
+def test_nutriscore_output_stale_after_threshold_change(tmp_path):
+    """The Nutri-Score thresholds are part of the nutriscore stage key."""
+    settings = artifact_settings()
+    params = next(stage.params for stage in STAGES if stage.name == "nutriscore")
+    build([Stage("nutriscore", write_nothing, params=params)], settings, {}, tmp_path)
+    (tmp_path / "nutriscore").mkdir()
+    assert fresh_output(tmp_path, "nutriscore", settings, {}) == tmp_path / "nutriscore"
+
+    settings["params"]["nutriscore_thresholds"]["sugar"][0] += 1
+    assert fresh_output(tmp_path, "nutriscore", settings, {}) is None
+
+
+def test_app_stages_match_in_process_results(tmp_path, recipes_settings):
+    """The built cube and co-occurrence match what the app computes itself."""
+    fingerprints = {name: source_fingerprint(path, recipes_settings["cache_dir"])
+                    for name, path in recipes_settings["sources"].items()}
+    artifacts = tmp_path / "artifacts"
+    status = build(STAGES, recipes_settings, fingerprints, artifacts, jobs=2)
+
+    assert set(status.values()) == {"built"}
+    df = pd.read_csv(recipes_settings["sources"]["recipe"])
+    context = DatasetContext(df, parse_recipes(df), trim_mode=recipes_settings["params"]["trim_mode"])
+    cube = load_ingredient_cube(fresh_output(artifacts, "ingredient_cube", recipes_settings, fingerprints))
+    pd.testing.assert_frame_equal(cube.top(10, 0.3), context.ingredient_cube.top(10, 0.3))
+    scored = pd.read_parquet(artifacts / "nutriscore" / "scored.parquet")
+    assert scored["nutri_score"].notna().all() and len(scored) > 1000
+    assert (artifacts / "neighbors" / "indptr.npy").exists()
+    assert np.all(np.diff(np.load(artifacts / "cooccurrence" / "indptr.npy")) >= 0)
+    assert not (artifacts / "streamed").exists()
+
+
+def test_optional_stages_build_on_request(tmp_path, recipes_settings):
+    """The streamed stage only runs when named."""
+    fingerprints = {name: source_fingerprint(path, recipes_settings["cache_dir"])
+                    for name, path in recipes_settings["sources"].items()}
+    status = build(STAGES + OPTIONAL_STAGES, recipes_settings, fingerprints, tmp_path, only=["streamed"])
+
+    assert status == {"streamed": "built"}
+    assert (tmp_path / "streamed" / "aggregates" / "meta.json").exists()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,50 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.utils.compute_cache import cache_computation
+
+
+# ==================== TESTS ====================
+
+
+def test_cache_computation_memoizes_on_arguments():
+    """Results are reused for the same fingerprint and parameters only."""
+    calls = []
+
+    @cache_computation(max_entries=2)
+    def square(fingerprint, x):
+        calls.append((fingerprint, x))
+        return x * x
+
+    assert square("fp1", 3) == 9
+    assert square("fp1", 3) == 9
+    assert square("fp2", 3) == 9
+    assert calls == [("fp1", 3), ("fp2", 3)]
+    square.clear()
+
+
+def test_cache_computation_evicts_least_recently_used():
+    """The cache holds at most max_entries results per function."""
+    calls = []
+
+    @cache_computation(max_entries=2)
+    def identity(fingerprint, x):
+        calls.append(x)
+        return x
+
+    identity("fp", 1)
+    identity("fp", 2)
+    identity("fp", 1)
+    identity("fp", 3)  # evicts 2, the least recently used
+    identity("fp", 1)
+    identity("fp", 2)
+
+    assert calls == [1, 2, 3, 2]
+    identity.clear()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
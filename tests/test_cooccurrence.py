@@ -0,0 +1,153 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.utils.cooccurrence import (
+    CooccurrenceMatrices,
+    NeighborIndex,
+    build_incidence,
+    cooccurrence_matrix,
+    jaccard_matrix,
+    jaccard_pairs,
+    load_cooccurrence,
+    load_neighbor_index,
+    save_cooccurrence,
+    to_dense_frame,
+)
+from src.webapp_mangetamain.ingredients_analyzer import top_cooccurrences_for
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture
+def sample_exploded():
+    """(id, ingredient) pairs, with a duplicated ingredient in recipe 1."""
+    return pd.DataFrame(
+        {
+            "id": [1, 1, 1, 1, 2, 2, 3, 3, 4],
+            "ingredients": ["salt", "eggs", "milk", "salt", "salt", "eggs", "eggs", "milk", "flour"],
+        }
+    )
+
+
+# ==================== TESTS ====================
+
+
+def test_cooccurrence_matches_dense_pivot(sample_exploded):
+    """Sparse co-occurrence equals the dense pivot_table product."""
+    bin_df = (
+        sample_exploded.drop_duplicates()
+        .assign(val=1)
+        .pivot_table(index="id", columns="ingredients", values="val", fill_value=0)
+    )
+    expected = bin_df.T.dot(bin_df)
+
+    incidence, labels = build_incidence(sample_exploded)
+    co = to_dense_frame(cooccurrence_matrix(incidence), labels)
+
+    np.testing.assert_array_equal(co.values, expected.values)
+    assert list(co.index) == list(expected.index)
+
+
+def test_jaccard_matrix_dense_export(sample_exploded):
+    """Dense Jaccard has 1 on the diagonal and |A∩B| / |A∪B| elsewhere."""
+    incidence, labels = build_incidence(sample_exploded)
+    jaccard = to_dense_frame(jaccard_matrix(cooccurrence_matrix(incidence)), labels)
+
+    assert jaccard.loc["salt", "salt"] == 1
+    assert jaccard.loc["salt", "eggs"] == pytest.approx(2 / 3)
+    assert jaccard.loc["salt", "flour"] == 0
+
+
+def test_jaccard_pairs_min_co(sample_exploded):
+    """Only pairs a < b with enough co-occurrences are listed, best first."""
+    incidence, labels = build_incidence(sample_exploded)
+    pairs = jaccard_pairs(cooccurrence_matrix(incidence), labels, min_co=2)
+
+    assert pairs[["ing_a", "ing_b", "co"]].values.tolist() == [
+        ["eggs", "milk", 2],
+        ["eggs", "salt", 2],
+    ]
+    assert pairs["score"].tolist() == pytest.approx([2 / 3, 2 / 3])
+
+
+def test_save_and_load_cooccurrence(sample_exploded, tmp_path):
+    """The binary artifact is memory-mapped back with the same matrices."""
+    incidence, labels = build_incidence(sample_exploded)
+    co = cooccurrence_matrix(incidence)
+    save_cooccurrence(CooccurrenceMatrices.from_cooccurrence(co, labels), tmp_path / "cooccurrence")
+    loaded = load_cooccurrence(tmp_path / "cooccurrence")
+
+    assert isinstance(loaded.co, np.memmap)
+    assert list(loaded.labels) == list(labels)
+    np.testing.assert_array_equal(loaded.co_matrix().toarray(), co.toarray())
+    np.testing.assert_allclose(
+        loaded.jaccard_matrix().toarray(), jaccard_matrix(co).toarray(), rtol=1e-6
+    )
+
+
+def test_load_cooccurrence_converts_legacy_csv(sample_exploded, tmp_path):
+    """A dense co_occurrence.csv from earlier versions is converted once."""
+    incidence, labels = build_incidence(sample_exploded)
+    co = cooccurrence_matrix(incidence)
+    to_dense_frame(co, labels).to_csv(tmp_path / "co_occurrence.csv")
+
+    loaded = load_cooccurrence(tmp_path / "cooccurrence")
+
+    assert (tmp_path / "cooccurrence" / "co.npy").exists()
+    np.testing.assert_array_equal(loaded.co_matrix().toarray(), co.toarray())
+
+
+def test_top_cooccurrences_for_matrices_matches_dense(sample_exploded):
+    """Querying the binary artifact gives the same ranking as the dense frames."""
+    incidence, labels = build_incidence(sample_exploded)
+    co = cooccurrence_matrix(incidence)
+    matrices = CooccurrenceMatrices.from_cooccurrence(co, labels)
+
+    expected = top_cooccurrences_for(
+        "Eggs ", to_dense_frame(jaccard_matrix(co), labels), to_dense_frame(co, labels), k=5, min_co=1
+    )
+    result = top_cooccurrences_for("Eggs ", matrices, k=5, min_co=1)
+
+    assert result["other"].tolist() == expected["other"].tolist()
+    assert result["co"].tolist() == expected["co"].tolist()
+    np.testing.assert_allclose(result["score"], expected["score"], rtol=1e-6)
+    assert top_cooccurrences_for("caviar", matrices).empty
+
+
+def test_neighbor_index_matches_matrices(sample_exploded):
+    """The precomputed order gives the same top-k as sorting the row."""
+    incidence, labels = build_incidence(sample_exploded)
+    matrices = CooccurrenceMatrices.from_cooccurrence(cooccurrence_matrix(incidence), labels)
+    index = NeighborIndex.from_matrices(matrices)
+
+    for label in labels:
+        for k, min_co in [(1, 1), (5, 1), (5, 2)]:
+            expected = top_cooccurrences_for(label, matrices, k=k, min_co=min_co)
+            result = top_cooccurrences_for(label, index, k=k, min_co=min_co)
+            pd.testing.assert_frame_equal(result, expected)
+
+
+def test_load_neighbor_index_builds_from_cooccurrence(sample_exploded, tmp_path):
+    """A missing index is built from the sibling cooccurrence/ directory."""
+    incidence, labels = build_incidence(sample_exploded)
+    save_cooccurrence(
+        CooccurrenceMatrices.from_cooccurrence(cooccurrence_matrix(incidence), labels),
+        tmp_path / "cooccurrence",
+    )
+    index = load_neighbor_index(tmp_path / "neighbors")
+
+    assert (tmp_path / "neighbors" / "neighbors.npy").exists()
+    assert load_neighbor_index(tmp_path / "neighbors") is index
+    others, _, co = index.top_neighbors(index.index_of("eggs"), k=2, min_co=1)
+    assert others.tolist() == ["milk", "salt"]
+    assert co.tolist() == [2, 2]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
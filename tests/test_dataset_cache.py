@@ -0,0 +1,84 @@
+import pytest
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.utils import dataset_cache
+from src.webapp_mangetamain.utils.dataset_cache import (
+    cache_path_for,
+    clear_memory_cache,
+    load_dataset,
+)
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture
+def sample_csv(tmp_path):
+    """Small recipes CSV on disk."""
+    path = tmp_path / "recipes.csv"
+    pd.DataFrame(
+        {
+            "id": [1, 2, 3],
+            "name": ["a", "b", "c"],
+            "tags": ["['italian', 'easy']", "['mexican']", "['desserts']"],
+            "minutes": [30, 15, 45],
+        }
+    ).to_csv(path, index=False)
+    yield path
+    clear_memory_cache()
+
+
+# ==================== TESTS ====================
+
+
+def test_load_dataset_writes_parquet_cache(sample_csv, tmp_path):
+    """First load parses the CSV and writes the Parquet cache."""
+    cache_dir = tmp_path / "cache"
+    df = load_dataset(sample_csv, cache_dir)
+
+    assert list(df["id"]) == [1, 2, 3]
+    assert cache_path_for(sample_csv, cache_dir).exists()
+
+
+def test_load_dataset_reuses_cache(sample_csv, tmp_path, monkeypatch):
+    """A later start reads the cache without parsing the CSV again."""
+    cache_dir = tmp_path / "cache"
+    expected = load_dataset(sample_csv, cache_dir)
+    clear_memory_cache()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("CSV should not be parsed again")
+
+    monkeypatch.setattr(dataset_cache.pd, "read_csv", fail)
+    df = load_dataset(sample_csv, cache_dir)
+
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_load_dataset_once_per_path(sample_csv, tmp_path):
+    """Two loads of the same path share a single parsed frame."""
+    cache_dir = tmp_path / "cache"
+    assert load_dataset(sample_csv, cache_dir) is load_dataset(str(sample_csv), cache_dir)
+
+
+def test_load_dataset_invalidated_on_change(sample_csv, tmp_path):
+    """Editing the source file rebuilds the cache entry."""
+    cache_dir = tmp_path / "cache"
+    old_path = cache_path_for(sample_csv, cache_dir)
+    load_dataset(sample_csv, cache_dir)
+    clear_memory_cache()
+
+    pd.DataFrame({"id": [7], "name": ["z"], "tags": ["[]"], "minutes": [5]}).to_csv(sample_csv, index=False)
+    df = load_dataset(sample_csv, cache_dir)
+
+    assert list(df["id"]) == [7]
+    assert cache_path_for(sample_csv, cache_dir) != old_path
+    assert not old_path.exists()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
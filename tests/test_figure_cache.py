@@ -0,0 +1,117 @@
+import pytest
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.load_config import Config
+from src.webapp_mangetamain.ingredients_analyzer import plot_ingredient_per_recette
+from src.webapp_mangetamain.recipe_complexity import make_pairplot_fig
+from src.webapp_mangetamain.utils.figure_cache import FigureCache, code_digest, config_digest
+from src.webapp_mangetamain.utils.profiling import instrument
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture
+def calls():
+    """Records the calls to the figure builders."""
+    return []
+
+
+@pytest.fixture
+def bar_fig(calls):
+    """Builder of a bar chart of the first n values of a frame."""
+    def build(df, n, color="C0"):
+        calls.append(n)
+        fig, ax = plt.subplots(figsize=(2, 2))
+        ax.bar(range(n), df["value"].head(n), color=color)
+        return fig
+    return build
+
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({"value": [3, 1, 4, 1, 5]})
+
+
+# ==================== TESTS ====================
+
+
+def test_render_hits_skip_the_builder(bar_fig, calls, sample_df):
+    """Only the first render of a given key builds the figure."""
+    cache = FigureCache(fmt="png", dpi=50)
+    first = cache.render("fp", bar_fig, 3, data=(sample_df,))
+    again = cache.render("fp", bar_fig, 3, data=(sample_df,))
+    cache.render("fp", bar_fig, 4, data=(sample_df,))
+    cache.render("other-fp", bar_fig, 3, data=(sample_df,))
+
+    assert calls == [3, 4, 3]
+    assert again == first
+    assert first[0].startswith(b"\x89PNG")
+    assert plt.get_fignums() == []
+
+
+def test_multiple_figures_and_svg(sample_df):
+    """A builder returning several figures gives one image each."""
+    def build(df):
+        return plt.subplots()[0], plt.subplots()[0]
+
+    images = FigureCache(fmt="svg").render("fp", build, data=(sample_df,))
+    assert len(images) == 2
+    assert b"<svg" in images[0]
+
+
+def test_size_bounded_eviction(bar_fig, calls, sample_df):
+    """The least recently used images are evicted past max_bytes."""
+    probe = FigureCache(dpi=50).render("fp", bar_fig, 2, data=(sample_df,))
+    cache = FigureCache(max_bytes=int(len(probe[0]) * 2.5), dpi=50)
+    calls.clear()
+
+    for n in [1, 2, 3]:
+        cache.render("fp", bar_fig, n, data=(sample_df,))
+    cache.render("fp", bar_fig, 3, data=(sample_df,))
+    cache.render("fp", bar_fig, 1, data=(sample_df,))
+
+    assert calls == [1, 2, 3, 1]
+
+
+def test_disk_tier(bar_fig, calls, sample_df, tmp_path):
+    """Images written to disk are served to a fresh cache."""
+    FigureCache(dpi=50, disk_dir=tmp_path).render("fp", bar_fig, 2, data=(sample_df,))
+    images = FigureCache(dpi=50, disk_dir=tmp_path).render("fp", bar_fig, 2, data=(sample_df,))
+
+    assert calls == [2]
+    assert len(list(tmp_path.glob("*.png"))) == 1
+    assert images[0].startswith(b"\x89PNG")
+
+
+def test_disk_tier_keyed_on_code_and_config(bar_fig, calls, sample_df, tmp_path):
+    """Images on disk are not served for another config or builder code."""
+    bar_fig = instrument(bar_fig)
+    config = Config({"profiling": {"enabled": False}, "complexity_trimming": {"mode": "sequential"}})
+    digest = config_digest(config)
+    config.profiling.enabled = True
+    assert config_digest(config) == digest
+    config.complexity_trimming.mode = "joint"
+    assert config_digest(config) != digest
+
+    FigureCache(dpi=50, disk_dir=tmp_path, config_digest=digest).render("fp", bar_fig, 2, data=(sample_df,))
+    FigureCache(dpi=50, disk_dir=tmp_path, config_digest=config_digest(config)).render(
+        "fp", bar_fig, 2, data=(sample_df,))
+    assert calls == [2, 2]
+
+    # instrumented builders are hashed on their own module, not on profiling.py
+    assert code_digest(bar_fig) == code_digest(test_disk_tier)
+    assert code_digest(bar_fig) != code_digest(instrument)
+    assert code_digest(make_pairplot_fig) != code_digest(plot_ingredient_per_recette)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
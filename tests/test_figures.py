@@ -0,0 +1,111 @@
+import pytest
+import gc
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.utils.figure_cache import FigureCache
+from src.webapp_mangetamain.utils.figures import figure, show_pyplot, subplots
+from src.webapp_mangetamain.ingredients_analyzer import make_top_ingredients_bar_fig
+from src.webapp_mangetamain.nutriscore_analyzer import plot_nutriscore_comparison
+from src.webapp_mangetamain.recipe_complexity import make_pairplot_fig
+from src.webapp_mangetamain.tag_analyzer import plot_tags_per_recipe_distribution
+
+
+def rss_bytes() -> int:
+    """Resident set size of the test process."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture
+def recipes():
+    """Recipes with a Nutri-Score, some of them tagged 'healthy'."""
+    rng = np.random.default_rng(0)
+    n = 500
+    return pd.DataFrame({
+        "nutri_score": rng.choice(list("ABCDE"), n),
+        "tags": [["healthy", "easy"] if i % 3 == 0 else ["easy"] for i in range(n)],
+        "minutes": rng.integers(1, 200, n),
+        "n_steps": rng.integers(1, 30, n),
+        "n_ingredients": rng.integers(1, 20, n),
+    })
+
+
+@pytest.fixture
+def ingredient_counts():
+    return pd.DataFrame({"ingredients": [f"ing{i}" for i in range(40)], "count": np.arange(40, 0, -1)})
+
+
+@pytest.fixture(autouse=True)
+def no_open_figures():
+    plt.close("all")
+    yield
+    plt.close("all")
+
+
+# ==================== TESTS ====================
+
+
+def test_subplots_are_not_tracked_by_pyplot():
+    """Figures of the factory are not kept alive by pyplot."""
+    fig, axes = subplots(1, 2, figsize=(4, 2))
+    assert axes.shape == (2,) and len(fig.axes) == 2
+    assert plt.get_fignums() == []
+
+    with figure(figsize=(2, 2)) as (fig, ax):
+        ax.plot([0, 1])
+    assert fig.axes == []
+
+
+def test_show_pyplot_closes_on_error(monkeypatch):
+    """The figure is closed even if displaying it fails."""
+    import src.webapp_mangetamain.utils.figures as figures
+
+    def broken(fig):
+        raise RuntimeError("display failed")
+
+    monkeypatch.setattr(figures.st, "pyplot", broken)
+    fig = plt.figure()
+    with pytest.raises(RuntimeError):
+        show_pyplot(fig)
+    assert plt.get_fignums() == []
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc to read the RSS")
+def test_reruns_do_not_grow_memory(recipes, ingredient_counts):
+    """Rendering the tab figures over many reruns keeps the RSS bounded."""
+    cache = FigureCache(max_bytes=0, dpi=50)
+    features = ["minutes", "n_steps", "n_ingredients"]
+
+    def rerun():
+        plot_nutriscore_comparison(recipes, recipes)
+        plot_tags_per_recipe_distribution(recipes, recipes["tags"].str.len())
+        cache.to_bytes(make_top_ingredients_bar_fig(ingredient_counts, top_n=20))
+        cache.to_bytes(make_pairplot_fig(recipes, features, aggregate=False))
+
+    for _ in range(2):
+        rerun()
+    samples = []
+    for _ in range(12):
+        rerun()
+        gc.collect()
+        samples.append(rss_bytes())
+
+    # the allocator makes the RSS oscillate: compare the lows, a leak raises them
+    assert plt.get_fignums() == []
+    assert min(samples[-3:]) - min(samples[:3]) < 40 << 20
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,161 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.utils import filter_data
+from src.webapp_mangetamain.utils.ingestion import ListColumn
+from src.webapp_mangetamain.utils.filter_data import (
+    REGIONS,
+    DatasetContext,
+    complexity_mask,
+    filter_counts_window,
+    general_complexity_prepocessing,
+    region_names,
+    resolve_regions,
+    separate_foods_drinks,
+)
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture
+def sample_recipes_df():
+    """Recipes with stringified tags and ingredients."""
+    return pd.DataFrame(
+        {
+            "id": [1, 2, 3, 4],
+            "minutes": [10, 20, 30, 0],
+            "n_steps": [2, 3, 4, 1],
+            "n_ingredients": [2, 1, 2, 1],
+            "tags": ["['italian', 'easy']", "['mexican']", "['easy']", "['french']"],
+            "ingredients": ["['Salt ', 'butter']", "['salt']", "['eggs', 'salt']", "['milk']"],
+        }
+    )
+
+
+# ==================== TESTS ====================
+
+
+def test_import_does_not_load_data():
+    """Importing the module computes nothing until a table is requested."""
+    assert filter_data._context is None
+    assert "ingredients_exploded" in filter_data.LAZY_TABLES
+
+
+def test_context_tables_are_lazy_and_memoized(sample_recipes_df):
+    """Tables are computed on first access and reused afterwards."""
+    context = DatasetContext(sample_recipes_df)
+    assert "recipes_clean" not in vars(context)
+
+    exploded = context.ingredients_exploded
+
+    assert "recipes_clean" in vars(context)
+    assert context.ingredients_exploded is exploded
+    assert set(exploded["ingredients"]) <= {"salt", "butter", "eggs"}
+    assert 4 not in exploded["id"].values
+
+
+def test_context_continent_tables(sample_recipes_df):
+    """Recipes get the region of their first cuisine tag."""
+    context = DatasetContext(sample_recipes_df)
+    continents = context.recipes_with_continent.set_index("id")["continent"]
+
+    assert continents[1] == "Europe"
+    assert pd.isna(continents.get(3))
+    assert "log_minutes" in context.recipes_with_continent
+
+
+def test_resolve_regions_first_match_and_mask():
+    """The first cuisine tag gives the continent, every cuisine tag sets a bit."""
+    tags = ListColumn.from_lists([["easy", "Thai ", "italian"], ["easy"], ["french", "german"], []])
+    continent, regions = resolve_regions(tags)
+
+    assert continent.dtype == np.int8
+    assert [REGIONS[c] if c >= 0 else None for c in continent] == ["Asia", None, "Europe", None]
+    assert region_names(regions[0]) == ["Europe", "Asia"]
+    assert regions.tolist()[1:] == [0, 1 << REGIONS.index("Europe"), 0]
+
+
+def test_context_continent_columns_without_merges(sample_recipes_df):
+    """Continents are int8-coded categoricals aligned on the clean recipes."""
+    context = DatasetContext(sample_recipes_df.assign(minutes=[10, 20, 30, 40]), trim_mode="joint")
+    recipes = context.recipes_with_continent
+
+    assert recipes.index.equals(context.recipes_clean.index)
+    assert recipes["continent"].cat.codes.dtype == np.int8
+    assert set(context.ingredient_and_continent["id"]) == set(context.recipe_continent["id"])
+
+
+def test_sequential_trimming_matches_the_chained_filters():
+    """The single-pass mask keeps the rows of the former filter/quantile chain."""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "minutes": rng.integers(0, 5000, 2000),
+        "n_steps": rng.integers(0, 60, 2000),
+        "n_ingredients": rng.integers(0, 40, 2000),
+    })
+    expected = df
+    for c in ["minutes", "n_steps", "n_ingredients"]:
+        expected = expected[expected[c] > 0]
+    for c in ["minutes", "n_steps", "n_ingredients"]:
+        expected = expected[expected[c] <= expected[c].quantile(0.99)]
+
+    clean = general_complexity_prepocessing(df, mode="sequential")
+
+    assert clean.index.equals(expected.index)
+    assert np.allclose(clean["log_minutes"], np.log1p(expected["minutes"]))
+
+
+def test_joint_trimming_uses_the_same_rows_for_every_quantile():
+    """Joint bounds are the quantiles of the positive rows, taken together."""
+    df = pd.DataFrame({"minutes": [1, 2, 3, 1000, 0], "n_steps": [1, 2, 3, 100, 1], "n_ingredients": [1, 1, 1, 1, 1]})
+
+    joint = complexity_mask(df, quantile=0.75, mode="joint")
+    sequential = complexity_mask(df, quantile=0.75, mode="sequential")
+
+    assert joint.tolist() == [True, True, True, False, False]
+    # sequentially, the n_steps quantile is taken once the minutes outlier is gone
+    assert sequential.tolist() == [True, True, False, False, False]
+    with pytest.raises(ValueError):
+        complexity_mask(df, mode="median")
+
+
+def test_context_shares_the_trimming_mask(sample_recipes_df):
+    """The clean tables of the context are built from one mask."""
+    context = DatasetContext(sample_recipes_df, trim_mode="joint")
+    mask = context.clean_mask
+
+    assert mask.tolist() == [True, True, False, False]
+    assert context.recipes_clean["id"].tolist() == sample_recipes_df["id"][mask].tolist()
+    assert context.recipes_with_continent["log_minutes"].tolist() == context.recipes_clean["log_minutes"].tolist()
+
+
+def test_filter_counts_window():
+    """Counts are kept inside [min_count, max_count]."""
+    counts = pd.DataFrame({"ingredients": ["a", "b", "c"], "count": [1, 5, 10]})
+    assert filter_counts_window(counts, 2, 8)["ingredients"].tolist() == ["b"]
+    assert filter_counts_window(counts, 5)["ingredients"].tolist() == ["b", "c"]
+
+
+def test_separate_foods_drinks():
+    """Drinks are recipes with a drink tag and no food tag, coffee cakes excluded."""
+    df = pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "tags": ["['beverages', 'easy']", "['coffee-cakes', 'desserts']", "['smoothies', 'desserts']", "['easy']"],
+    })
+    food, drinks = separate_foods_drinks(df)
+
+    assert drinks["id"].tolist() == [1]
+    assert food["id"].tolist() == [2, 3, 4]
+
+    food, drinks = separate_foods_drinks(df, drink_labels=[False, False, False, True])
+    assert drinks["id"].tolist() == [4]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,74 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.utils.ingestion import ListColumn
+from src.webapp_mangetamain.utils.food_drink import (
+    TAG_DRINK,
+    TAG_FOOD,
+    TAG_NEUTRAL,
+    classify_tags,
+    is_drink_recipe,
+    load_drink_labels,
+)
+
+DRINK_KEYWORDS = [r"\bbeverage(s)?\b", r"\bcoffee\b", r"\bsmoothie(s)?\b"]
+DRINK_FALSE_POSITIVES = ["coffee-cakes?"]
+FOOD_KEYWORDS = [r"\b(desserts?)\b"]
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture
+def tags():
+    """Tags of 5 recipes."""
+    return ListColumn.from_lists([
+        ["beverages", "easy"],
+        ["coffee-cake", "breakfast"],
+        ["smoothies", "desserts"],
+        ["easy"],
+        ["Coffee", "Beverages"],
+    ])
+
+
+# ==================== TESTS ====================
+
+
+def test_classify_tags_honours_false_positives_and_food(tags):
+    """Each distinct tag is classified once, false positives excluded."""
+    kinds = dict(zip(tags.vocabulary, classify_tags(tags.vocabulary, DRINK_KEYWORDS,
+                                                    DRINK_FALSE_POSITIVES, FOOD_KEYWORDS)))
+    assert kinds["beverages"] == TAG_DRINK
+    assert kinds["Coffee"] == TAG_DRINK
+    assert kinds["coffee-cake"] == TAG_NEUTRAL
+    assert kinds["desserts"] == TAG_FOOD
+
+
+def test_is_drink_recipe(tags):
+    """A recipe is a drink with a drink tag and no food tag."""
+    kinds = classify_tags(tags.vocabulary, DRINK_KEYWORDS, DRINK_FALSE_POSITIVES, FOOD_KEYWORDS)
+    assert is_drink_recipe(tags, kinds).tolist() == [True, False, False, False, True]
+
+
+def test_load_drink_labels_is_persisted(tags, tmp_path):
+    """Labels are stored under the source and rules hashes and read back."""
+    source = tmp_path / "recipes.csv"
+    source.write_text("id\n1\n")
+    cache_dir = tmp_path / "cache"
+
+    labels = load_drink_labels(source, tags, DRINK_KEYWORDS, DRINK_FALSE_POSITIVES, FOOD_KEYWORDS, cache_dir)
+    assert len(list(cache_dir.glob("recipes-*.drinks-*.npy"))) == 1
+
+    again = load_drink_labels(source, tags, DRINK_KEYWORDS, DRINK_FALSE_POSITIVES, FOOD_KEYWORDS, cache_dir)
+    np.testing.assert_array_equal(again, labels)
+
+    load_drink_labels(source, tags, DRINK_KEYWORDS, [], FOOD_KEYWORDS, cache_dir)
+    assert len(list(cache_dir.glob("recipes-*.drinks-*.npy"))) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,125 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.utils.ingestion import (
+    ListColumn,
+    load_parsed,
+    parse_items,
+    parse_list,
+    parse_nutrition_matrix,
+    parse_recipes,
+    save_parsed,
+    tokenize_list,
+)
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture
+def sample_recipes_df():
+    """Recipes with stringified list columns."""
+    return pd.DataFrame(
+        {
+            "id": [1, 2, 3],
+            "tags": ["['italian', 'easy']", "['mexican']", "[]"],
+            "ingredients": ["['Salt ', 'butter']", "['salt']", "['eggs']"],
+            "steps": ["['mix', 'bake']", "['serve']", "[]"],
+            "nutrition": [
+                "[100, 10, 5, 20, 2, 50, 3]",
+                "[200, 15, 8, 30, 3, 60, 4]",
+                "invalid",
+            ],
+        }
+    )
+
+
+# ==================== TESTS ====================
+
+
+def test_parse_list_is_tolerant():
+    """Lists pass through, odd literals are wrapped, NaN gives an empty list."""
+    assert parse_list("['a', 'b']") == ["a", "b"]
+    assert parse_list(["a"]) == ["a"]
+    assert parse_list("5") == [5]
+    assert parse_list("not a list") == ["not a list"]
+    assert parse_list(float("nan")) == []
+
+
+def test_tokenizer_falls_back_like_parse_list():
+    """Plain repr lists are split directly, anything else parses like parse_list."""
+    assert tokenize_list("['a', 'b c']") == ["a", "b c"]
+    assert tokenize_list("[]") == []
+    odd = ["[\"mom's\", 'pie']", "['a\\'b']", "['a','b']", "['a', b']", "[']", "5", "oops", "[1, None]"]
+    assert all(tokenize_list(raw) is None for raw in odd)
+    for raw in odd + [None]:
+        assert parse_items(raw) == [str(v) for v in parse_list(raw) if v is not None]
+
+
+def test_nutrition_fast_path_matches_literal_eval():
+    """Number lists parse like literal_eval, invalid rows stay NaN."""
+    nutrition = parse_nutrition_matrix(["[1, 2.5, -3, 1e2, .5, 6, 7]", "[nan, 1, 2, 3, 4, 5, 6]", "[1, 2]"])
+
+    assert nutrition[0].tolist() == [1, 2.5, -3, 100, 0.5, 6, 7]
+    assert np.isnan(nutrition[1:]).all()
+
+
+def test_sharded_parse_matches_in_process(sample_recipes_df, monkeypatch):
+    """Shards parsed by worker processes merge into the same columns."""
+    import src.webapp_mangetamain.utils.ingestion as ingestion
+
+    df = pd.concat([sample_recipes_df] * 4, ignore_index=True)
+    expected = parse_recipes(df, jobs=1)
+    monkeypatch.setattr(ingestion, "PARSE_SHARD_ROWS", 3)
+    parsed = parse_recipes(df, jobs=2)
+
+    for col in ["tags", "ingredients", "steps"]:
+        assert getattr(parsed, col).to_lists() == getattr(expected, col).to_lists()
+        assert list(getattr(parsed, col).vocabulary) == list(getattr(expected, col).vocabulary)
+    np.testing.assert_array_equal(parsed.nutrition, expected.nutrition)
+
+
+def test_list_column_roundtrip():
+    """Offsets and codes rebuild the original lists."""
+    lists = [["b", "a"], [], ["a"]]
+    column = ListColumn.from_lists(lists)
+
+    assert column.to_lists() == lists
+    assert list(column.vocabulary) == ["a", "b"]
+    assert column.lengths().tolist() == [2, 0, 1]
+
+
+def test_list_column_take():
+    """take selects rows by position."""
+    column = ListColumn.from_lists([["x"], ["y", "z"], ["x", "y"]])
+    assert column.take([2, 0]).to_lists() == [["x", "y"], ["x"]]
+
+
+def test_parse_recipes(sample_recipes_df):
+    """Every list column is parsed and invalid nutrition becomes NaN."""
+    parsed = parse_recipes(sample_recipes_df)
+
+    assert parsed.tags.to_lists() == [["italian", "easy"], ["mexican"], []]
+    assert parsed.nutrition.shape == (3, 7)
+    assert parsed.nutrition[0, 0] == 100
+    assert np.isnan(parsed.nutrition[2]).all()
+
+
+def test_save_and_load_parsed(sample_recipes_df, tmp_path):
+    """Parsed columns survive a round trip through disk."""
+    parsed = parse_recipes(sample_recipes_df)
+    save_parsed(parsed, tmp_path / "parsed")
+    loaded = load_parsed(tmp_path / "parsed")
+
+    assert loaded.ingredients.to_lists() == parsed.ingredients.to_lists()
+    assert loaded.steps.to_lists() == parsed.steps.to_lists()
+    np.testing.assert_array_equal(loaded.nutrition, parsed.nutrition)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.utils.ingredient_cube import ContinentIngredientCube
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture
+def ingredient_and_continent():
+    """One row per (recipe, ingredient) with the recipe's continent."""
+    rows = [
+        (1, "Asia", "salt"), (1, "Asia", "soy sauce"), (1, "Asia", "ginger"),
+        (2, "Asia", "salt"), (2, "Asia", "soy sauce"), (2, "Asia", "rice"),
+        (3, "Asia", "salt"), (3, "Asia", "rice"), (3, "Asia", "rice"),
+        (4, "Europe", "salt"), (4, "Europe", "butter"), (4, "Europe", "flour"),
+        (5, "Europe", "salt"), (5, "Europe", "butter"),
+        (6, "Europe", np.nan),
+    ]
+    return pd.DataFrame(rows, columns=["id", "continent", "ingredients"])
+
+
+@pytest.fixture
+def cube(ingredient_and_continent):
+    return ContinentIngredientCube.from_frame(ingredient_and_continent)
+
+
+# ==================== TESTS ====================
+
+
+def test_cube_counts(cube):
+    """Occurrences are counted per continent, recipes once per ingredient."""
+    codes, counts = cube.row(0)
+    assert dict(zip(cube.ingredients[codes], counts)) == {"ginger": 1, "rice": 3, "salt": 3, "soy sauce": 2}
+    assert cube.doc_freq[cube.ingredients.tolist().index("rice")] == 2
+    assert cube.n_recipes == 6
+    assert cube.empty_rows.tolist() == [0, 1]
+
+
+def test_top_excludes_common_ingredients(cube):
+    """Ingredients above the threshold are left out, ties go by name."""
+    top = cube.top(top_n=2, global_threshold=0.5)
+
+    assert "salt" not in top["ingredients"].tolist()
+    asia = top[top["continent"] == "Asia"]["ingredients"].tolist()
+    assert asia == ["rice", "soy sauce"]
+    assert top["count"].is_monotonic_decreasing
+    assert list(top["continent"].cat.categories) == ["Asia", "Europe"]
+
+
+def test_top_keeps_everything_with_threshold_one(cube, ingredient_and_continent):
+    """With nothing excluded, the counts are those of a plain groupby."""
+    top = cube.top(top_n=10, global_threshold=1.0)
+    expected = ingredient_and_continent.groupby(["continent", "ingredients"]).size()
+
+    result = top.set_index(["continent", "ingredients"])["count"]
+    assert result.sort_index().tolist() == expected.sort_index().tolist()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import sys
@@ -9,11 +10,15 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 from src.webapp_mangetamain.nutriscore_analyzer import (
     get_points,
     compute_nutriscore,
+    compute_nutriscore_batch,
+    THRESHOLDS,
     parse_nutrition,
     filter_data_with_nutri,
     add_nutriscore_column,
     correlation_matrix,
+    analyze_low_scores_with_health_label,
 )
+from src.webapp_mangetamain.utils.ingestion import parse_recipes
 
 
 # ==================== FIXTURES ====================
@@ -104,6 +109,22 @@ def test_compute_nutriscore():
     assert result in ["A", "B", "C", "D", "E"]
 
 
+def test_compute_nutriscore_batch_matches_row_wise():
+    """Batch scoring gives exactly the grades of compute_nutriscore."""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {nutrient: rng.uniform(-5, thresholds[-1] * 1.2, 500) for nutrient, thresholds in THRESHOLDS.items()}
+    )
+    # values sitting exactly on thresholds, and missing values
+    for nutrient, thresholds in THRESHOLDS.items():
+        df.loc[: len(thresholds) - 1, nutrient] = thresholds
+    df.loc[len(df) - 1, "sugar"] = np.nan
+
+    expected = [compute_nutriscore(row.to_dict()) for _, row in df.iterrows()]
+
+    assert compute_nutriscore_batch(df).tolist() == expected
+
+
 def test_parse_nutrition(sample_recipe_df):
     """Test parsing of nutrition column."""
     result = parse_nutrition(sample_recipe_df)
@@ -167,5 +188,24 @@ def test_parse_nutrition_with_invalid_format():
         pass
 
 
+
+def test_health_label_parsed_path_matches_string_path():
+    """Stripped, lower-cased tags match the keywords the same way on both paths."""
+    recipes = pd.DataFrame({
+        "name": ["soup", "cake", "salad", "pie"],
+        "tags": ["[' Low-Fat ', 'easy']", "['HEALTHY', 'dessert']", "['Diet-Friendly']", "['quick']"],
+        "steps": ["[]"] * 4,
+        "ingredients": ["[]"] * 4,
+        "nutrition": ["[1, 2, 3, 4, 5, 6, 7]"] * 4,
+    })
+    nutrition_df = pd.DataFrame({"nutri_score": ["D", "E", "D", "E"]})
+    keywords = ["healthy", "fat", "Diet"]
+
+    expected = analyze_low_scores_with_health_label(recipes, nutrition_df, keywords)
+    result = analyze_low_scores_with_health_label(recipes, nutrition_df, keywords, parsed=parse_recipes(recipes, jobs=1))
+
+    pd.testing.assert_frame_equal(result, expected)
+    assert expected["name"].tolist() == ["soup", "cake"]
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,113 @@
+import pytest
+import json
+import time
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.utils import profiling
+from src.webapp_mangetamain.utils.profiling import Profiler, instrument, span
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    """A fresh enabled profiler in place of the process one."""
+    profiler = Profiler(enabled=True)
+    monkeypatch.setattr(profiling, "PROFILER", profiler)
+    return profiler
+
+
+@instrument
+def double(df):
+    return df * 2
+
+
+@instrument(name="allocate")
+def allocate(n):
+    return np.ones(n, dtype=np.uint8).sum()
+
+
+# ==================== TESTS ====================
+
+
+def test_instrument_records_calls_and_rows(profiler):
+    """Each call adds its times and the rows of the first sized argument."""
+    df = pd.DataFrame({"a": range(10)})
+    double(df)
+    double(df.head(4))
+
+    (stats,) = profiler.snapshot()
+    assert stats["span"].endswith("test_profiling.double")
+    assert stats["calls"] == 2
+    assert stats["rows_total"] == 14
+    assert stats["rows_last"] == 4
+    assert stats["wall_total_s"] >= stats["wall_max_s"] > 0
+
+
+def test_disabled_profiler_records_nothing(profiler):
+    """Nothing is recorded once the profiler is off."""
+    profiler.configure(enabled=False)
+    double(pd.DataFrame({"a": [1]}))
+    with span("block"):
+        pass
+    assert profiler.snapshot() == []
+
+
+def test_nested_spans_peak_allocation(profiler):
+    """An enclosing span's peak includes the allocations of its inner spans."""
+    profiler.configure(trace_memory=True)
+    try:
+        with span("outer"):
+            allocate(8 << 20)
+            allocate(1 << 20)
+    finally:
+        profiler.configure(trace_memory=False)
+
+    stats = {row["span"]: row for row in profiler.snapshot()}
+    assert stats["allocate"]["calls"] == 2
+    assert stats["allocate"]["peak_alloc_max_bytes"] >= 8 << 20
+    assert stats["outer"]["peak_alloc_max_bytes"] >= 8 << 20
+
+
+def test_dump_json_and_prometheus(profiler, tmp_path):
+    """The dump holds the spans as JSON and as Prometheus samples."""
+    with span('weird "name"', rows=3):
+        pass
+    profiler.dump(tmp_path)
+
+    spans = json.loads((tmp_path / "spans.json").read_text())["spans"]
+    assert spans[0]["rows_total"] == 3
+    prom = (tmp_path / "spans.prom").read_text()
+    assert "# TYPE mangetamain_span_calls_total counter" in prom
+    assert 'mangetamain_span_calls_total{span="weird \\"name\\""} 1' in prom
+
+
+def test_disabled_overhead_is_negligible(monkeypatch):
+    """A decorated call costs about the same as a plain one while disabled."""
+    monkeypatch.setattr(profiling, "PROFILER", Profiler(enabled=False))
+
+    def plain(x):
+        return x
+
+    wrapped = instrument(plain)
+    n = 100_000
+    start = time.perf_counter()
+    for _ in range(n):
+        plain(1)
+    plain_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(n):
+        wrapped(1)
+    wrapped_s = time.perf_counter() - start
+
+    assert (wrapped_s - plain_s) / n < 2e-6
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import sys
@@ -7,9 +8,11 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from src.webapp_mangetamain.recipe_complexity import (
+    binned_kde,
     make_univariate_figs,
     make_pairplot_fig,
     make_corr_heatmap_fig,
+    stratified_sample,
 )
 
 
@@ -59,5 +62,52 @@ def test_make_corr_heatmap_fig_returns_figure(sample_df):
     plt.close("all")
 
 
+def test_aggregated_figures(sample_df):
+    """The aggregated mode draws the same figures from binned data."""
+    df = sample_df.assign(kind=["a", "b", "a", "b", "a"])
+    hist_fig, box_fig = make_univariate_figs(df, "minutes", aggregate=True)
+    _, box_by_kind = make_univariate_figs(df, "minutes", hue="kind", aggregate=True)
+    pair_fig = make_pairplot_fig(df, ["minutes", "n_steps", "n_ingredients"], aggregate=True)
+    pair_by_kind = make_pairplot_fig(df, ["minutes", "n_steps"], hue="kind", aggregate=True)
+
+    for fig in [hist_fig, box_fig, box_by_kind, pair_fig, pair_by_kind]:
+        assert isinstance(fig, plt.Figure)
+    # corner layout: lower triangle only
+    assert len(pair_fig.axes) == 6
+    plt.close("all")
+
+
+def test_aggregated_figures_without_finite_values(sample_df):
+    """Empty frames and groups without finite values draw empty boxplots."""
+    df = sample_df.assign(kind=["a", "b", "a", "b", "a"], minutes=[30, np.nan, 20, np.inf, 15])
+    _, box_by_kind = make_univariate_figs(df, "minutes", hue="kind", aggregate=True)
+    _, empty_box = make_univariate_figs(df.iloc[:0], "minutes", aggregate=True)
+
+    assert [t.get_text() for t in box_by_kind.axes[0].get_xticklabels()] == ["a"]
+    assert isinstance(empty_box, plt.Figure)
+    plt.close("all")
+
+
+def test_binned_kde_matches_gaussian_kde():
+    """The FFT KDE matches the exact Gaussian KDE with Scott's bandwidth."""
+    from scipy.stats import gaussian_kde
+
+    values = np.random.default_rng(0).lognormal(3, 0.5, 5000)
+    grid, density = binned_kde(values)
+
+    assert np.trapezoid(density, grid) == pytest.approx(1, abs=1e-3)
+    np.testing.assert_allclose(density, gaussian_kde(values)(grid), atol=2e-3 * density.max())
+
+
+def test_stratified_sample_keeps_strata():
+    """The sample cap keeps each stratum's share."""
+    df = pd.DataFrame({"x": np.arange(1000), "kind": ["a"] * 800 + ["b"] * 200})
+    sample = stratified_sample(df, 100, by="kind")
+
+    assert len(sample) == 100
+    assert (sample["kind"] == "b").sum() == 20
+    assert len(stratified_sample(df, 5000)) == 1000
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,95 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.utils.dataset_cache import clear_memory_cache as clear_frames
+from src.webapp_mangetamain.utils.ingestion import load_parsed_recipes
+from src.webapp_mangetamain.utils.schema import (
+    STRING_DTYPE,
+    apply_schema,
+    clear_memory_cache,
+    compact_column,
+    frame_memory,
+    load_compact_dataset,
+    memory_report,
+)
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture
+def recipes():
+    """Recipes with the Food.com columns."""
+    return pd.DataFrame({
+        "name": ["soup", "cake", "tea"],
+        "id": [10, 20, 30],
+        "minutes": [30, 60, 5],
+        "submitted": ["2010-01-01", "2010-01-01", "2011-05-02"],
+        "tags": ["['easy']", "['desserts', 'easy']", "['beverages']"],
+        "nutrition": ["[1, 2, 3, 4, 5, 6, 7]"] * 3,
+        "n_ingredients": [4, 8, 2],
+        "rating": [4.0, 5.0, 3.5],
+        "extra": [1.5, 2.5, 3.5],
+    })
+
+
+@pytest.fixture
+def recipes_csv(tmp_path, recipes):
+    path = tmp_path / "recipes.csv"
+    recipes.to_csv(path, index=False)
+    yield path
+    clear_memory_cache()
+    clear_frames()
+
+
+# ==================== TESTS ====================
+
+
+def test_apply_schema_dtypes(recipes):
+    """Numbers are downcast, names become Arrow strings and dates categories."""
+    compact = apply_schema(recipes)
+
+    assert compact["id"].dtype == np.int32
+    assert compact["rating"].dtype == np.float32
+    assert compact["extra"].dtype == np.float32
+    assert compact["name"].dtype == STRING_DTYPE
+    assert compact["tags"].dtype == STRING_DTYPE
+    assert isinstance(compact["submitted"].dtype, pd.CategoricalDtype)
+    assert compact["name"].tolist() == recipes["name"].tolist()
+    assert "tags" not in apply_schema(recipes, drop_lists=True)
+
+
+def test_compact_integers_keep_their_values():
+    """Values beyond int32 stay int64, missing values make floats."""
+    assert compact_column(pd.Series([1, 2**40]), "integer").dtype == np.int64
+    with_nan = compact_column(pd.Series([1, None, 3]), "integer")
+    assert with_nan.dtype == np.float64 and with_nan.isna().sum() == 1
+
+
+def test_load_compact_dataset_drops_lists(recipes_csv, tmp_path):
+    """The compact frame leaves out the list columns, still parsed on demand."""
+    cache_dir = tmp_path / "cache"
+    compact = load_compact_dataset(recipes_csv, cache_dir)
+
+    assert "tags" not in compact and "nutrition" not in compact
+    assert load_compact_dataset(recipes_csv, cache_dir) is compact
+    parsed = load_parsed_recipes(recipes_csv, cache_dir)
+    assert parsed.tags.to_lists() == [["easy"], ["desserts", "easy"], ["beverages"]]
+
+
+def test_memory_report(recipes):
+    """Frames are reported largest first, the compact one being smaller."""
+    report = memory_report({"raw": recipes, "compact": apply_schema(recipes, drop_lists=True)})
+
+    assert report.index.tolist() == ["raw", "compact"]
+    assert report.loc["raw", "rows"] == 3
+    assert report.loc["raw", "memory_mb"] == frame_memory(recipes) / 2**20
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
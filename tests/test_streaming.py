@@ -0,0 +1,128 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.nutriscore_analyzer import (
+    NUTRITION_LIMITS,
+    add_nutriscore_column,
+    compute_nutriscore_batch,
+    filter_data_with_nutri,
+    nutrient_labels,
+    parse_nutrition,
+)
+from src.webapp_mangetamain.tag_analyzer import create_tag_recipes_dataset, get_general_tags_statistics
+from src.webapp_mangetamain.utils.filter_data import TRIM_COLUMNS, DatasetContext, complexity_mask
+from src.webapp_mangetamain.utils.ingestion import parse_recipes
+from src.webapp_mangetamain.utils.streaming import (
+    RowStore,
+    TagAggregate,
+    load_aggregates,
+    quantile_from_counts,
+    stream_recipes,
+    trim_bounds,
+    trim_mask,
+)
+from src.webapp_mangetamain.utils.synthetic import generate_recipes
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture(scope="module")
+def streamed(tmp_path_factory):
+    """A synthetic CSV streamed in chunks, with its in-memory frame and parsed columns."""
+    tmp = tmp_path_factory.mktemp("streaming")
+    generate_recipes(3000, seed=11).to_csv(tmp / "recipes.csv", index=False)
+    aggregates = stream_recipes(
+        tmp / "recipes.csv", tmp / "streamed", nutrient_labels, chunk_rows=700,
+        nutrition_limits=NUTRITION_LIMITS, score=compute_nutriscore_batch, jobs=1,
+    )
+    df = pd.read_csv(tmp / "recipes.csv")
+    return aggregates, tmp / "streamed", df, parse_recipes(df, jobs=1)
+
+
+# ==================== TESTS ====================
+
+
+def test_quantile_from_counts_matches_numpy():
+    """Quantiles of a counted sample are those of the expanded sample."""
+    rng = np.random.default_rng(0)
+    sample = rng.integers(1, 60, 1001).astype(float)
+    values, counts = np.unique(sample, return_counts=True)
+    for q in (0, 0.25, 0.5, 0.9, 0.99, 1):
+        assert quantile_from_counts(values, counts, q) == np.quantile(sample, q)
+    assert np.isnan(quantile_from_counts([], [], 0.5))
+
+
+def test_row_store_matches_in_memory_parse(streamed):
+    """The row store holds every row, parsed like the whole frame at once."""
+    _, directory, df, parsed = streamed
+    store = RowStore(directory)
+
+    assert len(store) == len(df)
+    assert store.rows(["id"])["id"].tolist() == df["id"].tolist()
+    for col in ["tags", "ingredients", "steps"]:
+        streamed_column, column = getattr(store.parsed, col), getattr(parsed, col)
+        np.testing.assert_array_equal(streamed_column.offsets, column.offsets)
+        np.testing.assert_array_equal(streamed_column.codes, column.codes)
+        assert streamed_column.vocabulary.tolist() == column.vocabulary.tolist()
+    np.testing.assert_array_equal(store.parsed.nutrition, parsed.nutrition)
+
+
+@pytest.mark.parametrize("mode", ["sequential", "joint"])
+def test_trim_bounds_match_complexity_mask(streamed, mode):
+    """Bounds computed from value counts keep the rows of complexity_mask."""
+    _, directory, df, _ = streamed
+    store = RowStore(directory)
+    values = store.rows(TRIM_COLUMNS).to_numpy(dtype=float, na_value=np.nan)
+
+    mask = trim_mask(values, trim_bounds(store, mode=mode))
+    np.testing.assert_array_equal(mask, complexity_mask(df, mode=mode))
+
+
+def test_aggregates_match_in_memory_analyses(streamed):
+    """Each aggregate gives the table the app computes from the whole frame."""
+    aggregates, _, df, parsed = streamed
+    tag_stats, _ = create_tag_recipes_dataset(df, 50, parsed=parsed)
+    pd.testing.assert_frame_equal(
+        aggregates.tags.tag_stats(50).sort_values("tag").reset_index(drop=True),
+        tag_stats.sort_values("tag").reset_index(drop=True),
+    )
+    pd.testing.assert_series_equal(
+        aggregates.tags.general_statistics()["tag_counts"], get_general_tags_statistics(df, parsed)["tag_counts"]
+    )
+
+    context = DatasetContext(df, parsed)
+    expected = context.ingredient_counts
+    counts = aggregates.ingredients.ingredient_counts()
+    assert dict(zip(counts["ingredients"], counts["count"])) == dict(zip(expected["ingredients"], expected["count"]))
+    pd.testing.assert_frame_equal(aggregates.continents.cube().top(10, 0.3), context.ingredient_cube.top(10, 0.3))
+
+    nutrition_df = parse_nutrition(df, parsed)
+    pd.testing.assert_frame_equal(aggregates.nutrition.correlation(), nutrition_df.corr(), atol=1e-10)
+    scored = add_nutriscore_column(filter_data_with_nutri(nutrition_df))
+    assert aggregates.nutrition.grade_counts["all"].to_dict() == scored["nutri_score"].value_counts().to_dict()
+
+
+def test_aggregates_merge_and_persist(streamed):
+    """Merging chunk aggregates does not depend on the split, and saved aggregates load back."""
+    aggregates, directory, df, parsed = streamed
+    first, second = df.iloc[:1000], df.iloc[1000:]
+    halves = TagAggregate.from_chunk(second, parsed.tags.take(second.index)).merge(
+        TagAggregate.from_chunk(first, parsed.tags.take(first.index))
+    )
+    pd.testing.assert_frame_equal(halves.tag_stats(1), aggregates.tags.tag_stats(1))
+
+    loaded = load_aggregates(directory)
+    assert loaded.n_rows == len(df)
+    pd.testing.assert_frame_equal(loaded.nutrition.grade_counts, aggregates.nutrition.grade_counts)
+    pd.testing.assert_frame_equal(loaded.continents.cube().top(), aggregates.continents.cube().top())
+    np.testing.assert_array_equal(loaded.nutrition.histograms, aggregates.nutrition.histograms)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
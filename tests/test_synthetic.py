@@ -0,0 +1,73 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.utils.filter_data import CUISINE_TO_REGION, DatasetContext
+from src.webapp_mangetamain.utils.ingestion import parse_recipes
+from src.webapp_mangetamain.utils.synthetic import (
+    COLUMNS,
+    generate_recipes,
+    tag_vocabulary,
+    write_recipes_csv,
+)
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture(scope="module")
+def recipes():
+    """A small synthetic dataset."""
+    return generate_recipes(3000, seed=1)
+
+
+# ==================== TESTS ====================
+
+
+def test_generation_is_deterministic(recipes):
+    """The same size and seed give the same frame, another seed another one."""
+    pd.testing.assert_frame_equal(recipes, generate_recipes(3000, seed=1))
+    assert not recipes["tags"].equals(generate_recipes(3000, seed=2)["tags"])
+
+
+def test_schema_matches_the_loaders(recipes):
+    """List columns parse like Food.com ones and the counts are consistent."""
+    assert list(recipes.columns) == COLUMNS
+    parsed = parse_recipes(recipes)
+
+    assert (parsed.ingredients.lengths() == recipes["n_ingredients"]).all()
+    assert (parsed.steps.lengths() == recipes["n_steps"]).all()
+    assert not np.isnan(parsed.nutrition).any()
+    assert recipes["id"].is_unique
+
+
+def test_tag_frequencies_follow_a_power_law(recipes):
+    """A few tags are in most recipes, most tags in few of them."""
+    counts = np.sort(parse_recipes(recipes).tags.counts())[::-1]
+    assert counts[0] > 0.5 * len(recipes)
+    assert np.median(counts) < 0.05 * len(recipes)
+    assert set(CUISINE_TO_REGION) <= set(tag_vocabulary())
+
+
+def test_dataset_runs_through_the_context(recipes):
+    """Recipes get continents and ingredient counts like the real dataset."""
+    context = DatasetContext(recipes, parse_recipes(recipes))
+    assert context.recipes_with_continent["continent"].notna().mean() > 0.5
+    assert context.ingredient_counts["count"].max() > 100
+
+
+def test_write_csv_in_chunks(tmp_path, monkeypatch):
+    """The CSV written chunk by chunk reads back as the generated frame."""
+    import src.webapp_mangetamain.utils.synthetic as synthetic
+
+    monkeypatch.setattr(synthetic, "CHUNK_ROWS", 400)
+    path = write_recipes_csv(tmp_path / "recipes.csv", 1000, seed=3)
+    pd.testing.assert_frame_equal(pd.read_csv(path), generate_recipes(1000, seed=3), check_dtype=False)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.webapp_mangetamain.utils.ingestion import ListColumn
+from src.webapp_mangetamain.utils.tag_bitmap import TagBitmap, TagBitmapIndex
+
+
+# ==================== FIXTURES ====================
+
+
+@pytest.fixture
+def tag_lists():
+    """Tags of 10 recipes (not a multiple of 8, to exercise bit padding)."""
+    return [
+        ["healthy", "easy"], ["beverages"], [], ["easy"], ["Health-Food", "desserts"],
+        ["cocktails", "easy"], ["desserts"], ["healthy"], ["main-dish"], ["easy", "easy"],
+    ]
+
+
+@pytest.fixture
+def index(tag_lists):
+    """Bitmap index of the sample tags."""
+    return TagBitmapIndex.from_tags(ListColumn.from_lists(tag_lists))
+
+
+# ==================== TESTS ====================
+
+
+def test_any_of_matches_list_scan(index, tag_lists):
+    """Exact tag lookups select the same recipes as scanning the lists."""
+    expected = [i for i, tags in enumerate(tag_lists) if {"easy", "desserts"} & set(tags)]
+    assert index.any_of(["easy", "desserts", "unknown"]).positions().tolist() == expected
+    assert index.any_of(["unknown"]).count() == 0
+
+
+def test_matching_is_case_insensitive(index, tag_lists):
+    """Pattern groups are resolved over the vocabulary."""
+    expected = [i for i, tags in enumerate(tag_lists) if any("health" in t.lower() for t in tags)]
+    assert index.matching("health", regex=False).positions().tolist() == expected
+    assert index.matching(r"\b(beverages?|cocktails?)\b").positions().tolist() == [1, 5]
+
+
+def test_boolean_combinations(index):
+    """AND / OR / NOT give the expected masks, padding bits excluded."""
+    easy = index.any_of(["easy"])
+    health = index.matching("health", regex=False)
+
+    assert (easy & health).positions().tolist() == [0]
+    assert (easy | health).positions().tolist() == [0, 3, 4, 5, 7, 9]
+    assert (~easy).positions().tolist() == [1, 2, 4, 6, 7, 8]
+    assert (~easy).count() == 6
+    assert len((~easy).to_mask()) == 10
+
+
+def test_bitmap_from_mask_roundtrip():
+    """Packing and unpacking a mask is lossless."""
+    mask = np.array([True, False, True, True, False, False, False, False, True])
+    np.testing.assert_array_equal(TagBitmap.from_mask(mask).to_mask(), mask)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
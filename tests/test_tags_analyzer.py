@@ -10,6 +10,8 @@ from src.webapp_mangetamain.tag_analyzer import (
     get_all_tags_of_interest,
     create_tag_category_mapping,
     get_general_tags_statistics,
+    get_tag_index,
+    count_tags,
     analyze_tags_distribution,
     create_tag_recipes_dataset,
     filter_tags_of_interest,
@@ -78,6 +80,24 @@ def test_get_general_tags_statistics(sample_recipes_df):
     assert stats["total_recipes"] == 3
 
 
+def test_tag_index_statistics_match_lists():
+    """Counts and lengths from the tag index match the list-based computation."""
+    df = pd.DataFrame({"tags": ["['easy', 'italian']", "['easy']", "[]", "['quick', 'easy', 'italian']"]})
+    lists = parse_tags(df["tags"])
+
+    tags = get_tag_index(df)
+    stats = get_general_tags_statistics(df)
+
+    assert count_tags(tags).to_dict() == lists.explode().value_counts().to_dict()
+    assert count_tags(tags).index.tolist() == ["easy", "italian", "quick"]
+    assert stats["tags_per_recipe"].tolist() == [2, 1, 0, 3]
+    assert stats["total_tags"] == 6
+    assert stats["total_unique_tags"] == 3
+    pd.testing.assert_series_equal(
+        stats["tags_per_recipe_stats"], lists.apply(len).describe(), check_dtype=False, check_names=False
+    )
+
+
 def test_analyze_tags_distribution(sample_recipes_df):
     """Test distribution analysis."""
     result = analyze_tags_distribution(sample_recipes_df)
@@ -92,6 +112,27 @@ def test_create_tag_recipes_dataset(sample_recipes_df):
     assert "n_recipes" in tag_stats.columns
 
 
+def test_create_tag_recipes_dataset_aggregates():
+    """Per-tag counts and means over the exploded tag-recipe pairs."""
+    df = pd.DataFrame(
+        {
+            "id": [1, 2, 3],
+            "tags": ["['easy', 'italian']", "['easy']", "[]"],
+            "minutes": [30, 10, 45],
+            "n_ingredients": [8, 4, 10],
+            "n_steps": [5, 3, 7],
+        }
+    )
+    tag_stats, tag_recipes_df = create_tag_recipes_dataset(df, min_recipes_per_tag=1)
+
+    easy = tag_stats.set_index("tag").loc["easy"]
+    assert easy["n_recipes"] == 2
+    assert easy["avg_minutes"] == 20
+    assert tag_stats["tag"].tolist() == ["easy", "italian"]
+    assert tag_recipes_df["recipe_id"].tolist() == [1, 1, 2]
+    assert tag_recipes_df["n_steps"].tolist() == [5, 5, 3]
+
+
 def test_filter_tags_of_interest():
     """Test filtering of tags of interest."""
     df = pd.DataFrame(